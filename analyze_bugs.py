@@ -4,138 +4,131 @@ Analyze call transcripts and identify bugs in the medical office AI
 
 import json
 import os
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from src.bug_rules import RuleEngine
+from src.transcript_index import TranscriptIndex
+from src.findings_store import FindingsStore, RESULTS_DB
+from src.archive import ArchiveReader
 
-def load_transcripts():
-    """Load all transcript files"""
-    transcripts = []
-    transcript_dir = 'transcripts'
-    
+TRANSCRIPT_DIR = 'transcripts'
+
+def select_transcripts(transcript_dir=TRANSCRIPT_DIR, since=None, until=None, scenarios=None):
+    """Transcript paths matching the filters, ordered by scenario (from the sidecar index, no parsing)"""
     if not os.path.exists(transcript_dir):
         print("No transcripts directory found!")
         return []
-    
-    for filename in os.listdir(transcript_dir):
-        if filename.endswith('.json'):
-            with open(f'{transcript_dir}/{filename}', 'r') as f:
-                transcripts.append(json.load(f))
-    
-    return sorted(transcripts, key=lambda x: x['scenario_id'])
+    return TranscriptIndex(transcript_dir).select(since=since, until=until, scenarios=scenarios)
+
+def _read_transcript(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def iter_transcripts(paths):
+    """Yield transcripts one at a time, in path order"""
+    for path in paths:
+        yield _read_transcript(path)
+
+def load_transcripts(transcript_dir=TRANSCRIPT_DIR):
+    """Load all transcript files"""
+    return list(iter_transcripts(select_transcripts(transcript_dir)))
 
-def analyze_for_bugs(transcripts):
-    """Analyze transcripts for bugs and quality issues"""
+def analyze_for_bugs(transcripts, engine=None):
+    """Analyze transcripts for bugs and quality issues (rules live in src/bug_rules.py)"""
+    engine = engine or RuleEngine()
     bugs = []
     
     for transcript in transcripts:
-        scenario_id = transcript['scenario_id']
-        scenario_name = transcript['scenario_name']
-        conversation = transcript['conversation']
-        
-        # Bug 1: Duplicate time slots offered
-        for msg in conversation:
-            if msg['speaker'] == 'agent' and '2 PM' in msg['message']:
-                if msg['message'].count('2 PM') > 1:
-                    bugs.append({
-                        'scenario': scenario_name,
-                        'type': 'Logic Error',
-                        'severity': 'High',
-                        'description': 'Agent offered the same time slot twice (2 PM and 2 PM)',
-                        'evidence': msg['message'],
-                        'impact': 'Confuses patients and makes scheduling impossible'
-                    })
-        
-        # Bug 2: Wrong medication hallucination
-        for i, msg in enumerate(conversation):
-            if msg['speaker'] == 'agent' and 'metformin' in msg['message'].lower():
-                if i > 0 and 'lisinopril' in conversation[i-1]['message'].lower():
-                    bugs.append({
-                        'scenario': scenario_name,
-                        'type': 'Hallucination',
-                        'severity': 'Critical',
-                        'description': 'Agent hallucinated wrong medication - patient asked for lisinopril (blood pressure) but agent mentioned metformin (diabetes)',
-                        'evidence': f"Patient: {conversation[i-1]['message']}\nAgent: {msg['message']}",
-                        'impact': 'Could lead to dangerous medication errors'
-                    })
-        
-        # Bug 3: Poor urgency handling
-        if scenario_id == 6:  # Urgent appointment scenario
-            for msg in conversation:
-                if msg['speaker'] == 'agent' and 'two weeks' in msg['message'].lower():
-                    bugs.append({
-                        'scenario': scenario_name,
-                        'type': 'Inappropriate Response',
-                        'severity': 'High',
-                        'description': 'Agent offered appointment 2 weeks out for urgent care request',
-                        'evidence': msg['message'],
-                        'impact': 'Patient with urgent medical need is not properly triaged'
-                    })
-        
-        # Bug 4: Asks for unnecessary information
-        if scenario_id == 3:  # Rescheduling scenario
-            for msg in conversation:
-                if msg['speaker'] == 'agent' and 'date of birth' in msg['message'].lower():
-                    if 'not seeing any upcoming' in msg['message'].lower():
-                        bugs.append({
-                            'scenario': scenario_name,
-                            'type': 'Data Retrieval Failure',
-                            'severity': 'Medium',
-                            'description': 'Agent unable to find existing appointment for rescheduling',
-                            'evidence': msg['message'],
-                            'impact': 'Creates friction for legitimate rescheduling requests'
-                        })
-        
-        # Bug 5: Inconsistent office hours
-        for msg in conversation:
-            if msg['speaker'] == 'agent' and 'office hours' in msg['message'].lower():
-                if 'sunday' in msg['message'].lower():
-                    bugs.append({
-                        'scenario': scenario_name,
-                        'type': 'Information Accuracy',
-                        'severity': 'Medium',
-                        'description': 'Agent claims office is open on Sundays (unusual for medical office)',
-                        'evidence': msg['message'],
-                        'impact': 'Patient may show up when office is actually closed'
-                    })
-        
-        # Bug 6: Doesn't recognize wrong office type
-        if scenario_id == 10:  # Wrong number scenario
-            recognized_error = False
-            for msg in conversation:
-                if msg['speaker'] == 'agent':
-                    if 'veterinary' in msg['message'].lower() or 'wrong' in msg['message'].lower():
-                        recognized_error = True
-            
-            if not recognized_error:
-                bugs.append({
-                    'scenario': scenario_name,
-                    'type': 'Context Understanding Failure',
-                    'severity': 'Medium',
-                    'description': 'Agent failed to recognize caller was looking for veterinary clinic, not human medical office',
-                    'evidence': 'Agent proceeded with appointment scheduling despite clear mismatch',
-                    'impact': 'Wastes time for both caller and office'
-                })
-        
-        # Bug 7: Repetitive "didn't catch that"
-        repeat_count = sum(1 for msg in conversation if msg['speaker'] == 'agent' and 'didn\'t quite catch' in msg['message'].lower())
-        if repeat_count >= 3:
-            bugs.append({
-                'scenario': scenario_name,
-                'type': 'Poor Conversation Flow',
-                'severity': 'Medium',
-                'description': f'Agent asked patient to repeat themselves {repeat_count} times in one call',
-                'evidence': f'{repeat_count} instances of "I didn\'t quite catch that"',
-                'impact': 'Frustrating user experience, suggests poor speech recognition'
-            })
+        bugs.extend(engine.analyze(transcript))
     
     return bugs
 
-def generate_bug_report(bugs, transcripts):
+_worker_engine = None
+
+def _analyze_chunk(paths):
+    """Map step: parse and analyze a chunk of transcript files in a worker process"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = RuleEngine()
+    return [(path, _worker_engine.analyze(_read_transcript(path))) for path in paths]
+
+def _chunks(paths, size):
+    for start in range(0, len(paths), size):
+        yield paths[start:start + size]
+
+def analyze_files(paths, workers=None, chunk_size=64):
+    """
+    Map-reduce bug analysis over transcript files, yielding (path, findings) in path order.
+    Workers parse and analyze chunks; only findings come back, and at most 2 chunks per worker
+    are in flight, so memory stays flat however many transcripts there are.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= chunk_size:
+        yield from _analyze_chunk(paths)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(paths, chunk_size):
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_analyze_chunk, chunk))
+        # Reduce step: results are collected in submission order
+        while pending:
+            yield from pending.popleft().result()
+
+def analyze_paths(paths, workers=None):
+    """Returns (transcript count, bugs) with bugs in the same order as a serial run"""
+    bugs = []
+    for _, findings in analyze_files(paths, workers):
+        bugs.extend(findings)
+    return len(paths), bugs
+
+def analyze_archive(archive_dir, since=None, until=None, scenarios=None):
+    """
+    Bug analysis straight from the transcript archive.
+    Filters only decode each call's header; matching calls are decoded one at a time, by scenario.
+    Returns (transcript count, bugs).
+    """
+    engine = RuleEngine()
+    with ArchiveReader(archive_dir) as reader:
+        selected = []
+        for call_id in reader.call_ids():
+            header = reader.header(call_id)
+            timestamp = header.get('timestamp') or ''
+            if since and timestamp[:len(since)] < since:
+                continue
+            if until and timestamp[:len(until)] > until:
+                continue
+            if scenarios and header.get('scenario_id') not in scenarios:
+                continue
+            selected.append((header.get('scenario_id') or 0, call_id))
+        
+        selected.sort()
+        bugs = analyze_for_bugs((reader.get(call_id) for _, call_id in selected), engine)
+    return len(selected), bugs
+
+def analyze_incremental(paths, transcript_dir=TRANSCRIPT_DIR, workers=None):
+    """
+    Only analyze transcripts that are new, changed, or were analyzed under other rules;
+    everything else comes from the stored findings in the results index.
+    Returns (transcript count, bugs, number re-analyzed).
+    """
+    engine = RuleEngine()
+    with FindingsStore(os.path.join(transcript_dir, RESULTS_DB), engine.version) as store:
+        stale = store.stale(paths)
+        store.save_all(analyze_files(stale, workers))
+        return len(paths), store.findings(paths), len(stale)
+
+def generate_bug_report(bugs, transcript_count):
     """Generate formatted bug report"""
     report = []
     
     report.append("# BUG REPORT - Medical Office AI Voice Agent")
     report.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append(f"\nTotal Scenarios Tested: {len(transcripts)}")
+    report.append(f"\nTotal Scenarios Tested: {transcript_count}")
     report.append(f"Total Bugs Found: {len(bugs)}")
     report.append("\n" + "="*80 + "\n")
     
@@ -190,34 +183,60 @@ def generate_bug_report(bugs, transcripts):
     return '\n'.join(report)
 
 def main():
+    parser = argparse.ArgumentParser(description="Bug analysis of call transcripts")
+    parser.add_argument("--since", help="only calls on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only calls on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--scenario", type=int, action="append",
+                        help="only this scenario id (repeatable)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only analyze new or changed transcripts, reuse stored findings for the rest")
+    parser.add_argument("--archive", nargs="?", const=os.path.join(TRANSCRIPT_DIR, 'archive'), default=None,
+                        metavar="DIR", help="read calls from the transcript archive instead of JSON files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes parsing and analyzing transcripts (default: CPU count)")
+    args = parser.parse_args()
+    
     print("="*80)
     print("BUG ANALYSIS - Medical Office AI")
     print("="*80 + "\n")
     
-    # Load transcripts
-    transcripts = load_transcripts()
-    print(f"📁 Loaded {len(transcripts)} transcripts\n")
-    
-    if not transcripts:
-        print("❌ No transcripts found. Run calls first with: python main.py all")
-        return
-    
-    # Analyze for bugs
-    print("🔍 Analyzing conversations for bugs...\n")
-    bugs = analyze_for_bugs(transcripts)
+    scenarios = set(args.scenario) if args.scenario else None
+    if args.archive:
+        print(f"🔍 Analyzing archived conversations in {args.archive}...\n")
+        transcript_count, bugs = analyze_archive(args.archive, since=args.since, until=args.until,
+                                                 scenarios=scenarios)
+        if not transcript_count:
+            print("❌ No archived transcripts found. Record calls with TRANSCRIPT_FORMAT=archive")
+            return
+    else:
+        # Select transcripts from the index - files are only parsed by the analysis workers
+        paths = select_transcripts(since=args.since, until=args.until, scenarios=scenarios)
+        print(f"📁 Selected {len(paths)} transcripts\n")
+        
+        if not paths:
+            print("❌ No transcripts found. Run calls first with: python main.py all")
+            return
+        
+        # Analyze for bugs
+        print("🔍 Analyzing conversations for bugs...\n")
+        if args.incremental:
+            transcript_count, bugs, analyzed = analyze_incremental(paths, workers=args.workers)
+            print(f"♻️  Analyzed {analyzed} new or changed transcripts, reused {transcript_count - analyzed}\n")
+        else:
+            transcript_count, bugs = analyze_paths(paths, workers=args.workers)
     
     # Generate report
-    report = generate_bug_report(bugs, transcripts)
+    report = generate_bug_report(bugs, transcript_count)
     
     # Save report
     with open('BUG_REPORT.md', 'w') as f:
         f.write(report)
     
-    print(f"✅ Found {len(bugs)} issues across {len(transcripts)} scenarios")
+    print(f"✅ Found {len(bugs)} issues across {transcript_count} scenarios")
     print(f"💾 Bug report saved to: BUG_REPORT.md\n")
     
     # Print summary
     print(report)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,119 @@
+"""
+Offline batch transcription of existing recordings
+Walks a recordings directory and transcribes every audio file across a process pool
+Results go into the transcription cache, so `python main.py --reprocess` can use them
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.asr import get_backend, BACKENDS
+from src.downloads import file_sha256
+from src.transcription_cache import get_transcription_cache
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.ogg', '.flac')
+
+# One backend per worker process, created by the pool initializer
+_backend = None
+
+
+def _init_worker(backend_name, backend_kwargs):
+    global _backend
+    _backend = get_backend(backend_name, **backend_kwargs)
+
+
+def _transcribe_file(path):
+    """Runs in a worker process"""
+    start = time.time()
+    result = _backend.transcribe(path)
+    return path, result, time.time() - start
+
+
+def find_recordings(recordings_dir):
+    """All audio files under recordings_dir, sorted - hidden directories (the TTS cache) are skipped"""
+    paths = []
+    for root, dirnames, filenames in os.walk(recordings_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.lower().endswith(AUDIO_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-transcribe recordings into the transcription cache")
+    parser.add_argument("recordings_dir", nargs="?", default="transcripts")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="local")
+    parser.add_argument("--model-size", default=None, help="local backend model size (tiny/base/small/...)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output-dir", default=None,
+                        help="also write <recording>.transcript.json files here")
+    parser.add_argument("--force", action="store_true", help="re-transcribe recordings already cached")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("BATCH TRANSCRIPTION")
+    print("="*60)
+
+    backend_kwargs = {}
+    if args.backend == "local":
+        # Split the cores between workers instead of letting every worker grab all of them
+        backend_kwargs = {
+            "model_size": args.model_size,
+            "cpu_threads": max(1, (os.cpu_count() or 1) // max(1, args.workers))
+        }
+    try:
+        backend = get_backend(args.backend, **backend_kwargs)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    cache = get_transcription_cache()
+
+    recordings = find_recordings(args.recordings_dir)
+    todo = {}
+    for path in recordings:
+        audio_sha256 = file_sha256(path)
+        if args.force or cache.get(audio_sha256, backend.model, backend.response_format) is None:
+            todo[path] = audio_sha256
+
+    print(f"📁 {len(recordings)} recording(s), {len(todo)} to transcribe with {backend.model} "
+          f"on {args.workers} worker(s)\n")
+    if not todo:
+        return
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.time()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.backend, backend_kwargs)) as executor:
+        futures = [executor.submit(_transcribe_file, path) for path in todo]
+        for future in as_completed(futures):
+            try:
+                path, result, elapsed = future.result()
+            except Exception as e:
+                print(f"❌ {e}")
+                failed += 1
+                continue
+
+            cache.put(todo[path], backend.model, backend.response_format, result)
+            if args.output_dir:
+                name = os.path.splitext(os.path.basename(path))[0]
+                with open(os.path.join(args.output_dir, f"{name}.transcript.json"), 'w') as f:
+                    json.dump(result, f, indent=2)
+
+            print(f"✅ {os.path.basename(path)} ({result.get('duration') or 0:.0f}s audio) in {elapsed:.1f}s")
+
+    total = time.time() - start
+    print(f"\n✅ Transcribed {len(todo) - failed}/{len(todo)} recording(s) in {total:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: speaker attribution on long synthetic transcripts
+
+Compares the old approach (split the text on '. ' and substring-scan every patient
+message, including parsed lines appended along the way) with timestamp attribution
+against the TwiML schedule.
+
+Usage: python benchmarks/bench_attribution.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.attribution import build_schedule, attribute_segments, attribute_sentences, estimate_say_seconds
+
+AGENT_LINES = [
+    "Thank you for calling, how can I help you today",
+    "Can I get your date of birth please",
+    "Let me check our availability for you",
+    "I have an opening on Tuesday at 2 PM",
+    "Is there anything else I can help you with",
+    "I didn't quite catch that, could you repeat it",
+]
+
+
+def synthetic_call(turns, seed=0):
+    """Script, TwiML actions, Whisper-style segments and ground-truth speakers"""
+    rng = random.Random(seed)
+    script = [f"Patient line number {i} about my appointment on day {rng.randint(1, 28)}" for i in range(turns)]
+
+    actions = [('pause', 18)]
+    for line in script:
+        actions.append(('say', line))
+        actions.append(('pause', 12))
+
+    segments, truth = [], []
+    clock = 0.0
+    for kind, value in actions:
+        if kind == 'say':
+            duration = estimate_say_seconds(value)
+            segments.append({"start": round(clock, 2), "end": round(clock + duration, 2), "text": f" {value}."})
+            truth.append("patient")
+            clock += duration
+        else:
+            agent_end = clock + min(value - 1, rng.uniform(3, 9))
+            segments.append({"start": round(clock + 0.5, 2), "end": round(agent_end, 2),
+                             "text": f" {rng.choice(AGENT_LINES)}."})
+            truth.append("agent")
+            clock += value
+
+    full_text = ''.join(s['text'] for s in segments).strip()
+    return script, actions, segments, truth, full_text
+
+
+def legacy_parse(full_text, script):
+    """The original _parse_transcription loop"""
+    conversation_log = [{"speaker": "patient", "message": m} for m in script]
+    labels = []
+    for segment in full_text.split('. '):
+        if segment.strip():
+            is_patient = any(msg.lower() in segment.lower()
+                             for msg in [log['message'] for log in conversation_log
+                                         if log['speaker'] == 'patient'])
+            speaker = "patient" if is_patient else "agent"
+            conversation_log.append({"speaker": speaker, "message": segment.strip()})
+            labels.append(speaker)
+    return labels
+
+
+def timed(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    print(f"{'turns':>6s} {'segments':>9s} {'legacy ms':>10s} {'sentences ms':>13s} "
+          f"{'timestamps ms':>14s} {'timestamp accuracy':>19s}")
+    for turns in (10, 100, 500, 2000):
+        script, actions, segments, truth, full_text = synthetic_call(turns)
+        schedule = build_schedule(actions)
+
+        legacy_time, _ = timed(legacy_parse, full_text, script)
+        sentence_time, _ = timed(attribute_sentences, full_text, script)
+        segment_time, labelled = timed(attribute_segments, segments, schedule)
+
+        correct = sum(1 for (speaker, _), expected in zip(labelled, truth) if speaker == expected)
+        print(f"{turns:6d} {len(segments):9d} {legacy_time * 1000:10.1f} {sentence_time * 1000:13.1f} "
+              f"{segment_time * 1000:14.1f} {correct / len(truth):18.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: whole-file vs silence-chunked transcription of call recordings
+
+Reports end-to-end latency and billed audio seconds for each recording.
+By default a simulated backend is used whose latency grows with audio length
+(SIM_BASE_LATENCY + SIM_SECONDS_PER_AUDIO_SECOND x audio seconds); pass --backend groq
+to measure the real API instead.
+
+Usage: python benchmarks/bench_chunking.py [recordings_dir] [--backend sim|groq|local] [--workers N]
+Needs pydub and ffmpeg.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.asr import TranscriptionBackend, get_backend
+from src.chunking import ChunkedBackend, MIN_BILLED_SECONDS
+
+SIM_BASE_LATENCY = 0.3
+SIM_SECONDS_PER_AUDIO_SECOND = 0.02
+
+
+class SimulatedBackend(TranscriptionBackend):
+    """Sleeps in proportion to the audio length instead of calling an API"""
+    name = "sim"
+    model = "simulated-whisper"
+
+    def transcribe(self, audio_path):
+        from pydub import AudioSegment
+
+        seconds = len(AudioSegment.from_file(audio_path)) / 1000
+        time.sleep(SIM_BASE_LATENCY + SIM_SECONDS_PER_AUDIO_SECOND * seconds)
+        return {
+            "text": "simulated",
+            "duration": seconds,
+            "segments": [{"id": 0, "start": 0.0, "end": seconds, "text": "simulated"}]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recordings_dir", nargs="?", default="transcripts")
+    parser.add_argument("--backend", default="sim")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    inner = SimulatedBackend() if args.backend == "sim" else get_backend(args.backend, chunked=False)
+    chunked = ChunkedBackend(inner, workers=args.workers)
+
+    paths = sorted(
+        os.path.join(args.recordings_dir, f)
+        for f in os.listdir(args.recordings_dir) if f.endswith('.mp3')
+    )
+    if not paths:
+        print("No recordings found")
+        return
+
+    print(f"{'recording':40s} {'audio s':>8s} {'whole s':>8s} {'chunk s':>8s} "
+          f"{'billed whole':>13s} {'billed chunk':>13s} {'chunks':>6s}")
+
+    totals = {"whole": 0.0, "chunked": 0.0, "billed_whole": 0.0, "billed_chunked": 0.0}
+    for path in paths:
+        start = time.perf_counter()
+        inner.transcribe(path)
+        whole_latency = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = chunked.transcribe(path)
+        chunked_latency = time.perf_counter() - start
+
+        audio_seconds = result['duration']
+        billed_whole = max(MIN_BILLED_SECONDS, audio_seconds)
+        billed_chunked = result['chunking']['billed_seconds']
+
+        totals["whole"] += whole_latency
+        totals["chunked"] += chunked_latency
+        totals["billed_whole"] += billed_whole
+        totals["billed_chunked"] += billed_chunked
+
+        print(f"{os.path.basename(path):40s} {audio_seconds:8.1f} {whole_latency:8.2f} {chunked_latency:8.2f} "
+              f"{billed_whole:13.1f} {billed_chunked:13.1f} {result['chunking']['chunks']:6d}")
+
+    print(f"\nTotal latency: whole {totals['whole']:.2f}s, chunked {totals['chunked']:.2f}s")
+    print(f"Total billed audio: whole {totals['billed_whole']:.0f}s, chunked {totals['billed_chunked']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
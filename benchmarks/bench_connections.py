@@ -0,0 +1,149 @@
+"""
+Benchmark: new connections (= TLS handshakes against the real HTTPS APIs) per campaign
+
+Replays the HTTP traffic of a campaign against a local keep-alive server and counts the
+connections it accepts. Both sides use the real SDK clients, pointed at the local server:
+  before - a new Twilio and Groq client per call, and a bare requests.get() per download
+  after  - get_twilio_client(), get_groq_client() and download_recording() on the shared
+           pooled session, all from the src.clients registry
+
+Twilio requests go through Client.request with the local URL (the SDK has no base-URL
+setting); Groq is redirected with GROQ_BASE_URL, which the SDK reads when it is built.
+
+Usage: python benchmarks/bench_connections.py [calls] [concurrency]
+"""
+
+import os
+import sys
+import uuid
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from src import clients
+from src.downloads import download_recording
+
+# Requests made by one call: calls.create, ~10 status fetches, recordings.list,
+# MP3 download, Groq transcription
+TWILIO_REQUESTS_PER_CALL = 12
+DOWNLOADS_PER_CALL = 1
+TRANSCRIPTIONS_PER_CALL = 1
+
+ACCOUNT_SID = 'ACbench'
+AUDIO = bytes(4096)
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with CountingHandler.lock:
+            CountingHandler.connections += 1
+
+    def _reply(self, body, content_type='application/json'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.endswith('.mp3'):
+            self._reply(AUDIO, 'audio/mpeg')
+        else:
+            self._reply(b'{"sid": "CAbench", "status": "in-progress"}')
+
+    def do_POST(self):
+        # Drain the body (the Groq upload) so the connection can be kept alive
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(b'{"text": "", "segments": []}')
+
+    def log_message(self, *args):
+        pass
+
+
+def transcribe(groq_client, audio_path):
+    """The request audio.transcriptions.create sends, through the client's own post() (any SDK version)"""
+    with open(audio_path, 'rb') as audio:
+        groq_client.post('/openai/v1/audio/transcriptions', cast_to=object,
+                         body={'model': 'whisper-large-v3-turbo', 'response_format': 'verbose_json'},
+                         files={'file': ('recording.mp3', audio, 'audio/mpeg')})
+
+
+def call_before(base_url, work_dir):
+    """One call the old way - fresh clients per call, bare requests.get"""
+    import httpx
+    from groq import Groq
+    from twilio.rest import Client
+
+    twilio_client = Client(ACCOUNT_SID, 'token')
+    for _ in range(TWILIO_REQUESTS_PER_CALL):
+        twilio_client.request('GET', f"{base_url}/2010-04-01/Accounts/{ACCOUNT_SID}/Calls/CAbench.json")
+    audio_path = os.path.join(work_dir, f"{uuid.uuid4().hex}.mp3")
+    for _ in range(DOWNLOADS_PER_CALL):
+        with open(audio_path, 'wb') as f:
+            f.write(requests.get(f"{base_url}/recording.mp3").content)
+    groq_client = Groq(api_key='key', http_client=httpx.Client())
+    for _ in range(TRANSCRIPTIONS_PER_CALL):
+        transcribe(groq_client, audio_path)
+    groq_client.close()
+
+
+def call_after(base_url, work_dir):
+    """One call with the shared clients from src.clients"""
+    twilio_client = clients.get_twilio_client()
+    for _ in range(TWILIO_REQUESTS_PER_CALL):
+        twilio_client.request('GET', f"{base_url}/2010-04-01/Accounts/{ACCOUNT_SID}/Calls/CAbench.json")
+    recording_sid = 'RE' + uuid.uuid4().hex
+    audio_path = os.path.join(work_dir, f"{recording_sid}.mp3")
+    for _ in range(DOWNLOADS_PER_CALL):
+        download_recording(f"{base_url}/recording.mp3", audio_path, recording_sid)
+    for _ in range(TRANSCRIPTIONS_PER_CALL):
+        transcribe(clients.get_groq_client(), audio_path)
+
+
+def run_campaign(call, base_url, calls, concurrency):
+    CountingHandler.connections = 0
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: call(base_url, work_dir), range(calls)))
+    return CountingHandler.connections
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Picked up when the registry builds its clients
+    os.environ.update({'TWILIO_ACCOUNT_SID': ACCOUNT_SID, 'TWILIO_AUTH_TOKEN': 'token',
+                       'GROQ_API_KEY': 'key', 'GROQ_BASE_URL': base_url})
+    clients.reset_clients()
+
+    requests_per_call = TWILIO_REQUESTS_PER_CALL + DOWNLOADS_PER_CALL + TRANSCRIPTIONS_PER_CALL
+    print(f"Campaign: {calls} calls, {concurrency} concurrent, {requests_per_call} requests/call")
+
+    before = run_campaign(call_before, base_url, calls, concurrency)
+    after = run_campaign(call_after, base_url, calls, concurrency)
+    clients.reset_clients()
+
+    print(f"before: {before:6d} connections ({before / calls:.2f}/call)")
+    print(f"after:  {after:6d} connections ({after / calls:.2f}/call)")
+    print("Every new connection is one TLS handshake against the real HTTPS endpoints.")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
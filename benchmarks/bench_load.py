@@ -0,0 +1,86 @@
+"""
+Benchmark: end-to-end campaign load against the local simulator
+
+Installs src/simulator.py's fakes for Twilio, the recording download and Groq Whisper, enables
+tracing, and drives main.run_all_scenarios with generated scenarios at each concurrency level.
+Reports throughput and per-stage p50/p95/p99 from the trace. Every level runs in its own
+temporary working directory, so transcripts, caches and the post-processing journal start empty.
+
+Phone time (ringing, the call itself, recording processing) is compressed by --time-scale;
+API latencies and failure rates come from the simulator profile. Throughput is the campaign's
+(calls placed and waited on); post-processing shows up in the postprocess stage.
+
+Usage: python benchmarks/bench_load.py [--levels 1,10,100] [--calls N] [--time-scale 0.02]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.simulator import Simulator, ACCOUNT_SID
+from src.generator import iter_scenarios
+from src.tracing import get_tracer, stage_stats, print_stage_stats
+import main as voice_bot
+
+
+def run_level(simulator, concurrency, calls, seed):
+    tracer = get_tracer()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        trace_file = os.path.join(tmp, 'traces.jsonl')
+        tracer.enable(trace_file)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                summary = voice_bot.run_all_scenarios(
+                    concurrency=concurrency,
+                    calls_per_minute=1e9,
+                    post_workers=max(2, concurrency // 4),
+                    scenarios=iter_scenarios(seed, calls),
+                    total=calls
+                )
+        finally:
+            tracer.close()
+            os.chdir(ROOT)
+        return summary, stage_stats(trace_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark against the local simulator")
+    parser.add_argument("--levels", default="1,10,100", help="comma-separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=None,
+                        help="calls per level (default: 3x the concurrency, at least 10)")
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="real seconds per simulated second of phone time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # A fresh rate-limit bucket - the campaign's limiter is shared per account
+    os.environ['TWILIO_ACCOUNT_SID'] = ACCOUNT_SID
+    simulator = Simulator(time_scale=args.time_scale, fixture_dir=os.path.join(ROOT, 'transcripts'),
+                          seed=args.seed).install()
+
+    results = []
+    try:
+        for level in (int(l) for l in args.levels.split(',')):
+            calls = args.calls or max(10, 3 * level)
+            summary, stats = run_level(simulator, level, calls, args.seed)
+            results.append((level, summary))
+            print(f"\nconcurrency {level}: {summary['calls']} calls, {summary['failed']} failed, "
+                  f"{summary['wall_time']:.1f}s, {summary['calls_per_hour']:.0f} calls/hour")
+            print_stage_stats(stats)
+    finally:
+        simulator.uninstall()
+
+    print(f"\n{'concurrency':>11s} {'calls':>6s} {'failed':>7s} {'wall s':>8s} {'calls/hour':>11s} {'p50 call s':>11s}")
+    for level, summary in results:
+        print(f"{level:11d} {summary['calls']:6d} {summary['failed']:7d} {summary['wall_time']:8.1f} "
+              f"{summary['calls_per_hour']:11.0f} {summary['p50_call_time']:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
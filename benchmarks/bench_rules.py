@@ -0,0 +1,239 @@
+"""
+Benchmark: bug analysis on a large synthetic transcript corpus
+
+Compares the original analyze_for_bugs (one loop per hard-coded check, lowercasing
+every message again in each) with the compiled rule engine in src/bug_rules.py
+(each conversation lowercased and scanned once for the rules' trigger phrases), with
+the 7 built-in rules and with extra synthetic rules added, since the old style costs
+one more pass over every message per check. Each is run on a mostly clean corpus and
+on one where a tenth of the agent's lines trip a rule.
+
+Usage: python benchmarks/bench_rules.py [transcripts]   (default 100000)
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bug_rules import RuleEngine, BUG_RULES
+
+AGENT_LINES = [
+    "Thank you for calling, how can I help you today?",
+    "Can I get your full name please?",
+    "Let me check our availability for you.",
+    "I can help you with that.",
+    "Is there anything else I can help you with?",
+    "One moment while I pull up your record.",
+    "Could you spell your last name for me?",
+    "Your appointment is confirmed.",
+    "We'll send you a text reminder the day before.",
+    "Have a great day!",
+]
+# Lines that trip a rule; each agent turn uses one with probability bug_rate
+BUG_LINES = [
+    "I have an opening at 2 PM on Tuesday or 2 PM on Thursday.",
+    "I didn't quite catch that, could you repeat it?",
+    "Our office hours are Monday through Sunday, 8 to 5.",
+    "The next available appointment is in two weeks.",
+    "I'm not seeing any upcoming appointments, can I have your date of birth?",
+    "I've sent the metformin refill to your pharmacy.",
+]
+BUG_LINE_RATES = (0.01, 0.1)
+PATIENT_LINES = [
+    "Hi, I need a refill of lisinopril.",
+    "March 15, 1990.",
+    "Yes, that's correct.",
+    "Is this the veterinary clinic?",
+    "Thank you!",
+]
+
+
+def synthetic_corpus(size, bug_rate, distinct=1000, seed=0):
+    """`size` transcripts, cycling through `distinct` generated ones to keep memory flat"""
+    rng = random.Random(seed)
+    pool = []
+    for i in range(distinct):
+        conversation = []
+        for _ in range(rng.randint(6, 20)):
+            conversation.append({"speaker": "patient", "message": rng.choice(PATIENT_LINES)})
+            lines = BUG_LINES if rng.random() < bug_rate else AGENT_LINES
+            conversation.append({"speaker": "agent", "message": rng.choice(lines)})
+        pool.append({"scenario_id": rng.randint(1, 10), "scenario_name": f"Scenario {i}",
+                     "conversation": conversation})
+    return [pool[i % distinct] for i in range(size)]
+
+
+def legacy_analyze(transcripts):
+    """The original analyze_for_bugs, verbatim"""
+    bugs = []
+    
+    for transcript in transcripts:
+        scenario_id = transcript['scenario_id']
+        scenario_name = transcript['scenario_name']
+        conversation = transcript['conversation']
+        
+        # Bug 1: Duplicate time slots offered
+        for msg in conversation:
+            if msg['speaker'] == 'agent' and '2 PM' in msg['message']:
+                if msg['message'].count('2 PM') > 1:
+                    bugs.append({
+                        'scenario': scenario_name,
+                        'type': 'Logic Error',
+                        'severity': 'High',
+                        'description': 'Agent offered the same time slot twice (2 PM and 2 PM)',
+                        'evidence': msg['message'],
+                        'impact': 'Confuses patients and makes scheduling impossible'
+                    })
+        
+        # Bug 2: Wrong medication hallucination
+        for i, msg in enumerate(conversation):
+            if msg['speaker'] == 'agent' and 'metformin' in msg['message'].lower():
+                if i > 0 and 'lisinopril' in conversation[i-1]['message'].lower():
+                    bugs.append({
+                        'scenario': scenario_name,
+                        'type': 'Hallucination',
+                        'severity': 'Critical',
+                        'description': 'Agent hallucinated wrong medication - patient asked for lisinopril (blood pressure) but agent mentioned metformin (diabetes)',
+                        'evidence': f"Patient: {conversation[i-1]['message']}\nAgent: {msg['message']}",
+                        'impact': 'Could lead to dangerous medication errors'
+                    })
+        
+        # Bug 3: Poor urgency handling
+        if scenario_id == 6:  # Urgent appointment scenario
+            for msg in conversation:
+                if msg['speaker'] == 'agent' and 'two weeks' in msg['message'].lower():
+                    bugs.append({
+                        'scenario': scenario_name,
+                        'type': 'Inappropriate Response',
+                        'severity': 'High',
+                        'description': 'Agent offered appointment 2 weeks out for urgent care request',
+                        'evidence': msg['message'],
+                        'impact': 'Patient with urgent medical need is not properly triaged'
+                    })
+        
+        # Bug 4: Asks for unnecessary information
+        if scenario_id == 3:  # Rescheduling scenario
+            for msg in conversation:
+                if msg['speaker'] == 'agent' and 'date of birth' in msg['message'].lower():
+                    if 'not seeing any upcoming' in msg['message'].lower():
+                        bugs.append({
+                            'scenario': scenario_name,
+                            'type': 'Data Retrieval Failure',
+                            'severity': 'Medium',
+                            'description': 'Agent unable to find existing appointment for rescheduling',
+                            'evidence': msg['message'],
+                            'impact': 'Creates friction for legitimate rescheduling requests'
+                        })
+        
+        # Bug 5: Inconsistent office hours
+        for msg in conversation:
+            if msg['speaker'] == 'agent' and 'office hours' in msg['message'].lower():
+                if 'sunday' in msg['message'].lower():
+                    bugs.append({
+                        'scenario': scenario_name,
+                        'type': 'Information Accuracy',
+                        'severity': 'Medium',
+                        'description': 'Agent claims office is open on Sundays (unusual for medical office)',
+                        'evidence': msg['message'],
+                        'impact': 'Patient may show up when office is actually closed'
+                    })
+        
+        # Bug 6: Doesn't recognize wrong office type
+        if scenario_id == 10:  # Wrong number scenario
+            recognized_error = False
+            for msg in conversation:
+                if msg['speaker'] == 'agent':
+                    if 'veterinary' in msg['message'].lower() or 'wrong' in msg['message'].lower():
+                        recognized_error = True
+            
+            if not recognized_error:
+                bugs.append({
+                    'scenario': scenario_name,
+                    'type': 'Context Understanding Failure',
+                    'severity': 'Medium',
+                    'description': 'Agent failed to recognize caller was looking for veterinary clinic, not human medical office',
+                    'evidence': 'Agent proceeded with appointment scheduling despite clear mismatch',
+                    'impact': 'Wastes time for both caller and office'
+                })
+        
+        # Bug 7: Repetitive "didn't catch that"
+        repeat_count = sum(1 for msg in conversation if msg['speaker'] == 'agent' and 'didn\'t quite catch' in msg['message'].lower())
+        if repeat_count >= 3:
+            bugs.append({
+                'scenario': scenario_name,
+                'type': 'Poor Conversation Flow',
+                'severity': 'Medium',
+                'description': f'Agent asked patient to repeat themselves {repeat_count} times in one call',
+                'evidence': f'{repeat_count} instances of "I didn\'t quite catch that"',
+                'impact': 'Frustrating user experience, suggests poor speech recognition'
+            })
+    
+    return bugs
+
+
+def extra_rules(count):
+    """`count` additional message rules, as if more checks had been added over time"""
+    topics = ["refund", "transfer", "voicemail", "emergency", "prescription", "pharmacy", "copay", "deductible",
+              "referral", "specialist", "x-ray", "lab results", "vaccine", "flu shot", "telehealth", "portal",
+              "password", "fax", "parking", "interpreter"]
+    outcomes = ["denied", "unavailable", "closed", "not covered"]
+    return [{
+        "name": f"extra_{i}",
+        "speaker": "agent",
+        "all": [f"{topics[i % len(topics)]} {outcomes[i // len(topics) % len(outcomes)]}"],
+        "scope": "message",
+        "type": "Synthetic",
+        "severity": "Medium",
+        "description": "Synthetic rule",
+        "evidence": "{message}",
+        "impact": "None"
+    } for i in range(count)]
+
+
+def legacy_with_extra(transcripts, rules):
+    """The original style: one more loop over every message for each added check"""
+    bugs = legacy_analyze(transcripts)
+    phrases = [rule['all'][0] for rule in rules]
+    for transcript in transcripts:
+        for phrase in phrases:
+            for msg in transcript['conversation']:
+                if msg['speaker'] == 'agent' and phrase in msg['message'].lower():
+                    bugs.append({'scenario': transcript['scenario_name'], 'evidence': msg['message']})
+    return bugs
+
+
+def engine_analyze(engine, transcripts):
+    bugs = []
+    for transcript in transcripts:
+        bugs.extend(engine.analyze(transcript))
+    return bugs
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{'bug lines':>9s} {'rules':>6s} {'legacy s':>9s} {'engine s':>9s} {'speedup':>8s} {'findings':>9s}")
+
+    for bug_rate in BUG_LINE_RATES:
+        corpus = synthetic_corpus(size, bug_rate)
+        for extra in (0, 20, 60):
+            rules = extra_rules(extra)
+            legacy_time, legacy = timed(legacy_with_extra, corpus, rules)
+            engine_time, compiled = timed(engine_analyze, RuleEngine(BUG_RULES + rules), corpus)
+            assert len(legacy) == len(compiled)
+            print(f"{bug_rate:9.0%} {len(BUG_RULES) + extra:6d} {legacy_time:9.2f} {engine_time:9.2f} "
+                  f"{legacy_time / engine_time:7.2f}x {len(compiled):9d}")
+    messages = sum(len(t['conversation']) for t in corpus)
+    print(f"{size} transcripts per corpus, {messages} messages")
+
+
+if __name__ == "__main__":
+    main()
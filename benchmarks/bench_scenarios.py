@@ -0,0 +1,95 @@
+"""
+Benchmark: scenario loading and per-call script build time
+
+Writes N synthetic scenarios to a temporary scenario directory, then measures
+startup (load + validate + compile every template) and the per-call cost of
+building a call's TwiML: the old per-call rendering vs the compiled template,
+with default pauses and with learned (non-default) pauses.
+
+Usage: python benchmarks/bench_scenarios.py [N ...]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scenarios import load_scenarios, ScriptTemplate, default_pauses
+
+LINES = [
+    "Hi, I'd like to schedule an appointment.",
+    "March 15, 1990.",
+    "Yes, that's correct.",
+    "Lisinopril for blood pressure.",
+    "The earliest available time works for me.",
+    "Thank you!",
+]
+
+
+def write_scenarios(directory, count, per_file=500, seed=0):
+    rng = random.Random(seed)
+    for first in range(0, count, per_file):
+        batch = [{
+            "id": i + 1,
+            "name": f"Generated scenario {i + 1}",
+            "persona": f"Patient {i + 1}",
+            "goal": "Benchmark",
+            "initial_message": rng.choice(LINES),
+            "context": "Synthetic",
+            "script": [rng.choice(LINES) for _ in range(rng.randint(2, 8))]
+        } for i in range(first, min(first + per_file, count))]
+        with open(os.path.join(directory, f"generated_{first:07d}.json"), 'w') as f:
+            json.dump(batch, f)
+
+
+def legacy_build(script):
+    """The old _plan_call_timeline + _render_twiml, run for every call"""
+    pauses = default_pauses(len(script))
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<Response>', f'<Pause length="{pauses[0]}"/>']
+    for message, pause in zip(script, pauses[1:]):
+        parts.append(f'<Say voice="Polly.Joanna" rate="90%">{message}</Say>')
+        parts.append(f'<Pause length="{pause}"/>')
+    parts += ['<Pause length="4"/>', '<Say voice="Polly.Joanna" rate="90%">Goodbye.</Say>',
+              '<Pause length="3"/>', '<Hangup/>', '</Response>']
+    return '\n'.join(parts)
+
+
+def per_call_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 1000, 10000]
+
+    print(f"{'scenarios':>10s} {'startup ms':>11s} {'lookup us':>10s} {'legacy us':>10s} "
+          f"{'template us':>12s} {'learned us':>11s}")
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            write_scenarios(directory, count)
+
+            start = time.perf_counter()
+            scenarios = load_scenarios(directory)
+            by_id = {s['id']: s for s in scenarios}
+            templates = {s['id']: ScriptTemplate(s['script']) for s in scenarios}
+            startup = time.perf_counter() - start
+
+        ids = [s['id'] for s in scenarios] * max(1, 10000 // count)
+        lookup = per_call_us(lambda i: by_id[i], ids)
+        linear = per_call_us(lambda i: next(s for s in scenarios if s['id'] == i), ids[::max(1, len(ids) // 2000)])
+        legacy = per_call_us(lambda i: legacy_build(by_id[i]['script']), ids)
+        compiled = per_call_us(lambda i: templates[i].render(), ids)
+        learned = per_call_us(lambda i: templates[i].render([p - 1 for p in templates[i].default_pauses]), ids)
+
+        print(f"{count:10d} {startup * 1000:11.1f} {lookup:10.2f} {legacy:10.2f} {compiled:12.2f} {learned:11.2f}"
+              f"   (linear scan lookup: {linear:.2f} us)")
+
+
+if __name__ == "__main__":
+    main()
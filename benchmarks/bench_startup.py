@@ -0,0 +1,102 @@
+"""
+Benchmark: cold-start cost of main.py
+
+Times `import main` and a full `main.py all --dry-run` in fresh interpreters, lists the
+slowest top-level imports (python -X importtime), and checks that importing main pulls in
+no network SDK and doesn't read .env. With --budget-ms it exits non-zero when the median
+import time is over budget or an SDK was imported, so CI can catch cold-start regressions.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--budget-ms 150]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import NETWORK_SDKS
+
+# Not network SDKs, but importing main shouldn't load them either
+EAGER_MODULES = NETWORK_SDKS + ('dotenv',)
+
+
+def timed_run(args, runs):
+    """Wall time of each of `runs` fresh interpreter runs, in ms"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def slowest_imports(count=10):
+    """(cumulative us, module) for the slowest modules imported directly by main"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                            check=True, capture_output=True, text=True)
+    # Children are printed before their parent: main's direct imports are the one-level-deep
+    # lines since the previous top-level line
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        if not name.startswith('  '):
+            if name.strip() == 'main':
+                return sorted(rows, reverse=True)[:count]
+            rows = []
+        elif not name.startswith('    '):
+            rows.append((int(parts[1]), name.strip()))
+    return []
+
+
+def eager_modules():
+    code = f"import sys, main; print(','.join(m for m in {EAGER_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return [m for m in result.stdout.strip().split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for main.py")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail if the median `import main` time exceeds this")
+    args = parser.parse_args()
+
+    baseline = timed_run(['-c', 'pass'], args.runs)
+    imports = timed_run(['-c', 'import main'], args.runs)
+    dry_run = timed_run(['main.py', 'all', '--dry-run'], args.runs)
+
+    print(f"{'':28s} {'median ms':>10s} {'min ms':>8s}")
+    for label, times in (("python -c pass", baseline), ("import main", imports),
+                         ("main.py all --dry-run", dry_run)):
+        print(f"{label:28s} {statistics.median(times):10.1f} {min(times):8.1f}")
+    import_cost = statistics.median(imports) - statistics.median(baseline)
+    print(f"\nimport main over a bare interpreter: {import_cost:.1f} ms")
+
+    print("\nSlowest direct imports of main (cumulative):")
+    for micros, name in slowest_imports():
+        print(f"   {micros / 1000:7.1f} ms  {name}")
+
+    eager = eager_modules()
+    if eager:
+        print(f"\n❌ import main loaded: {', '.join(eager)}")
+    else:
+        print("\n✅ import main loads no network SDK and doesn't read .env")
+
+    over_budget = args.budget_ms is not None and statistics.median(imports) > args.budget_ms
+    if over_budget:
+        print(f"❌ median import time {statistics.median(imports):.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if args.budget_ms is not None and (over_budget or eager):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: cost of a tracing span
+
+Times the same tiny stage body bare, inside a span with tracing disabled (the default),
+and inside a span with tracing enabled (JSONL write + histogram update), then prints
+the per-stage table `python main.py stats` shows for the spans written.
+
+Usage: python benchmarks/bench_tracing.py [spans]   (default 200000)
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tracing import Tracer, stage_stats, print_stage_stats
+
+
+def stage(i):
+    return i * 2
+
+
+def bare(tracer, n):
+    for i in range(n):
+        stage(i)
+
+
+def spanned(tracer, n):
+    for i in range(n):
+        with tracer.span('twiml.build', scenario_id=i % 10):
+            stage(i)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_file = os.path.join(tmp, 'traces.jsonl')
+        disabled = Tracer(trace_file)
+        enabled = Tracer(trace_file, enabled=True)
+
+        base = timed(bare, disabled, n)
+        print(f"{n} spans")
+        print(f"{'mode':10s} {'total s':>8s} {'per span us':>12s}")
+        print(f"{'bare':10s} {base:8.3f} {'-':>12s}")
+        for mode, tracer in (('disabled', disabled), ('enabled', enabled)):
+            elapsed = timed(spanned, tracer, n)
+            print(f"{mode:10s} {elapsed:8.3f} {(elapsed - base) / n * 1e6:12.2f}")
+        enabled.close()
+
+        print_stage_stats(stage_stats(trace_file))
+
+
+if __name__ == "__main__":
+    main()
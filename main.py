@@ -2,75 +2,412 @@
 Main entry point for the voice bot challenge
 """
 
+import os
 import sys
-from src.scenarios import get_scenario, get_all_scenarios
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+from src.scenarios import get_scenario, get_all_scenarios, get_script_template, VOICE
+from src.generator import iter_scenarios
 from src.bot import VoiceBot
-from src.call_handler import CallHandler
+from src.call_handler import CallHandler, plan_pauses
+from src.clients import load_env
+from src.campaign import CampaignRunner, print_campaign_report, PER_CALL_REPORT_LIMIT
+from src.callbacks import get_callback_server
+from src.postprocess import PostProcessor
+from src.timing import TimingModel, print_timing_report
+from src.tts import get_tts_cache, print_tts_cache_report
+from src.tracing import get_tracer, start_metrics_server, stage_stats, print_stage_stats
+from src.job_queue import JobQueue, Lease, QueueRateLimiter, upload_transcript, LEASE_SECONDS
 
-def run_single_call(scenario_id):
-    """Run a single call with specified scenario"""
-    scenario = get_scenario(scenario_id)
+# Modules a dry run must never import - none of them is needed to build a script
+NETWORK_SDKS = ('twilio', 'openai', 'anthropic', 'groq', 'requests', 'httpx', 'flask', 'elevenlabs')
+
+def run_single_call(scenario_id, postprocessor=None, interactive=False, timing_model=None,
+                    tts_cache=None):
+    """
+    Run a single call with specified scenario (scripted, or live with --interactive)
+    scenario_id may also be a scenario dict, e.g. a generated variant
+    """
+    scenario = scenario_id if isinstance(scenario_id, dict) else get_scenario(scenario_id)
     
     print(f"\n🤖 Initializing bot for scenario: {scenario['name']}")
     
     # Create bot with scenario
     bot = VoiceBot(scenario)
     
-    # Create call handler
-    call_handler = CallHandler()
+    # Create call handler (uses status callbacks when PUBLIC_BASE_URL is set)
+    call_handler = CallHandler(callback_server=get_callback_server(), postprocessor=postprocessor,
+                               timing_model=timing_model, tts_cache=tts_cache)
     
     # Make the call
-    call_sid = call_handler.make_call(bot, scenario)
+    if interactive:
+        from src.interactive import get_media_stream_server
+        call_sid = call_handler.make_interactive_call(bot, scenario, get_media_stream_server())
+    else:
+        call_sid = call_handler.make_call(bot, scenario)
     
     if call_sid:
         print(f"\n✅ Call completed successfully!")
         print(f"Call SID: {call_sid}")
     else:
         print(f"\n❌ Call failed")
+    
+    return call_sid
 
-def run_all_scenarios():
-    """Run calls for all scenarios"""
-    scenarios = get_all_scenarios()
+def run_all_scenarios(concurrency=1, calls_per_minute=4, post_workers=2, timing_model=None,
+                      tts_cache=None, scenarios=None, total=None):
+    """
+    Run calls for all scenarios, `concurrency` at a time.
+    Recordings are transcribed by `post_workers` background workers while dialing continues.
+    `scenarios` may be any iterable (e.g. a generator of variants); it is consumed lazily.
+    """
+    if scenarios is None:
+        scenarios = get_all_scenarios()
+        total = len(scenarios)
     
-    print(f"\n🚀 Running {len(scenarios)} scenarios...")
+    print(f"\n🚀 Running {total or 'streamed'} scenarios ({concurrency} at a time, "
+          f"max {calls_per_minute} calls/minute)...")
     
-    for i, scenario in enumerate(scenarios, 1):
-        print(f"\n{'='*60}")
-        print(f"SCENARIO {i}/{len(scenarios)}")
-        print(f"{'='*60}")
-        run_single_call(scenario['id'])
-        
-        # Wait between calls to avoid rate limits and ensure recordings are ready
-        if i < len(scenarios):
-            import time
-            print(f"\n⏳ Waiting 15 seconds before next call...")
-            time.sleep(15)
+    postprocessor = PostProcessor(CallHandler, workers=post_workers,
+                                  max_queue=max(2, concurrency * 2)).start()
+    
+    if tts_cache:
+        tts_cache.reset_stats()
+    
+    runner = CampaignRunner(
+        lambda scenario: run_single_call(scenario, postprocessor=postprocessor,
+                                         timing_model=timing_model, tts_cache=tts_cache),
+        concurrency=concurrency,
+        calls_per_minute=calls_per_minute
+    )
+    try:
+        summary = runner.run(scenarios)
+        print("\n⏳ Waiting for post-processing to finish...")
+        postprocessor.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted - unfinished recordings stay queued for the next run")
+        postprocessor.shutdown(wait=False)
+        raise
     
     print(f"\n{'='*60}")
-    print(f"✅ ALL {len(scenarios)} SCENARIOS COMPLETED!")
+    print(f"✅ ALL {summary['calls']} SCENARIOS COMPLETED!")
     print(f"{'='*60}")
+    print_campaign_report(summary)
+    if timing_model:
+        print_timing_report(timing_model.report())
+    if tts_cache:
+        print_tts_cache_report(tts_cache.stats())
     print(f"\n💾 Check transcripts/ folder for all call recordings")
+    
+    return summary
+
+def run_coordinator(queue_path, scenarios, poll_interval=10):
+    """
+    Enqueue a campaign on the shared job queue and follow it until every job is done or failed.
+    Calls are placed by workers (`python main.py worker`) on any host that can reach the queue.
+    """
+    queue = JobQueue(queue_path)
+    campaign, total = queue.enqueue(scenarios)
+    print(f"\n📋 Campaign {campaign}: {total} jobs queued in {queue_path}")
+    print("   Start workers with: python main.py worker --queue <same path> --store <shared dir>")
+    
+    start = time.monotonic()
+    last = None
+    while True:
+        reclaimed = queue.reclaim_expired()
+        if reclaimed:
+            print(f"   ♻️  Requeued {reclaimed} job(s) whose worker stopped heartbeating")
+        counts = queue.counts(campaign)
+        if counts != last:
+            print(f"   queued {counts['queued']}, running {counts['leased']}, "
+                  f"done {counts['done']}, failed {counts['failed']}")
+            last = counts
+        if counts['queued'] + counts['leased'] == 0:
+            break
+        time.sleep(poll_interval)
+    
+    wall_time = time.monotonic() - start
+    print(f"\n{'='*60}")
+    print("📊 DISTRIBUTED CAMPAIGN REPORT")
+    print(f"{'='*60}")
+    print(f"Jobs: {total} ({counts['done']} done, {counts['failed']} failed)")
+    print(f"Wall time: {wall_time:.1f}s")
+    print(f"Throughput: {counts['done'] / wall_time * 3600 if wall_time else 0.0:.1f} calls/hour")
+    print("\nPer worker:")
+    for worker, done in sorted(queue.worker_summary(campaign).items()):
+        print(f"   {worker}: {done} call(s)")
+    for job_id, name, attempts, error in queue.failures(campaign)[:PER_CALL_REPORT_LIMIT]:
+        print(f"   ❌ job {job_id} {name}: {error} after {attempts} attempt(s)")
+    return counts
+
+def run_worker(queue_path, store_dir=None, concurrency=1, calls_per_minute=4, timing_model=None,
+               tts_cache=None, lease_seconds=LEASE_SECONDS, poll_interval=5):
+    """
+    Claim jobs from the shared queue and run them, `concurrency` calls at a time.
+    Each call runs under a lease kept alive by heartbeats; if this process dies, the lease expires
+    and another worker re-runs the job. Finished transcripts (and recordings) are copied to `store_dir`.
+    calls_per_minute is the account's rate across all workers - dial slots are booked in the queue.
+    Returns once no job is queued or running anywhere.
+    """
+    queue = JobQueue(queue_path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+    rate_limiter = QueueRateLimiter(queue, os.getenv('TWILIO_ACCOUNT_SID') or 'default', calls_per_minute)
+    callback_server = get_callback_server()
+    completed = []
+    
+    print(f"\n👷 Worker {worker_id}: {concurrency} call slot(s) on {queue_path}")
+    
+    def run_job(call_handler, job):
+        scenario = job['scenario']
+        print(f"\n▶️  Job {job['id']} (attempt {job['attempt']}): #{scenario['id']} {scenario['name']}")
+        with Lease(queue, job, worker_id, lease_seconds):
+            rate_limiter.acquire()
+            call_sid = call_handler.make_call(VoiceBot(scenario), scenario)
+            stored = None
+            if call_sid and call_handler.transcript_path and store_dir:
+                try:
+                    stored = upload_transcript(call_handler.transcript_path, call_handler.call_id, store_dir,
+                                               call_handler.recordings_dir)
+                except OSError as e:
+                    # The call still happened - keep the local transcript rather than re-running it
+                    print(f"   ⚠️  Upload to {store_dir} failed, transcript kept locally: {e}")
+        
+        if not call_sid:
+            queue.fail(job['id'], worker_id, "call failed")
+            return
+        try:
+            done = queue.complete(job['id'], worker_id, call_sid, stored or call_handler.transcript_path)
+        except sqlite3.Error as e:
+            # Failing the job now would re-run a call that happened; its lease runs out instead
+            print(f"   ⚠️  Couldn't mark job {job['id']} done ({e}) - it may be re-run once its lease expires")
+            return
+        if done:
+            completed.append(job['id'])
+        else:
+            print(f"   ⚠️  Job {job['id']} finished after its lease was reclaimed - kept the transcript anyway")
+    
+    def work_loop():
+        # CallHandler keeps per-call state, so every slot gets its own
+        call_handler = CallHandler(callback_server=callback_server, timing_model=timing_model,
+                                   tts_cache=tts_cache)
+        while True:
+            try:
+                job = queue.claim(worker_id, lease_seconds)
+                if job is None:
+                    if queue.unfinished() == 0:
+                        return
+                    # Other workers still hold leases - stay around in case one of them dies
+                    time.sleep(poll_interval)
+                    continue
+            except sqlite3.Error as e:
+                # Shared storage is busy or briefly unreachable ("database is locked") - try again
+                print(f"   ⚠️  Job queue unavailable ({e}) - retrying in {poll_interval}s")
+                time.sleep(poll_interval)
+                continue
+            
+            try:
+                run_job(call_handler, job)
+            except Exception as e:
+                # One bad job must not take the slot down with it
+                print(f"   ❌ Job {job['id']} failed: {type(e).__name__}: {e}")
+                try:
+                    queue.fail(job['id'], worker_id, f"{type(e).__name__}: {e}")
+                except sqlite3.Error as queue_error:
+                    print(f"   ⚠️  Couldn't mark job {job['id']} failed ({queue_error}) - "
+                          f"it is requeued once its lease expires")
+    
+    threads = [threading.Thread(target=work_loop) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    print(f"\n✅ Worker {worker_id} finished: {len(completed)} call(s) completed")
+    return completed
+
+def dry_run(scenarios, timing_model=None, total=None):
+    """
+    Build every call's script and TwiML exactly as a campaign would, without placing calls.
+    Nothing here touches the network, so no SDK gets imported.
+    """
+    print(f"\n🧪 Dry run: building {total or 'streamed'} scenario scripts (no calls are placed)")
+    start = time.perf_counter()
+    built = lines = twiml_bytes = 0
+    rows = []
+    for scenario in scenarios:
+        template = get_script_template(scenario)
+        pauses = plan_pauses(template, scenario, timing_model)
+        twiml = template.render(pauses)
+        built += 1
+        lines += len(template.lines)
+        twiml_bytes += len(twiml)
+        if len(rows) < PER_CALL_REPORT_LIMIT:
+            rows.append((scenario['id'], scenario['name'], len(template.lines), sum(pauses), len(twiml)))
+    elapsed = time.perf_counter() - start
+    
+    for scenario_id, name, line_count, pause_seconds, size in rows:
+        print(f"   #{scenario_id} {name}: {line_count} lines, {pause_seconds}s of pauses, {size} bytes of TwiML")
+    if built > len(rows):
+        print(f"   ... and {built - len(rows)} more")
+    print(f"\n✅ Built {built} scripts ({lines} lines, {twiml_bytes / 1024:.1f} KB of TwiML) in {elapsed:.3f}s")
+    
+    loaded = [name for name in NETWORK_SDKS if name in sys.modules]
+    if loaded:
+        print(f"⚠️  Network SDKs imported during the dry run: {', '.join(loaded)}")
+    return built
+
+def reprocess_transcripts(transcript_dir='transcripts'):
+    """Rebuild every transcript JSON from cached transcriptions (no network)"""
+    call_handler = CallHandler()
+    rebuilt = skipped = 0
+    
+    for filename in sorted(os.listdir(transcript_dir)):
+        if not (filename.startswith('call_') and filename.endswith('.json')):
+            continue
+        if call_handler.reprocess_transcript(os.path.join(transcript_dir, filename)):
+            rebuilt += 1
+        else:
+            print(f"⏭️  {filename}: no cached transcription for its recording")
+            skipped += 1
+    
+    print(f"\n✅ Rebuilt {rebuilt} transcript(s), skipped {skipped}")
+
+def positive_float(value):
+    """argparse type for --rate: a number above zero"""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Voice bot - medical office testing")
+    parser.add_argument("target", nargs="?", default=None,
+                        help="scenario id, 'all' to run every scenario, 'stats' for per-stage latency, "
+                             "or 'coordinator' / 'worker' for a distributed campaign (with --queue)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of calls to run at once (with 'all')")
+    parser.add_argument("--rate", type=positive_float, default=4,
+                        help="max calls placed per minute on the Twilio account (with 'all', or across all workers)")
+    parser.add_argument("--post-workers", type=int, default=2,
+                        help="background workers transcribing recordings (with 'all')")
+    parser.add_argument("--interactive", action="store_true",
+                        help="real-time call over Twilio Media Streams instead of the fixed script")
+    parser.add_argument("--adaptive-timing", type=float, nargs="?", const=90, default=None,
+                        metavar="PERCENTILE",
+                        help="learn pause lengths from past transcripts, covering this percentile "
+                             "of agent turns (default 90)")
+    parser.add_argument("--generate", type=int, default=None, metavar="N",
+                        help="with 'all', run N generated scenario variants instead of the fixed scenarios")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for --generate (same seed, same variants)")
+    parser.add_argument("--tts-cache", action="store_true",
+                        help="play script lines from pre-rendered cached audio instead of <Say> "
+                             "(needs PUBLIC_BASE_URL)")
+    parser.add_argument("--queue", default=None, metavar="PATH",
+                        help="shared SQLite job queue for 'coordinator' and 'worker' (JOB_QUEUE)")
+    parser.add_argument("--store", default=None, metavar="DIR",
+                        help="shared directory workers copy finished transcripts to (TRANSCRIPT_STORE)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help="seconds a worker's claim on a job lasts without a heartbeat")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="build every scenario's script and TwiML without placing calls or importing SDKs")
+    parser.add_argument("--trace", action="store_true",
+                        help="record per-stage latency spans to the trace file (TRACE_FILE)")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="with --trace, serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--reprocess", action="store_true",
+                        help="rebuild transcript JSONs from cached transcriptions without calling anything")
+    args = parser.parse_args()
+    
     print("="*60)
     print("VOICE BOT - Medical Office Testing")
     print("="*60)
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "all":
-            run_all_scenarios()
+    tracer = get_tracer()
+    if args.target == "stats":
+        # TRACE_FILE may come from .env
+        load_env()
+        print_stage_stats(stage_stats(tracer.trace_file))
+        return
+    
+    if args.dry_run:
+        timing_model = None
+        if args.adaptive_timing is not None:
+            timing_model = TimingModel.from_transcripts(percentile=args.adaptive_timing)
+        if args.target == "all" and args.generate:
+            dry_run(iter_scenarios(args.seed, args.generate), timing_model, total=args.generate)
+        elif args.target in (None, "all"):
+            dry_run(get_all_scenarios(), timing_model, total=len(get_all_scenarios()))
         else:
             try:
-                scenario_id = int(sys.argv[1])
-                run_single_call(scenario_id)
+                dry_run([get_scenario(int(args.target))], timing_model, total=1)
             except ValueError:
-                print("Usage: python main.py [scenario_id|all]")
-    else:
+                print("Usage: python main.py [scenario_id|all] --dry-run")
+        return
+    
+    # Real runs need the API keys - .env is only read now, not on import
+    load_env()
+    if args.trace or os.getenv('TRACING') == '1':
+        tracer.enable()
+    if tracer.enabled:
+        print(f"⏱️  Tracing to {tracer.trace_file}")
+        if args.metrics_port:
+            start_metrics_server(tracer, args.metrics_port)
+    
+    timing_model = None
+    if args.adaptive_timing is not None:
+        timing_model = TimingModel.from_transcripts(percentile=args.adaptive_timing)
+    
+    tts_cache = None
+    if args.tts_cache:
+        if get_callback_server() is None:
+            print("⚠️  --tts-cache needs PUBLIC_BASE_URL to serve the audio - using <Say>")
+        else:
+            tts_cache = get_tts_cache()
+            print(f"🔊 Script lines play in {tts_cache.voice} instead of <Say> {VOICE} - compare results only "
+                  f"between runs with the same voice (recorded as metrics.voice)")
+    
+    queue_path = args.queue or os.getenv('JOB_QUEUE')
+    if args.target in ("coordinator", "worker") and not queue_path:
+        print("❌ A distributed campaign needs a shared queue: --queue PATH (or JOB_QUEUE)")
+        return
+    
+    if args.reprocess:
+        reprocess_transcripts()
+    elif args.target == "coordinator":
+        scenarios = iter_scenarios(args.seed, args.generate) if args.generate else get_all_scenarios()
+        run_coordinator(queue_path, scenarios)
+    elif args.target == "worker":
+        run_worker(queue_path, store_dir=args.store or os.getenv('TRANSCRIPT_STORE'),
+                   concurrency=args.concurrency, calls_per_minute=args.rate,
+                   timing_model=timing_model, tts_cache=tts_cache, lease_seconds=args.lease)
+    elif args.target is None:
         # Default: run first scenario
         print("\nRunning default scenario (ID: 1)")
-        print("Usage: python main.py [scenario_id|all]")
-        run_single_call(1)
+        print("Usage: python main.py [scenario_id|all] [--concurrency N]")
+        run_single_call(1, tts_cache=tts_cache)
+    elif args.target == "all":
+        generated = {}
+        if args.generate:
+            generated = {"scenarios": iter_scenarios(args.seed, args.generate), "total": args.generate}
+        run_all_scenarios(concurrency=args.concurrency, calls_per_minute=args.rate,
+                          post_workers=args.post_workers, timing_model=timing_model,
+                          tts_cache=tts_cache, **generated)
+    else:
+        try:
+            scenario_id = int(args.target)
+        except ValueError:
+            print("Usage: python main.py [scenario_id|all] [--concurrency N]")
+            return
+        run_single_call(scenario_id, interactive=args.interactive, timing_model=timing_model,
+                        tts_cache=tts_cache)
+        if timing_model:
+            print_timing_report(timing_model.report())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,458 @@
+"""
+Compact append-only transcript archive
+Calls are appended to segment files as binary records. Speaker and note values are interned, timestamps are
+integer epoch microseconds, and a sealed segment ends with a footer index, so a reader can mmap it and seek
+straight to one call. export_json() writes the usual per-call JSON files back out.
+
+Segment layout:
+    MAGIC
+    record*            - type (1 byte) + payload length (uint32) + payload
+                         'S': string id (uint32) + utf-8         - interned speaker / note / key shape
+                         'C': one call (see _encode_call)
+    [footer]           - 'F' record: JSON {"strings": [...], "calls": [[call_id, offset, length], ...]}
+    [trailer]          - footer offset (uint64) + END_MAGIC      - only once the segment is sealed
+An unsealed segment (still being appended to, or left by a crash) is read by scanning its records.
+A segment shorter than MAGIC (just created, or its creator crashed first) holds nothing and is skipped.
+"""
+
+import os
+import json
+import mmap
+import struct
+import threading
+from datetime import datetime, timedelta
+
+MAGIC = b'PGTARC1\n'
+END_MAGIC = b'PGTAEND1'
+SEGMENT_BYTES = 64 * 1024 * 1024
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.pgta'
+
+_RECORD = struct.Struct('<cI')
+_TRAILER = struct.Struct('<Q8s')
+_U32 = struct.Struct('<I')
+_TURN = struct.Struct('<IIIq')   # shape id, speaker id, note id, timestamp
+NO_TIMESTAMP = -(2 ** 63)
+NO_STRING = 0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_epoch_us(value):
+    """ISO timestamp -> integer microseconds, or None if it wouldn't round-trip exactly"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        return None
+    micros = (parsed - _EPOCH) // timedelta(microseconds=1)
+    return micros if _from_epoch_us(micros) == value else None
+
+
+def _from_epoch_us(micros):
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _segment_paths(archive_dir):
+    if not os.path.isdir(archive_dir):
+        return []
+    names = sorted(n for n in os.listdir(archive_dir) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(archive_dir, n) for n in names]
+
+
+def _has_records(path):
+    """False for a segment too short to hold even MAGIC"""
+    return os.path.getsize(path) >= len(MAGIC)
+
+
+def _scan_records(buffer, start=len(MAGIC)):
+    """Yield (type, payload offset, payload length) for each complete record from start"""
+    offset = start
+    end = len(buffer)
+    while offset + _RECORD.size <= end:
+        kind, length = _RECORD.unpack_from(buffer, offset)
+        payload = offset + _RECORD.size
+        if payload + length > end:
+            return  # torn record from an interrupted append
+        yield kind, payload, length
+        offset = payload + length
+
+
+class ArchiveSegment:
+    """Read-only, memory-mapped view of one segment"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a transcript archive segment")
+        self.strings = {}
+        self.index = {}
+        self.sealed = self._read_footer()
+        if not self.sealed:
+            self._scan()
+
+    def close(self):
+        self.buffer.close()
+
+    def _read_footer(self):
+        if len(self.buffer) < len(MAGIC) + _TRAILER.size:
+            return False
+        footer_offset, end_magic = _TRAILER.unpack_from(self.buffer, len(self.buffer) - _TRAILER.size)
+        if end_magic != END_MAGIC:
+            return False
+        kind, length = _RECORD.unpack_from(self.buffer, footer_offset)
+        start = footer_offset + _RECORD.size
+        footer = json.loads(bytes(self.buffer[start:start + length]))
+        self.strings = {i: s for i, s in enumerate(footer['strings'], 1)}
+        self.index = {call_id: (offset, length) for call_id, offset, length in footer['calls']}
+        return True
+
+    def _scan(self):
+        for kind, offset, length in _scan_records(self.buffer):
+            if kind == b'S':
+                (string_id,) = _U32.unpack_from(self.buffer, offset)
+                self.strings[string_id] = bytes(self.buffer[offset + 4:offset + length]).decode()
+            elif kind == b'C':
+                self.index[_call_id_at(self.buffer, offset)] = (offset, length)
+
+    def call_ids(self):
+        return list(self.index)
+
+    def header(self, call_id):
+        """Top-level fields of one call without decoding its conversation"""
+        offset, _ = self.index[call_id]
+        (id_length,) = _U32.unpack_from(self.buffer, offset)
+        header_at = offset + 4 + id_length
+        (length,) = _U32.unpack_from(self.buffer, header_at)
+        return json.loads(bytes(self.buffer[header_at + 4:header_at + 4 + length]))
+
+    def get(self, call_id):
+        """Decode one call; nothing else in the segment is touched"""
+        offset, length = self.index[call_id]
+        return _decode_call(memoryview(self.buffer)[offset:offset + length], self.strings)
+
+    def __iter__(self):
+        for call_id in self.index:
+            yield self.get(call_id)
+
+
+def _call_id_at(buffer, offset):
+    (length,) = _U32.unpack_from(buffer, offset)
+    return bytes(buffer[offset + 4:offset + 4 + length]).decode()
+
+
+def _encode_call(transcript, intern):
+    """
+    Payload of a 'C' record:
+        call_id (uint32 length + utf-8)
+        header  (uint32 length + compact JSON of every top-level key; conversation is null, keeping key order)
+        turn count (uint32), then per turn:
+            shape id, speaker id, note id (uint32 each), timestamp (int64 epoch us)
+            message (uint32 length + utf-8)
+            extras  (uint32 length + compact JSON list of the remaining values, in shape order)
+    The shape is the turn's interned key list, so export restores the exact key order.
+    """
+    call_id = transcript['call_id'].encode()
+    header = dict(transcript)
+    conversation = header.get('conversation') or []
+    header['conversation'] = None
+    header_bytes = json.dumps(header, separators=(',', ':')).encode()
+
+    parts = [_U32.pack(len(call_id)), call_id, _U32.pack(len(header_bytes)), header_bytes,
+             _U32.pack(len(conversation))]
+    for turn in conversation:
+        keys = []
+        speaker_id = note_id = NO_STRING
+        timestamp = NO_TIMESTAMP
+        message = b''
+        extras = []
+        for key, value in turn.items():
+            if key == 'speaker' and isinstance(value, str):
+                speaker_id = intern(value)
+                keys.append('$speaker')
+            elif key == 'note' and isinstance(value, str):
+                note_id = intern(value)
+                keys.append('$note')
+            elif key == 'message' and isinstance(value, str):
+                message = value.encode()
+                keys.append('$message')
+            elif key == 'timestamp' and _to_epoch_us(value) is not None:
+                timestamp = _to_epoch_us(value)
+                keys.append('$timestamp')
+            else:
+                keys.append(key)
+                extras.append(value)
+        extras_bytes = json.dumps(extras, separators=(',', ':')).encode() if extras else b''
+        parts += [_TURN.pack(intern(json.dumps(keys)), speaker_id, note_id, timestamp),
+                  _U32.pack(len(message)), message, _U32.pack(len(extras_bytes)), extras_bytes]
+    return b''.join(parts)
+
+
+def _decode_call(view, strings):
+    offset = 0
+
+    def take_bytes():
+        nonlocal offset
+        (length,) = _U32.unpack_from(view, offset)
+        data = view[offset + 4:offset + 4 + length]
+        offset += 4 + length
+        return data
+
+    take_bytes()  # call_id, also in the header
+    transcript = json.loads(bytes(take_bytes()))
+    (turn_count,) = _U32.unpack_from(view, offset)
+    offset += 4
+
+    conversation = []
+    shapes = {}
+    for _ in range(turn_count):
+        shape_id, speaker_id, note_id, timestamp = _TURN.unpack_from(view, offset)
+        offset += _TURN.size
+        message = bytes(take_bytes()).decode()
+        extras_bytes = take_bytes()
+        extras = iter(json.loads(bytes(extras_bytes)) if len(extras_bytes) else ())
+
+        keys = shapes.get(shape_id)
+        if keys is None:
+            keys = shapes[shape_id] = json.loads(strings[shape_id])
+        turn = {}
+        for key in keys:
+            if key == '$speaker':
+                turn['speaker'] = strings[speaker_id]
+            elif key == '$note':
+                turn['note'] = strings[note_id]
+            elif key == '$message':
+                turn['message'] = message
+            elif key == '$timestamp':
+                turn['timestamp'] = _from_epoch_us(timestamp)
+            else:
+                turn[key] = next(extras)
+        conversation.append(turn)
+
+    transcript['conversation'] = conversation
+    return transcript
+
+
+class ArchiveWriter:
+    """
+    Appends calls to the newest segment, sealing it with a footer and starting a new one past segment_bytes.
+    One writer per process; a segment another process is writing to is left alone (flock).
+    """
+
+    def __init__(self, archive_dir='transcripts/archive', segment_bytes=SEGMENT_BYTES):
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def _lock_file(self, f):
+        """Exclusive, non-blocking lock on a segment; True if we got it (or locking isn't available)"""
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _open(self):
+        """Resume the newest unsealed segment if nobody else holds it, else start a new one"""
+        paths = _segment_paths(self.archive_dir)
+        if paths and _has_records(paths[-1]):
+            f = open(paths[-1], 'r+b')
+            if self._lock_file(f):
+                segment = ArchiveSegment(paths[-1])
+                try:
+                    if not segment.sealed and len(segment.buffer) < self.segment_bytes:
+                        end = len(MAGIC)
+                        for _, offset, length in _scan_records(segment.buffer):
+                            end = offset + length
+                        # Drop a torn record left by a crash
+                        f.truncate(end)
+                        f.seek(end)
+                        self.file, self.path = f, paths[-1]
+                        self.strings = {s: i for i, s in segment.strings.items()}
+                        self.index = [[call_id, offset, length] for call_id, (offset, length)
+                                      in segment.index.items()]
+                        return
+                finally:
+                    segment.close()
+            f.close()
+
+        number = int(os.path.basename(paths[-1])[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if paths else 1
+        while True:
+            self.path = os.path.join(self.archive_dir, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+            number += 1
+            try:
+                self.file = open(self.path, 'x+b')
+            except FileExistsError:
+                continue  # another writer created this number first
+            if self._lock_file(self.file):
+                break
+            # Another writer locked it before we could write MAGIC; it stays empty and readers skip it
+            self.file.close()
+        self.file.write(MAGIC)
+        self.file.flush()
+        self.strings = {}
+        self.index = []
+
+    def _intern(self, value, new_strings, pending):
+        """String id for value; a new one goes into new_strings until its 'S' record is written"""
+        string_id = self.strings.get(value) or new_strings.get(value)
+        if string_id is None:
+            string_id = new_strings[value] = len(self.strings) + len(new_strings) + 1
+            data = _U32.pack(string_id) + value.encode()
+            pending.append(_RECORD.pack(b'S', len(data)) + data)
+        return string_id
+
+    def append(self, transcript):
+        """Append one call; returns the segment path it went to"""
+        with self.lock:
+            if self.file is None:
+                self._open()
+            # If encoding raises, nothing was interned: later calls still write the 'S' records they use
+            new_strings = {}
+            pending = []
+            payload = _encode_call(transcript, lambda value: self._intern(value, new_strings, pending))
+
+            self.file.seek(0, os.SEEK_END)
+            for record in pending:
+                self.file.write(record)
+            offset = self.file.tell() + _RECORD.size
+            self.file.write(_RECORD.pack(b'C', len(payload)) + payload)
+            self.file.flush()
+            self.strings.update(new_strings)
+            self.index.append([transcript['call_id'], offset, len(payload)])
+
+            path = self.path
+            if self.file.tell() >= self.segment_bytes:
+                self._seal()
+            return path
+
+    def _seal(self):
+        """Write the footer index and close the segment; it is never written again"""
+        strings = [s for s, _ in sorted(self.strings.items(), key=lambda item: item[1])]
+        footer = json.dumps({"strings": strings, "calls": self.index}, separators=(',', ':')).encode()
+        self.file.seek(0, os.SEEK_END)
+        footer_offset = self.file.tell()
+        self.file.write(_RECORD.pack(b'F', len(footer)) + footer)
+        self.file.write(_TRAILER.pack(footer_offset, END_MAGIC))
+        self.file.close()
+        self.file = None
+
+    def close(self, seal=False):
+        """Release the segment; seal=True also writes its footer (otherwise it is resumed next time)"""
+        with self.lock:
+            if self.file is None:
+                return
+            if seal:
+                self._seal()
+            else:
+                self.file.close()
+                self.file = None
+
+
+class ArchiveReader:
+    """All segments of an archive"""
+
+    def __init__(self, archive_dir='transcripts/archive'):
+        self.segments = [ArchiveSegment(path) for path in _segment_paths(archive_dir) if _has_records(path)]
+        self.locations = {}
+        for segment in self.segments:
+            for call_id in segment.index:
+                self.locations[call_id] = segment
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.locations)
+
+    def call_ids(self):
+        return list(self.locations)
+
+    def header(self, call_id):
+        return self.locations[call_id].header(call_id)
+
+    def get(self, call_id):
+        return self.locations[call_id].get(call_id)
+
+    def __iter__(self):
+        for segment in self.segments:
+            yield from segment
+
+
+_archive_writer = None
+_archive_writer_lock = threading.Lock()
+
+
+def get_archive_writer():
+    """Shared writer for TRANSCRIPT_ARCHIVE_DIR (default transcripts/archive)"""
+    global _archive_writer
+    with _archive_writer_lock:
+        if _archive_writer is None:
+            _archive_writer = ArchiveWriter(os.getenv('TRANSCRIPT_ARCHIVE_DIR', 'transcripts/archive'))
+        return _archive_writer
+
+
+def export_json(archive_dir, output_dir):
+    """Write every archived call back out as transcripts/{call_id}.json, in the usual layout"""
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    with ArchiveReader(archive_dir) as reader:
+        for transcript in reader:
+            with open(os.path.join(output_dir, f"{transcript['call_id']}.json"), 'w') as f:
+                json.dump(transcript, f, indent=2)
+            count += 1
+    return count
+
+
+def pack_json(transcript_dir, archive_dir):
+    """Append every call_*.json in transcript_dir to the archive (files are left in place)"""
+    writer = ArchiveWriter(archive_dir)
+    count = 0
+    for filename in sorted(os.listdir(transcript_dir)):
+        if filename.startswith('call_') and filename.endswith('.json'):
+            with open(os.path.join(transcript_dir, filename), 'r') as f:
+                writer.append(json.load(f))
+            count += 1
+    writer.close(seal=True)
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcript archive tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write archived calls back out as JSON files")
+    export.add_argument("archive_dir", nargs="?", default="transcripts/archive")
+    export.add_argument("output_dir", nargs="?", default="transcripts")
+    pack = sub.add_parser("pack", help="append existing JSON transcripts to the archive")
+    pack.add_argument("transcript_dir", nargs="?", default="transcripts")
+    pack.add_argument("archive_dir", nargs="?", default="transcripts/archive")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"✅ Exported {export_json(args.archive_dir, args.output_dir)} call(s) to {args.output_dir}")
+    else:
+        print(f"✅ Packed {pack_json(args.transcript_dir, args.archive_dir)} call(s) into {args.archive_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Pluggable speech-to-text backends
+Every backend returns Whisper verbose_json-shaped dicts: {"text", "duration", "segments": [{"start", "end", "text"}]}
+"""
+
+import os
+import importlib.util
+
+from src.clients import get_groq_client
+
+
+class TranscriptionBackend:
+    """Base class - subclasses set name/model and implement transcribe()"""
+    name = None
+    model = None
+    response_format = "verbose_json"
+
+    def transcribe(self, audio_path):
+        raise NotImplementedError
+
+
+class GroqBackend(TranscriptionBackend):
+    """Remote Groq Whisper (free tier)"""
+    name = "groq"
+    model = "whisper-large-v3-turbo"
+
+    def transcribe(self, audio_path):
+        from src.transcription_cache import transcript_to_dict
+
+        with open(audio_path, 'rb') as audio:
+            transcript = get_groq_client().audio.transcriptions.create(
+                model=self.model,
+                file=audio,
+                response_format=self.response_format
+            )
+        return transcript_to_dict(transcript)
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Offline CPU Whisper via faster-whisper (pip install -r requirements-local.txt).
+    The model is loaded once per backend instance, i.e. once per worker process.
+    """
+    name = "local"
+    requirements = ('faster_whisper', 'numpy')
+
+    def __init__(self, model_size=None, cpu_threads=0):
+        # Fail here, with the fix, rather than in every worker process once transcription starts
+        missing = [module for module in self.requirements if importlib.util.find_spec(module) is None]
+        if missing:
+            raise RuntimeError(f"Local backend needs {', '.join(missing)}: pip install -r requirements-local.txt")
+        self.model_size = model_size or os.getenv('LOCAL_WHISPER_MODEL', 'small')
+        self.model = f"faster-whisper-{self.model_size}"
+        self.cpu_threads = cpu_threads
+        self._whisper = None
+
+    def _load(self):
+        if self._whisper is None:
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise RuntimeError("Local backend needs faster-whisper: pip install -r requirements-local.txt")
+            self._whisper = WhisperModel(self.model_size, device='cpu', compute_type='int8',
+                                         cpu_threads=self.cpu_threads)
+        return self._whisper
+
+    def transcribe(self, audio_path):
+        samples = load_audio(audio_path)
+        segments, info = self._load().transcribe(samples, beam_size=1)
+
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "id": len(result_segments),
+                "start": round(segment.start, 2),
+                "end": round(segment.end, 2),
+                "text": segment.text
+            })
+
+        return {
+            "text": ''.join(s['text'] for s in result_segments).strip(),
+            "language": info.language,
+            "duration": round(info.duration, 2),
+            "segments": result_segments
+        }
+
+
+def load_audio(audio_path, sample_rate=16000):
+    """Decode any ffmpeg-readable file with pydub into mono float32 samples at `sample_rate`"""
+    import numpy as np
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+BACKENDS = {
+    GroqBackend.name: GroqBackend,
+    LocalWhisperBackend.name: LocalWhisperBackend
+}
+
+
+def get_backend(name=None, chunked=None, **kwargs):
+    """
+    Build a backend by name (ASR_BACKEND env var, default groq).
+    With chunked=True (or ASR_CHUNKING=1) it is wrapped to transcribe silence-trimmed chunks in parallel.
+    """
+    name = name or os.getenv('ASR_BACKEND', GroqBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}' (choose from: {', '.join(BACKENDS)})")
+    backend = BACKENDS[name](**kwargs)
+
+    if chunked is None:
+        chunked = os.getenv('ASR_CHUNKING') == '1'
+    if chunked:
+        from src.chunking import ChunkedBackend
+        backend = ChunkedBackend(backend)
+
+    return backend
@@ -0,0 +1,121 @@
+"""
+Speaker attribution for call transcriptions
+Uses Whisper segment timestamps and the known TwiML say/pause schedule to label patient vs agent
+"""
+
+import re
+
+# Polly.Joanna speaks roughly 2.7 words/second at rate="100%"
+WORDS_PER_SECOND = 2.7
+SAY_OVERHEAD_SECONDS = 0.3
+
+# A segment counts as the patient if it overlaps a scheduled <Say> this much
+# and shares this many words with the line being said
+MIN_OVERLAP = 0.5
+MIN_SIMILARITY = 0.3
+
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+
+
+def normalize(text):
+    """Lowercase, drop punctuation, collapse whitespace"""
+    return ' '.join(_NON_WORD.sub(' ', text.lower()).split())
+
+
+def estimate_say_seconds(text, rate=0.9):
+    """Rough TTS duration of a <Say> at the given speaking rate"""
+    return len(text.split()) / (WORDS_PER_SECOND * rate) + SAY_OVERHEAD_SECONDS
+
+
+def build_schedule(actions, rate=0.9):
+    """
+    Turn the call's TwiML actions [('pause', seconds) | ('say', text)] into patient speech windows:
+    [{"start", "end", "text"}] in seconds from the start of the call.
+    """
+    schedule = []
+    clock = 0.0
+    for kind, value in actions:
+        if kind == 'pause':
+            clock += value
+        elif kind == 'say':
+            duration = estimate_say_seconds(value, rate)
+            schedule.append({"start": round(clock, 2), "end": round(clock + duration, 2), "text": value})
+            clock += duration
+    return schedule
+
+
+class ScriptIndex:
+    """Normalized patient lines, precomputed once per call"""
+
+    def __init__(self, lines):
+        self.lines = [normalize(line) for line in lines]
+        self.exact = set(self.lines)
+        patterns = sorted((re.escape(line) for line in self.exact if line), key=len, reverse=True)
+        # One combined pattern finds any script line inside a segment in a single scan
+        self.pattern = re.compile('|'.join(patterns)) if patterns else None
+
+    def contains_script_line(self, normalized_text):
+        if normalized_text in self.exact:
+            return True
+        return bool(self.pattern and self.pattern.search(normalized_text))
+
+
+def _similarity(a, b):
+    """Fraction of a's words that also appear in b"""
+    words_a = a.split()
+    if not words_a:
+        return 0.0
+    words_b = set(b.split())
+    return sum(1 for w in words_a if w in words_b) / len(words_a)
+
+
+def attribute_segments(segments, schedule):
+    """
+    Label each Whisper segment as patient or agent in one linear pass.
+    Segments and schedule windows are both in time order, so one pointer walks the schedule.
+    Returns [(speaker, segment)] in segment order.
+    """
+    index = ScriptIndex(window['text'] for window in schedule)
+    windows = [(w['start'], w['end'], normalize(w['text'])) for w in schedule]
+
+    labelled = []
+    w = 0
+    for segment in sorted(segments, key=lambda s: s['start']):
+        start, end = segment['start'], segment['end']
+        text = normalize(segment['text'])
+
+        # Skip windows that ended before this segment started
+        while w < len(windows) and windows[w][1] < start:
+            w += 1
+
+        is_patient = False
+        j = w
+        while j < len(windows) and windows[j][0] <= end:
+            w_start, w_end, w_text = windows[j]
+            overlap = min(end, w_end) - max(start, w_start)
+            if overlap > 0 and overlap / max(end - start, 0.01) >= MIN_OVERLAP \
+                    and _similarity(text, w_text) >= MIN_SIMILARITY:
+                is_patient = True
+                break
+            j += 1
+
+        if not is_patient and text in index.exact:
+            is_patient = True
+
+        labelled.append(("patient" if is_patient else "agent", segment))
+
+    return labelled
+
+
+def attribute_sentences(full_text, script_lines):
+    """
+    Fallback when the transcription has no segment timestamps:
+    split on sentences and mark the ones containing a script line as patient.
+    """
+    index = ScriptIndex(script_lines)
+    labelled = []
+    for sentence in full_text.split('. '):
+        if sentence.strip():
+            speaker = "patient" if index.contains_script_line(normalize(sentence)) else "agent"
+            labelled.append((speaker, sentence.strip()))
+    return labelled
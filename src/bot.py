@@ -2,20 +2,45 @@
 Main bot logic - handles conversation intelligence using Claude
 """
 
-import os
-from anthropic import Anthropic
-from dotenv import load_dotenv
+import re
+import time
+from src.clients import get_anthropic_client
+from src.tracing import get_tracer
 
-load_dotenv()
+MODEL = "claude-3-5-sonnet-20241022"
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+tracer = get_tracer()
+
+
+def split_sentences(text):
+    """Split off complete sentences; returns (sentences, unfinished remainder)"""
+    parts = _SENTENCE_END.split(text)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
 
 class VoiceBot:
-    def __init__(self, scenario):
-        self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    def __init__(self, scenario, client=None):
+        self.client = client or get_anthropic_client()
         self.scenario = scenario
-        self.conversation_history = []
         self.turn_count = 0
         self.max_turns = 15
         
+        # Rendered once - the scenario doesn't change during a call.
+        # Marked for prompt caching; turns are cached too once the prefix is long enough
+        # for the model's minimum cacheable length.
+        self.system = [{
+            "type": "text",
+            "text": self.get_system_prompt(),
+            "cache_control": {"type": "ephemeral"}
+        }]
+        
+        # Append-only, already in the shape messages.create expects
+        self.conversation_history = []
+        self._cached_block = None
+        self.turn_metrics = []
+        self.ended = False
+        
     def get_system_prompt(self):
         """Create system prompt based on scenario"""
         return f"""You are roleplaying as a patient calling a medical office.
@@ -44,51 +69,156 @@ Remember: You called THEM, so respond to their questions and prompts."""
         if self.turn_count >= self.max_turns:
             return "Thank you so much for your help. Have a great day! Goodbye."
         
-        # Build conversation for Claude
-        messages = []
-        for entry in self.conversation_history:
-            messages.append({
-                "role": entry["role"],
-                "content": entry["content"]
-            })
-        
-        # Add current agent message
-        messages.append({
-            "role": "user",
-            "content": f"Agent said: {agent_message}"
-        })
+        self._append_agent_message(agent_message)
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=150,
-                temperature=0.7,
-                system=self.get_system_prompt(),
-                messages=messages
-            )
+            start = time.perf_counter()
+            with tracer.span('bot.turn', turn=self.turn_count, scenario_id=self.scenario.get('id')):
+                response = self.client.messages.create(
+                    model=MODEL,
+                    max_tokens=150,
+                    temperature=0.7,
+                    system=self.system,
+                    messages=self.conversation_history
+                )
+            latency = time.perf_counter() - start
             
             bot_response = response.content[0].text.strip()
             
             # Update history
-            self.conversation_history.append({
-                "role": "user",
-                "content": f"Agent said: {agent_message}"
-            })
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": bot_response
-            })
+            self._append_bot_message(bot_response)
+            self._record_turn(response.usage, latency)
             
             return bot_response
             
         except Exception as e:
             print(f"Error generating response: {e}")
+            self.conversation_history.pop()
             return "I'm sorry, could you repeat that?"
     
+    def stream_response(self, agent_message):
+        """Like generate_response, but yields the reply text as it streams from Claude"""
+        self.turn_count += 1
+        
+        if self.turn_count >= self.max_turns:
+            yield "Thank you so much for your help. Have a great day! Goodbye."
+            return
+        
+        self._append_agent_message(agent_message)
+        
+        chunks = []
+        first_token = None
+        # A generator can't hold a span open across yields, so the turn is recorded once it ends
+        started = time.time()
+        try:
+            start = time.perf_counter()
+            with self.client.messages.stream(
+                model=MODEL,
+                max_tokens=150,
+                temperature=0.7,
+                system=self.system,
+                messages=self.conversation_history
+            ) as stream:
+                for text in stream.text_stream:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    chunks.append(text)
+                    yield text
+                usage = stream.get_final_message().usage
+            latency = time.perf_counter() - start
+        except GeneratorExit:
+            # Caller stopped listening (e.g. barge-in) - drop the unanswered turn
+            self.conversation_history.pop()
+            raise
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            tracer.record('bot.turn', started, time.time(), status='error', turn=self.turn_count,
+                          scenario_id=self.scenario.get('id'), streamed=True)
+            self.conversation_history.pop()
+            if not chunks:
+                yield "I'm sorry, could you repeat that?"
+            return
+        
+        # Update history
+        self._append_bot_message(''.join(chunks).strip())
+        self._record_turn(usage, latency, time_to_first_token=first_token)
+        tracer.record('bot.turn', started, started + latency, turn=self.turn_count,
+                      scenario_id=self.scenario.get('id'), streamed=True, time_to_first_token=first_token)
+    
+    def stream_sentences(self, agent_message):
+        """
+        Yield the reply one complete sentence at a time, as soon as each is streamed,
+        so TTS can start on the first sentence. Sets self.ended when the reply ends the call.
+        """
+        start = time.perf_counter()
+        turn = self.turn_count + 1
+        first_sentence = None
+        spoken = []
+        buffer = ''
+        
+        for delta in self.stream_response(agent_message):
+            buffer += delta
+            sentences, buffer = split_sentences(buffer)
+            for sentence in sentences:
+                if first_sentence is None:
+                    first_sentence = time.perf_counter() - start
+                spoken.append(sentence)
+                yield sentence
+        
+        if buffer.strip():
+            if first_sentence is None:
+                first_sentence = time.perf_counter() - start
+            spoken.append(buffer.strip())
+            yield buffer.strip()
+        
+        reply = ' '.join(spoken)
+        self.ended = self.turn_count >= self.max_turns or self.should_end_conversation(reply)
+        
+        if self.turn_metrics and self.turn_metrics[-1]['turn'] == turn and first_sentence is not None:
+            self.turn_metrics[-1]['time_to_first_sentence'] = round(first_sentence, 3)
+    
+    def _append_agent_message(self, agent_message):
+        """
+        Append the agent's turn to the history and move the cache breakpoint onto it,
+        so the whole conversation so far is cached for the next turn
+        """
+        if self._cached_block is not None:
+            self._cached_block.pop("cache_control", None)
+        
+        block = {
+            "type": "text",
+            "text": f"Agent said: {agent_message}",
+            "cache_control": {"type": "ephemeral"}
+        }
+        self._cached_block = block
+        self.conversation_history.append({"role": "user", "content": [block]})
+    
+    def _append_bot_message(self, bot_response):
+        self.conversation_history.append({"role": "assistant", "content": bot_response})
+    
+    def _record_turn(self, usage, latency, time_to_first_token=None):
+        """Per-turn token and latency instrumentation"""
+        metrics = {
+            "turn": self.turn_count,
+            "latency": round(latency, 3),
+            "input_tokens": getattr(usage, 'input_tokens', None),
+            "output_tokens": getattr(usage, 'output_tokens', None),
+            "cache_creation_input_tokens": getattr(usage, 'cache_creation_input_tokens', None),
+            "cache_read_input_tokens": getattr(usage, 'cache_read_input_tokens', None)
+        }
+        if time_to_first_token is not None:
+            metrics["time_to_first_token"] = round(time_to_first_token, 3)
+        self.turn_metrics.append(metrics)
+    
     def get_initial_message(self):
         """Get the first message to start the conversation"""
         return self.scenario['initial_message']
     
+    def record_opening(self, agent_message, opening):
+        """Add the agent's greeting and our scripted opening line, so Claude sees the call from the start"""
+        self._append_agent_message(agent_message)
+        self._append_bot_message(opening)
+    
     def should_end_conversation(self, bot_response):
         """Determine if conversation should end"""
         end_phrases = [
@@ -0,0 +1,354 @@
+"""
+Declarative bug rules for transcript analysis
+Rules are data; RuleEngine lowercases each conversation once and scans it for the rules' trigger phrases -
+plain substring search for a handful of phrases, one compiled matcher for larger rule sets
+"""
+
+import re
+import json
+import hashlib
+
+# Each rule:
+#   speaker       - whose messages count ('agent', 'patient', or None for both)
+#   scenarios     - scenario ids the rule applies to (None for all)
+#   all / any     - phrases that must all appear / at least one must appear (lowercase)
+#   min_counts    - {phrase: n} - phrase must appear at least n times in the message
+#   previous_any  - the message right before must contain one of these phrases
+#   scope         - 'message': one finding per matching message
+#                   'call': one finding per call when min_matches <= matching messages <= max_matches
+# description / evidence may use {message}, {previous} and {count}
+BUG_RULES = [
+    {
+        "name": "duplicate_time_slot",
+        "speaker": "agent",
+        "all": ["2 pm"],
+        "min_counts": {"2 pm": 2},
+        "scope": "message",
+        "type": "Logic Error",
+        "severity": "High",
+        "description": "Agent offered the same time slot twice (2 PM and 2 PM)",
+        "evidence": "{message}",
+        "impact": "Confuses patients and makes scheduling impossible"
+    },
+    {
+        "name": "wrong_medication",
+        "speaker": "agent",
+        "all": ["metformin"],
+        "previous_any": ["lisinopril"],
+        "scope": "message",
+        "type": "Hallucination",
+        "severity": "Critical",
+        "description": "Agent hallucinated wrong medication - patient asked for lisinopril (blood pressure) "
+                       "but agent mentioned metformin (diabetes)",
+        "evidence": "Patient: {previous}\nAgent: {message}",
+        "impact": "Could lead to dangerous medication errors"
+    },
+    {
+        "name": "urgent_two_weeks_out",
+        "speaker": "agent",
+        "scenarios": [6],
+        "all": ["two weeks"],
+        "scope": "message",
+        "type": "Inappropriate Response",
+        "severity": "High",
+        "description": "Agent offered appointment 2 weeks out for urgent care request",
+        "evidence": "{message}",
+        "impact": "Patient with urgent medical need is not properly triaged"
+    },
+    {
+        "name": "reschedule_not_found",
+        "speaker": "agent",
+        "scenarios": [3],
+        "all": ["date of birth", "not seeing any upcoming"],
+        "scope": "message",
+        "type": "Data Retrieval Failure",
+        "severity": "Medium",
+        "description": "Agent unable to find existing appointment for rescheduling",
+        "evidence": "{message}",
+        "impact": "Creates friction for legitimate rescheduling requests"
+    },
+    {
+        "name": "open_on_sunday",
+        "speaker": "agent",
+        "all": ["office hours", "sunday"],
+        "scope": "message",
+        "type": "Information Accuracy",
+        "severity": "Medium",
+        "description": "Agent claims office is open on Sundays (unusual for medical office)",
+        "evidence": "{message}",
+        "impact": "Patient may show up when office is actually closed"
+    },
+    {
+        "name": "wrong_office_not_recognized",
+        "speaker": "agent",
+        "scenarios": [10],
+        "any": ["veterinary", "wrong"],
+        "scope": "call",
+        "min_matches": 0,
+        "max_matches": 0,
+        "type": "Context Understanding Failure",
+        "severity": "Medium",
+        "description": "Agent failed to recognize caller was looking for veterinary clinic, not human medical office",
+        "evidence": "Agent proceeded with appointment scheduling despite clear mismatch",
+        "impact": "Wastes time for both caller and office"
+    },
+    {
+        "name": "repeated_didnt_catch",
+        "speaker": "agent",
+        "all": ["didn't quite catch"],
+        "scope": "call",
+        "min_matches": 3,
+        "type": "Poor Conversation Flow",
+        "severity": "Medium",
+        "description": "Agent asked patient to repeat themselves {count} times in one call",
+        "evidence": "{count} instances of \"I didn't quite catch that\"",
+        "impact": "Frustrating user experience, suggests poor speech recognition"
+    },
+]
+
+# Joins a conversation's messages for the single scan; no phrase contains it
+SEPARATOR = '\x1e'
+
+# Up to this many trigger phrases, str.find beats the combined regex (see benchmarks/bench_rules.py)
+FAST_PATH_MAX_PHRASES = 24
+
+REQUIRED_RULE_FIELDS = ("name", "scope", "type", "severity", "description", "evidence", "impact")
+FINDING_FIELDS = ("type", "severity", "description", "evidence", "impact")
+
+
+class RuleError(ValueError):
+    """A bug rule is malformed"""
+
+
+def rules_version(rules=BUG_RULES):
+    """Stable hash of a rule set - changes whenever any rule does"""
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _trie_pattern(phrases):
+    """
+    Regex for a set of literals, factored into a prefix trie ('ab|ac' -> 'a(?:b|c)').
+    The regex engine then rejects most positions on the first character instead of
+    trying every phrase in turn, and optional suffixes keep the longest phrase preferred.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node):
+        terminal = '' in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return ('(?:' + body + ')?') if len(branches) == 1 else body + '?'
+        return body
+
+    return emit(trie)
+
+
+class PhraseMatcher:
+    """
+    Finds a fixed set of lowercase phrases with one combined (trie-factored) regex. The longest phrase
+    at a position wins; a match also credits the shorter phrases it contains, so 'wrong number' still
+    finds 'wrong'. The search resumes one character past each match, so phrases that overlap in the
+    text are all found.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = sorted(set(phrases), key=len, reverse=True)
+        self.pattern = re.compile(_trie_pattern(self.phrases)) if self.phrases else None
+        self.contained = {p: [q for q in self.phrases if q != p and q in p] for p in self.phrases}
+
+    def find_all(self, text):
+        """Yield (offset, phrase) for the phrases in (already lowercased) text"""
+        if self.pattern is None:
+            return
+        match = self.pattern.search(text)
+        while match is not None:
+            start, phrase = match.start(), match.group()
+            yield start, phrase
+            for inner in self.contained[phrase]:
+                yield start, inner
+            match = self.pattern.search(text, start + 1)
+
+
+def _validate_rule(rule):
+    for field in REQUIRED_RULE_FIELDS:
+        if field not in rule:
+            raise RuleError(f"Rule {rule.get('name', '?')} is missing '{field}'")
+    if rule['scope'] not in ('message', 'call'):
+        raise RuleError(f"Rule {rule['name']}: scope must be 'message' or 'call'")
+    if not (rule.get('all') or rule.get('any')):
+        raise RuleError(f"Rule {rule['name']} needs 'all' or 'any' phrases")
+    for phrase in rule.get('all', []) + rule.get('any', []) + rule.get('previous_any', []):
+        if phrase != phrase.lower():
+            raise RuleError(f"Rule {rule['name']}: phrase '{phrase}' must be lowercase")
+
+
+class SubstringMatcher:
+    """
+    PhraseMatcher for a handful of phrases: each one is looked for with str.find, which is faster
+    than the combined regex up to FAST_PATH_MAX_PHRASES. Finds the same phrases in the same messages.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = tuple(sorted(set(phrases)))
+
+    def find_all(self, text):
+        """Yield (offset, phrase) for the phrases in (already lowercased) text"""
+        for phrase in self.phrases:
+            start = text.find(phrase)
+            while start != -1:
+                yield start, phrase
+                start = text.find(phrase, start + 1)
+
+
+class RuleEngine:
+    def __init__(self, rules=BUG_RULES):
+        for rule in rules:
+            _validate_rule(rule)
+        self.rules = rules
+        self.version = rules_version(rules)
+
+        self.triggers = {}
+        self.conditions = []
+        for index, rule in enumerate(rules):
+            # A message can only match a rule if it contains one of the rule's trigger phrases.
+            # Only triggers are scanned for; the rest of a rule is checked on the few messages that hit one.
+            for phrase in rule.get('all', [])[:1] or rule.get('any', []):
+                self.triggers.setdefault(phrase, []).append(index)
+            # What's left to check once a message from the rule's speaker hit a trigger (None: nothing)
+            rest = (
+                tuple(rule.get('all', [])[1:]),
+                tuple(rule.get('any', [])) if rule.get('all') else (),
+                tuple(rule.get('min_counts', {}).items()),
+                tuple(rule.get('previous_any', []))
+            )
+            self.conditions.append((rule.get('speaker'), rest if any(rest) else None))
+        # Only messages from a speaker some rule looks at are scanned (None: every speaker counts)
+        speakers = {rule.get('speaker') for rule in rules}
+        self.speakers = None if None in speakers else speakers
+        self._matchers = {}
+        self._plans = {}
+        # Findings are copied from these; only the fields with placeholders get formatted per finding
+        self._findings = [{'scenario': None, **{field: rule[field] for field in FINDING_FIELDS}} for rule in rules]
+        self._placeholders = [tuple(field for field in ('description', 'evidence') if '{' in rule[field])
+                              for rule in rules]
+
+    def _plan(self, scenario_id):
+        """
+        Which rules apply to a scenario, which of those are call-scoped, and a matcher for just their
+        triggers (cached per scenario; matchers are shared by scenarios with the same trigger set)
+        """
+        plan = self._plans.get(scenario_id)
+        if plan is None:
+            applicable = [rule.get('scenarios') is None or scenario_id in rule['scenarios'] for rule in self.rules]
+            call_rules = [(i, rule.get('min_matches', 1), rule.get('max_matches', float('inf')))
+                          for i, rule in enumerate(self.rules) if applicable[i] and rule['scope'] == 'call']
+            triggers = frozenset(phrase for phrase, indexes in self.triggers.items()
+                                 if any(applicable[i] for i in indexes))
+            matcher = self._matchers.get(triggers)
+            if matcher is None:
+                fast_path = len(triggers) <= FAST_PATH_MAX_PHRASES
+                matcher = self._matchers[triggers] = (SubstringMatcher if fast_path else PhraseMatcher)(triggers)
+            plan = self._plans[scenario_id] = (applicable, call_rules, matcher)
+        return plan
+
+    def _message_matches(self, rest, text, previous):
+        """Whether a (lowercased) message that hit one of a rule's triggers satisfies the rest of the rule"""
+        all_of, any_of, min_counts, previous_any = rest
+        for phrase in all_of:
+            if phrase not in text:
+                return False
+        if any_of and not any(phrase in text for phrase in any_of):
+            return False
+        for phrase, n in min_counts:
+            if text.count(phrase) < n:
+                return False
+        if previous_any:
+            previous = previous.lower()
+            if not any(phrase in previous for phrase in previous_any):
+                return False
+        return True
+
+    def _finding(self, index, scenario_name, message='', previous='', count=0):
+        finding = self._findings[index].copy()
+        finding['scenario'] = scenario_name
+        for field in self._placeholders[index]:
+            finding[field] = finding[field].format(message=message, previous=previous, count=count)
+        return finding
+
+    def _scan_conversation(self, messages, matcher):
+        """
+        {message index: {phrases found}} for the messages containing any phrase, in message order.
+        The whole conversation is lowercased and scanned as one string, so messages
+        without a match cost no Python-level work at all.
+        """
+        joined = SEPARATOR.join(messages)
+        lowered = joined.lower()
+        found_by_message = {}
+        if len(lowered) != len(joined):
+            # Lowercasing changed some lengths (rare non-ASCII); offsets no longer line up
+            for i, message in enumerate(messages):
+                found = {phrase for _, phrase in matcher.find_all(message.lower())}
+                if found:
+                    found_by_message[i] = found
+            return found_by_message
+        for offset, phrase in matcher.find_all(lowered):
+            found_by_message.setdefault(lowered.count(SEPARATOR, 0, offset), set()).add(phrase)
+        return dict(sorted(found_by_message.items())) if found_by_message else found_by_message
+
+    def analyze(self, transcript):
+        """Findings for one transcript, grouped in rule order"""
+        conversation = transcript['conversation']
+        applicable, call_rules, matcher = self._plan(transcript['scenario_id'])
+        speakers = self.speakers
+        if speakers is None:
+            found_by_message = self._scan_conversation([msg['message'] for msg in conversation], matcher)
+            scanned = None
+        else:
+            found_by_message = self._scan_conversation(
+                [msg['message'] for msg in conversation if msg['speaker'] in speakers], matcher)
+            # Positions of the scanned messages in the conversation - only needed once something matched
+            scanned = [i for i, msg in enumerate(conversation) if msg['speaker'] in speakers] if found_by_message else None
+
+        findings = {}
+        call_matches = {}
+        for i, found in found_by_message.items():
+            if scanned is not None:
+                i = scanned[i]
+            # A set, so a rule triggered by two of its phrases is checked once; findings are put in rule order below
+            candidates = {index for phrase in found for index in self.triggers[phrase]}
+            message, speaker = conversation[i]['message'], conversation[i]['speaker']
+            previous = conversation[i - 1]['message'] if i > 0 else ''
+            text = None
+            for index in candidates:
+                if not applicable[index]:
+                    continue
+                rule_speaker, rest = self.conditions[index]
+                if rule_speaker and rule_speaker != speaker:
+                    continue
+                if rest is not None:
+                    if text is None:
+                        text = message.lower()
+                    if not self._message_matches(rest, text, previous):
+                        continue
+                rule = self.rules[index]
+                if rule['scope'] == 'message':
+                    findings.setdefault(index, []).append(self._finding(
+                        index, transcript['scenario_name'], message=message, previous=previous))
+                else:
+                    call_matches[index] = call_matches.get(index, 0) + 1
+
+        for index, min_matches, max_matches in call_rules:
+            count = call_matches.get(index, 0)
+            if min_matches <= count <= max_matches:
+                findings.setdefault(index, []).append(
+                    self._finding(index, transcript['scenario_name'], count=count))
+
+        return [finding for index in sorted(findings) for finding in findings[index]]
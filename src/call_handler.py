@@ -6,28 +6,67 @@ Uses pre-scripted patient messages to test their AI system
 import os
 import json
 import time
-import requests
+import uuid
 from datetime import datetime
-from dotenv import load_dotenv
-from twilio.rest import Client
-from openai import OpenAI
+from types import SimpleNamespace
+from src.callbacks import TERMINAL_CALL_STATUSES
+from src.clients import get_twilio_client, get_openai_client
+from src.downloads import download_recording, file_sha256, DownloadError
+from src.transcription_cache import get_transcription_cache
+from src.asr import get_backend
+from src.attribution import build_schedule, attribute_segments, attribute_sentences
+from src.transcript_index import TranscriptIndex
+from src.archive import get_archive_writer
+from src.postprocess import PostProcessError
+from src.scenarios import VOICE, SPEECH_RATE, get_script_template, xml_escape
+from src.tracing import get_tracer
+
+tracer = get_tracer()
+
+
+def plan_pauses(template, scenario, timing_model=None):
+    """Pause before each script line and after the last - learned when there is a timing model"""
+    if timing_model is None or scenario is None:
+        return template.default_pauses
+    return tuple(timing_model.pause(scenario['id'], gap_index, default)
+                 for gap_index, default in enumerate(template.default_pauses))
 
-load_dotenv()
 
 class CallHandler:
-    def __init__(self):
-        # Initialize Twilio
-        self.twilio_client = Client(
-            os.getenv('TWILIO_ACCOUNT_SID'),
-            os.getenv('TWILIO_AUTH_TOKEN')
-        )
+    def __init__(self, callback_server=None, postprocessor=None, asr_backend=None, timing_model=None,
+                 tts_cache=None):
+        # Shared Twilio client (pooled connections, reused across calls)
+        self.twilio_client = get_twilio_client()
         self.from_number = os.getenv('TWILIO_PHONE_NUMBER')
         self.to_number = os.getenv('TARGET_PHONE_NUMBER')
         
-        # Initialize OpenAI for transcription
-        self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Shared OpenAI client for transcription
+        self.openai_client = get_openai_client()
+        
+        # Speech-to-text backend (Groq Whisper unless ASR_BACKEND says otherwise)
+        self.asr_backend = asr_backend or get_backend()
+        
+        # Optional status callback receiver - without it we poll Twilio
+        self.callback_server = callback_server
+        
+        # Optional background stage for download/transcription - without it we process inline
+        self.postprocessor = postprocessor
+        
+        # Optional learned pause lengths - without it we use the fixed conservative pauses
+        self.timing_model = timing_model
+        
+        # Optional pre-rendered audio for script lines, served by the callback server
+        self.tts_cache = tts_cache if callback_server else None
         
         self.conversation_log = []
+        self.call_metrics = {}
+        self.script_schedule = []
+        self.status_times = []
+        # Downloaded recordings go here, wherever the transcript itself ends up
+        self.recordings_dir = 'transcripts'
+        # The last scripted call, and where its transcript went (a JSON file, or an archive segment)
+        self.call_id = None
+        self.transcript_path = None
         
     def make_call(self, bot, scenario):
         """
@@ -40,58 +79,146 @@ class CallHandler:
         print(f"Persona: {scenario['persona']}")
         print(f"{'='*60}\n")
         
-        call_id = f"call_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Random suffix keeps call ids unique when several calls start in the same second
+        call_id = f"call_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.call_id = call_id
         self.conversation_log = []
+        self.call_metrics = {}
+        self.script_schedule = []
+        self.transcript_path = None
         
-        # Build conversation script for this scenario
-        script = self._build_conversation_script(scenario, bot)
+        # Compiled conversation script for this scenario
+        template = get_script_template(scenario)
+        script = template.lines
         
         try:
-            # Create TwiML for the call
-            twiml = self._create_twiml_script(script)
-            
-            print(f"☎️  Initiating call to {self.to_number}...")
-            print(f"📝 Script has {len(script)} patient messages\n")
-            
-            # Make the call
-            call = self.twilio_client.calls.create(
-                to=self.to_number,
-                from_=self.from_number,
-                twiml=twiml,
-                record=True,
-                recording_status_callback_event=['completed'],
-                timeout=60
-            )
+            with tracer.span('call', trace_id=call_id, scenario_id=scenario['id']):
+                # Create TwiML for the call, and remember when each line is spoken
+                with tracer.span('twiml.build'):
+                    pauses = self._plan_pauses(template, scenario)
+                    actions = template.actions(pauses)
+                    twiml = self._render_twiml(actions) if self.tts_cache else template.render(pauses)
+                # Cached audio changes the voice, so results are only comparable between calls with the same one
+                self.call_metrics['voice'] = self.tts_cache.voice if self.tts_cache else VOICE
+                self.script_schedule = build_schedule(actions, rate=SPEECH_RATE / 100)
+                if self.timing_model:
+                    self.timing_model.call_planned()
+                    self.call_metrics['pause_seconds_saved'] = sum(template.default_pauses) - sum(pauses)
+                
+                print(f"☎️  Initiating call to {self.to_number}...")
+                print(f"📝 Script has {len(script)} patient messages\n")
+                
+                # Make the call
+                with tracer.span('twilio.calls_create'):
+                    call = self.twilio_client.calls.create(**self._call_params(twiml))
+                
+                print(f"✅ Call initiated: {call.sid}")
+                print(f"Status: {call.status}\n")
+                
+                # Log the script we're using
+                for i, message in enumerate(script, 1):
+                    self.conversation_log.append({
+                        "speaker": "patient",
+                        "message": message,
+                        "turn": i,
+                        "timestamp": datetime.now().isoformat()
+                    })
+                
+                # Wait for call to complete
+                print("⏳ Waiting for call to complete...")
+                with tracer.span('call.wait_completion', call_sid=call.sid) as span:
+                    final_status = self._wait_for_call_completion(call.sid)
+                    span.set('status', final_status)
+                self._trace_call_phases()
+                
+                print(f"\n✅ Call completed with status: {final_status}")
+                
+                # Fetch recordings as soon as Twilio has finished them
+                recordings = []
+                if final_status == 'completed':
+                    print("\n⏳ Waiting for recording to be ready...")
+                    with tracer.span('recording.wait'):
+                        recordings = self._wait_for_recordings(call.sid)
+                
+                if self.callback_server:
+                    self.callback_server.forget(call.sid)
+                
+                job = {
+                    "call_id": call_id,
+                    "call_sid": call.sid,
+                    "scenario": scenario,
+                    "conversation_log": self.conversation_log,
+                    "call_metrics": self.call_metrics,
+                    "script_schedule": self.script_schedule,
+                    "recordings": [
+                        {"sid": r.sid, "uri": r.uri, "duration": r.duration}
+                        for r in recordings
+                    ]
+                }
+                
+                if self.postprocessor:
+                    # Hand off download/transcription so the next call can start
+                    print(f"\n📤 Queued {call_id} for post-processing")
+                    self.postprocessor.submit(job)
+                else:
+                    try:
+                        self.process_job(job)
+                    except PostProcessError as e:
+                        # Inline there is no journal to retry from - keep the scripted lines we have
+                        print(f"\n⚠️  {e} - saving the transcript without the agent's side")
+                        self._save_transcript(call_id, scenario, call.sid)
+                
+                return call.sid
+                
+        except Exception as e:
+            print(f"\n❌ Error making call: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def make_interactive_call(self, bot, scenario, media_server):
+        """
+        Make a real-time call: agent audio streams to `media_server`, VoiceBot answers each turn live
+        """
+        print(f"\n{'='*60}")
+        print(f"📞 CALLING REAL NUMBER (interactive): {self.to_number}")
+        print(f"Scenario: {scenario['name']}")
+        print(f"Persona: {scenario['persona']}")
+        print(f"{'='*60}\n")
+        
+        call_id = f"call_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.conversation_log = []
+        self.call_metrics = {}
+        self.script_schedule = []
+        
+        session = media_server.register(call_id, bot)
+        
+        try:
+            with tracer.span('twilio.calls_create', trace_id=call_id, interactive=True):
+                call = self.twilio_client.calls.create(**self._call_params(media_server.twiml(call_id)))
             
             print(f"✅ Call initiated: {call.sid}")
-            print(f"Status: {call.status}\n")
-            
-            # Log the script we're using
-            for i, message in enumerate(script, 1):
-                self.conversation_log.append({
-                    "speaker": "patient",
-                    "message": message,
-                    "turn": i,
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            # Wait for call to complete
             print("⏳ Waiting for call to complete...")
-            final_status = self._wait_for_call_completion(call.sid)
-            
+            with tracer.span('call.wait_completion', trace_id=call_id, call_sid=call.sid) as span:
+                final_status = self._wait_for_call_completion(call.sid)
+                span.set('status', final_status)
+            self._trace_call_phases(call_id)
             print(f"\n✅ Call completed with status: {final_status}")
             
-            # Wait a bit for recording to be ready
-            print("\n⏳ Waiting for recording to be ready...")
-            time.sleep(5)
+            # Let the last turn finish logging after the stream closes
+            session.finished.wait(10)
+            if self.callback_server:
+                self.callback_server.forget(call.sid)
             
-            # Get and transcribe recordings
-            print("\n🎙️  Retrieving call recordings...")
-            self._process_call_recordings(call.sid, call_id)
+            self.conversation_log = session.conversation_log
+            self.call_metrics['turns'] = session.turn_metrics
+            self.call_metrics['llm_turns'] = bot.turn_metrics
+            first_audio = [t['time_to_first_audio'] for t in session.turn_metrics if 'time_to_first_audio' in t]
+            if first_audio:
+                self.call_metrics['mean_time_to_first_audio'] = round(sum(first_audio) / len(first_audio), 3)
+                print(f"⚡ Mean time to first audio: {self.call_metrics['mean_time_to_first_audio']:.2f}s")
             
-            # Save transcript
             self._save_transcript(call_id, scenario, call.sid)
-            
             return call.sid
             
         except Exception as e:
@@ -99,122 +226,122 @@ class CallHandler:
             import traceback
             traceback.print_exc()
             return None
+        finally:
+            media_server.forget(call_id)
     
-    def _build_conversation_script(self, scenario, bot):
-        """
-        Minimal generic script - fewer messages that work for most agent responses
-        """
-        script = []
-        
-        scenario_id = scenario['id']
-        
-        if scenario_id == 1:  # Simple Appointment Scheduling
-            script.append("Hi, I'm Sarah Chen. I'd like to schedule an appointment.")
-            script.append("March 15, 1990.")  # DOB
-            script.append("Yes, that's correct.")  # Confirmation
-            script.append("A new patient consultation for a general checkup.")
-            script.append("The earliest available time works for me.")
-            script.append("Yes, please book that time.")
-            script.append("Yes, that's correct.")  # Second confirmation if needed
-            script.append("No, that's all. Thank you!")
-        
-        elif scenario_id == 2:  # Medication Refill
-            script.append("Hi, I'm John Martinez. I need a medication refill.")
-            script.append("June 10, 1975.")
-            script.append("Correct.")
-            script.append("Lisinopril for blood pressure.")
-            script.append("Yes, please process that.")
-            script.append("Thank you!")
-        
-        elif scenario_id == 3:  # Rescheduling
-            script.append("Hi, I'm Emily Thompson. I need to reschedule.")
-            script.append("April 22, 1988.")
-            script.append("Yes.")
-            script.append("My appointment next Tuesday to Wednesday afternoon.")
-            script.append("Yes, that works.")
-            script.append("Thank you!")
-        
-        elif scenario_id == 4:  # Office Hours
-            script.append("What are your weekend hours?")
-            script.append("And the downtown location address?")
-            script.append("Thank you!")
-        
-        elif scenario_id == 5:  # Insurance
-            script.append("Do you accept Blue Cross Blue Shield?")
-            script.append("Yes, PPO.")
-            script.append("Thank you!")
-        
-        elif scenario_id == 6:  # Urgent
-            script.append("I'm not feeling well. Do you have anything today?")
-            script.append("Two weeks is too long. Any urgent options?")
-            script.append("Okay, thank you.")
-        
-        elif scenario_id == 7:  # Cancellation
-            script.append("Hi, I'm Jennifer Lee. I need to cancel.")
-            script.append("September 5, 1982.")
-            script.append("My appointment next week.")
-            script.append("Yes, cancel it. Thank you!")
-        
-        elif scenario_id == 8:  # Confused Patient
-            script.append("My doctor said to call. Not sure why.")
-            script.append("Maybe an appointment or refill?")
-            script.append("What's your address?")
-            script.append("Okay, thanks.")
-        
-        elif scenario_id == 9:  # Billing
-            script.append("I have a billing question.")
-            script.append("My visit last month. The amount seems high.")
-            script.append("Okay, I'll call them. Thank you!")
-        
-        elif scenario_id == 10:  # Wrong Number
-            script.append("Is this the veterinary clinic?")
-            script.append("Oh, wrong number. Sorry!")
-        
-        return script
+    def _call_params(self, twiml):
+        """calls.create arguments shared by scripted and interactive calls"""
+        call_params = {
+            "to": self.to_number,
+            "from_": self.from_number,
+            "twiml": twiml,
+            "record": True,
+            "recording_status_callback_event": ['completed'],
+            "timeout": 60
+        }
+        if self.callback_server:
+            call_params.update({
+                "status_callback": self.callback_server.status_callback_url,
+                "status_callback_event": ['initiated', 'ringing', 'answered', 'completed'],
+                "status_callback_method": 'POST',
+                "recording_status_callback": self.callback_server.recording_callback_url,
+                "recording_status_callback_method": 'POST'
+            })
+        return call_params
     
-    def _create_twiml_script(self, script):
+    def process_job(self, job):
         """
-        Conservative timing - longer pauses to let agent finish speaking
+        Transcribe a finished call's recordings and save its transcript.
+        Raises PostProcessError, without saving, if a recording couldn't be downloaded or transcribed.
         """
-        twiml_parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<Response>']
+        self.conversation_log = list(job['conversation_log'])
+        self.call_metrics = dict(job['call_metrics'])
+        self.script_schedule = job.get('script_schedule', [])
+        recordings = [SimpleNamespace(**r) for r in job['recordings']]
         
-        # Long initial wait for full greeting (18 seconds to be safe)
-        twiml_parts.append('<Pause length="18"/>')
-        
-        for i, message in enumerate(script):
-            # Speak slightly slower for clarity
-            twiml_parts.append(f'<Say voice="Polly.Joanna" rate="90%">{message}</Say>')
+        with tracer.span('postprocess', trace_id=job['call_id']):
+            # Get and transcribe recordings
+            print("\n🎙️  Retrieving call recordings...")
+            failed = self._process_call_recordings(recordings, job['call_id'])
+            if failed:
+                raise PostProcessError(f"{failed} of {len(recordings)} recording(s) of {job['call_id']} "
+                                       f"could not be transcribed")
             
-            # Longer pauses throughout - be conservative
-            if i == 0:
-                # After intro, wait for DOB question
-                twiml_parts.append('<Pause length="10"/>')
-            elif i == 1:
-                # After DOB, wait for confirmation
-                twiml_parts.append('<Pause length="12"/>')
-            elif i == 2:
-                # After confirmation, wait for next question
-                twiml_parts.append('<Pause length="12"/>')
-            elif i < len(script) - 1:
-                # General pauses - give agent time to speak
-                twiml_parts.append('<Pause length="14"/>')
+            # Save transcript
+            self._save_transcript(job['call_id'], job['scenario'], job['call_sid'])
+    
+    def _plan_pauses(self, template, scenario):
+        """Pause before each script line and after the last - learned when we have a timing model"""
+        return plan_pauses(template, scenario, self.timing_model)
+    
+    def _render_twiml(self, actions):
+        """Render timeline actions as TwiML, playing script lines from the TTS cache"""
+        twiml_parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<Response>']
+        
+        for kind, value in actions:
+            if kind == 'pause':
+                twiml_parts.append(f'<Pause length="{value}"/>')
+            elif self.tts_cache:
+                # Cached audio, synthesized once per unique line
+                key = self.tts_cache.ensure(value, rate=SPEECH_RATE / 100)
+                twiml_parts.append(f'<Play>{self.callback_server.tts_url(key)}</Play>')
             else:
-                # Last message - long wait for final response
-                twiml_parts.append('<Pause length="18"/>')
+                # Speak slightly slower for clarity
+                twiml_parts.append(f'<Say voice="{VOICE}" rate="{SPEECH_RATE}%">{xml_escape(value)}</Say>')
         
-        # End call politely
-        twiml_parts.append('<Pause length="4"/>')
-        twiml_parts.append('<Say voice="Polly.Joanna" rate="90%">Goodbye.</Say>')
-        twiml_parts.append('<Pause length="3"/>')
         twiml_parts.append('<Hangup/>')
         twiml_parts.append('</Response>')
         
         return '\n'.join(twiml_parts)
     
     def _wait_for_call_completion(self, call_sid, timeout=180):
-        """Wait for call to complete (increased timeout for longer calls)"""
+        """
+        Wait for call to complete (increased timeout for longer calls).
+        Leaves (status, epoch seconds) for each status change seen in self.status_times.
+        """
+        self.status_times = []
+        if self.callback_server:
+            status = self._wait_for_status_callback(call_sid, timeout)
+            self.status_times = list(self.callback_server.waiter(call_sid).status_times)
+            return status
+        return self._poll_call_status(call_sid, timeout)
+    
+    def _trace_call_phases(self, trace_id=None):
+        """Ringing and in-call spans, from when each status was first seen (callbacks, or polls)"""
+        first_seen = {}
+        for status, at in self.status_times:
+            first_seen.setdefault(status, at)
+        ended = next((at for status, at in self.status_times if status in TERMINAL_CALL_STATUSES), None)
+        answered = first_seen.get('in-progress')
+        tracer.record('call.ringing', first_seen.get('ringing'), answered or ended, trace_id=trace_id)
+        tracer.record('call.in_progress', answered, ended, trace_id=trace_id)
+    
+    def _wait_for_status_callback(self, call_sid, timeout, check_interval=30):
+        """
+        Sleep until the callback server sees a terminal status.
+        Every `check_interval` seconds we fetch the call once in case a callback was lost.
+        """
+        deadline = time.time() + timeout
+        
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return 'timeout'
+            
+            status = self.callback_server.wait_for_completion(call_sid, min(check_interval, remaining))
+            if status:
+                return status
+            
+            call = self.twilio_client.calls(call_sid).fetch()
+            if call.status in TERMINAL_CALL_STATUSES:
+                print(f"   Status: {call.status} (no callback received)")
+                return call.status
+    
+    def _poll_call_status(self, call_sid, timeout, initial_delay=1.0, max_delay=10.0):
+        """Poll the call with exponential backoff (fallback when no callback server)"""
         start_time = time.time()
         last_status = None
+        delay = initial_delay
         
         while time.time() - start_time < timeout:
             call = self.twilio_client.calls(call_sid).fetch()
@@ -222,121 +349,202 @@ class CallHandler:
             if call.status != last_status:
                 print(f"   Status: {call.status}")
                 last_status = call.status
+                self.status_times.append((call.status, time.time()))
+                # Status changed - check again soon
+                delay = initial_delay
             
-            if call.status in ['completed', 'failed', 'busy', 'no-answer', 'canceled']:
+            if call.status in TERMINAL_CALL_STATUSES:
                 return call.status
             
-            time.sleep(2)
+            time.sleep(min(delay, max(0, timeout - (time.time() - start_time))))
+            delay = min(delay * 2, max_delay)
         
         return 'timeout'
     
-    def _process_call_recordings(self, call_sid, call_id):
-        """Retrieve and transcribe call recordings"""
-        try:
-            # Get recordings for this call
+    def _wait_for_recordings(self, call_sid, timeout=60):
+        """
+        Return the call's recordings as soon as they are available.
+        Waits on the recording status callback when we have one, otherwise polls with backoff.
+        Records time-to-recording-available in self.call_metrics.
+        """
+        start = time.time()
+        
+        if self.callback_server:
+            waiter = self.callback_server.waiter(call_sid)
+            if not waiter.recording_ready.wait(timeout):
+                print("   ⚠️  No recording callback received, checking Twilio directly")
+            recordings = self.twilio_client.recordings.list(call_sid=call_sid)
+        else:
+            recordings = self._poll_recordings(call_sid, timeout)
+        
+        elapsed = time.time() - start
+        self.call_metrics['recording_available_seconds'] = round(elapsed, 3) if recordings else None
+        if recordings:
+            print(f"   Recording available after {elapsed:.1f}s")
+        
+        return recordings
+    
+    def _poll_recordings(self, call_sid, timeout, initial_delay=0.5, max_delay=8.0):
+        """Poll recordings.list with bounded exponential backoff until every recording is completed"""
+        deadline = time.time() + timeout
+        delay = initial_delay
+        
+        while True:
             recordings = self.twilio_client.recordings.list(call_sid=call_sid)
+            if recordings and all(getattr(r, 'status', 'completed') == 'completed' for r in recordings):
+                return recordings
             
-            if not recordings:
-                print("❌ No recordings found yet")
-                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return []
             
-            print(f"✅ Found {len(recordings)} recording(s)")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+    
+    def _process_call_recordings(self, recordings, call_id):
+        """Transcribe call recordings; returns how many failed"""
+        if not recordings:
+            print("❌ No recordings found")
+            return 0
+        
+        print(f"✅ Found {len(recordings)} recording(s)")
+        
+        failed = 0
+        for idx, recording in enumerate(recordings):
+            print(f"\n📥 Processing recording {idx + 1}/{len(recordings)}")
+            print(f"   Recording SID: {recording.sid}")
+            print(f"   Duration: {recording.duration} seconds")
             
-            for idx, recording in enumerate(recordings):
-                print(f"\n📥 Processing recording {idx + 1}/{len(recordings)}")
-                print(f"   Recording SID: {recording.sid}")
-                print(f"   Duration: {recording.duration} seconds")
-                
-                # Download and transcribe
-                self._download_and_transcribe(recording, call_id)
-                
-        except Exception as e:
-            print(f"❌ Error processing recordings: {e}")
+            # Download and transcribe
+            if not self._download_and_transcribe(recording, call_id):
+                failed += 1
+        
+        return failed
     
     def _download_and_transcribe(self, recording, call_id):
-        """Download recording and transcribe using Groq Whisper (free!)"""
+        """Download recording and transcribe using Groq Whisper (free!); returns False on failure"""
         try:
-            # Import Groq
-            from groq import Groq
-            groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-            
             # Build recording URL
             recording_url = f"https://api.twilio.com{recording.uri.replace('.json', '.mp3')}"
             
             print(f"   Downloading audio...")
             
-            # Download the audio file
+            # Stream the audio file to disk (skipped if already downloaded and verified)
             auth = (os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
-            response = requests.get(recording_url, auth=auth)
+            audio_file = os.path.join(self.recordings_dir, f"{call_id}_recording.mp3")
+            try:
+                with tracer.span('recording.download', recording_sid=recording.sid):
+                    audio_sha256 = download_recording(recording_url, audio_file, recording.sid, auth=auth)
+            except DownloadError as e:
+                print(f"   ❌ Failed to download: {e}")
+                return False
             
-            if response.status_code == 200:
-                # Save audio file temporarily
-                audio_file = f"transcripts/{call_id}_recording.mp3"
-                with open(audio_file, 'wb') as f:
-                    f.write(response.content)
-                
-                print(f"   ✅ Audio saved: {audio_file}")
-                print(f"   🎯 Transcribing with Groq Whisper...")
-                
-                # Transcribe using Groq Whisper (FREE!)
-                with open(audio_file, 'rb') as audio:
-                    transcript = groq_client.audio.transcriptions.create(
-                        model="whisper-large-v3-turbo",
-                        file=audio,
-                        response_format="verbose_json"
-                    )
-                
-                print(f"   ✅ Transcription complete!")
-                
-                # Parse the transcription
+            print(f"   ✅ Audio saved: {audio_file}")
+            
+            transcript = self._transcribe(audio_file, audio_sha256)
+            
+            # Parse the transcription
+            with tracer.span('transcript.parse'):
                 self._parse_transcription(transcript, call_id)
-                
-            else:
-                print(f"   ❌ Failed to download: {response.status_code}")
+            return True
                 
         except Exception as e:
             print(f"   ❌ Error in transcription: {e}")
             import traceback
             traceback.print_exc()
+            return False
+    
+    def _transcribe(self, audio_file, audio_sha256):
+        """Transcribe an audio file, reusing the cached result for identical audio"""
+        backend = self.asr_backend
+        cache = get_transcription_cache()
+        with tracer.span('asr.transcribe', model=backend.model) as span:
+            transcript = cache.get(audio_sha256, backend.model, backend.response_format)
+            span.set('cached', transcript is not None)
+            if transcript is not None:
+                print("   ✅ Transcription loaded from cache")
+                return transcript
+            
+            print(f"   🎯 Transcribing with {backend.model}...")
+            transcript = backend.transcribe(audio_file)
+            print(f"   ✅ Transcription complete!")
+        
+        cache.put(audio_sha256, backend.model, backend.response_format, transcript)
+        return transcript
+    
+    def reprocess_transcript(self, transcript_path):
+        """
+        Rebuild a saved transcript JSON from the cached transcription of its recording.
+        No network: returns False if the recording or its cached transcription is missing.
+        """
+        with open(transcript_path, 'r') as f:
+            transcript_data = json.load(f)
+        
+        call_id = transcript_data['call_id']
+        audio_file = os.path.join(os.path.dirname(transcript_path), f"{call_id}_recording.mp3")
+        if not os.path.exists(audio_file):
+            return False
+        
+        transcript = get_transcription_cache().get(
+            file_sha256(audio_file), self.asr_backend.model, self.asr_backend.response_format
+        )
+        if transcript is None:
+            return False
+        
+        # Keep the scripted patient lines, re-derive everything parsed from audio
+        self.script_schedule = transcript_data.get('script_schedule', [])
+        self.conversation_log = [
+            entry for entry in transcript_data['conversation']
+            if entry['speaker'] == 'patient' and 'turn' in entry
+        ]
+        self._parse_transcription(transcript, call_id)
+        transcript_data['conversation'] = self.conversation_log
+        
+        with open(transcript_path, 'w') as f:
+            json.dump(transcript_data, f, indent=2)
+        
+        return True
     
     def _parse_transcription(self, transcript, call_id):
         """
         Parse Whisper transcription and identify agent vs patient
         """
-        try:
-            full_text = transcript.text
-            
-            print(f"\n📝 Full Transcription:")
-            print(f"   {full_text}")
-            
-            # Add full transcription to log
-            self.conversation_log.append({
-                "speaker": "full_recording",
-                "message": full_text,
-                "timestamp": datetime.now().isoformat(),
-                "note": "Complete call transcription - includes both patient and agent"
-            })
-            
-            # Simple speaker detection
-            segments = full_text.split('. ')
-            
-            for segment in segments:
-                if segment.strip():
-                    is_patient = any(msg.lower() in segment.lower() 
-                                   for msg in [log['message'] for log in self.conversation_log 
-                                             if log['speaker'] == 'patient'])
-                    
-                    speaker = "patient" if is_patient else "agent"
-                    
-                    self.conversation_log.append({
-                        "speaker": speaker,
-                        "message": segment.strip(),
-                        "timestamp": datetime.now().isoformat(),
-                        "note": "Parsed from audio (speaker detection is approximate)"
-                    })
-            
-        except Exception as e:
-            print(f"   ❌ Error parsing transcription: {e}")
+        full_text = transcript['text']
+        
+        print(f"\n📝 Full Transcription:")
+        print(f"   {full_text}")
+        
+        # Add full transcription to log
+        self.conversation_log.append({
+            "speaker": "full_recording",
+            "message": full_text,
+            "timestamp": datetime.now().isoformat(),
+            "note": "Complete call transcription - includes both patient and agent"
+        })
+        
+        segments = transcript.get('segments')
+        
+        if segments and self.script_schedule:
+            # Attribute speakers by when each segment was said vs the TwiML schedule
+            for speaker, segment in attribute_segments(segments, self.script_schedule):
+                self.conversation_log.append({
+                    "speaker": speaker,
+                    "message": segment['text'].strip(),
+                    "start": segment['start'],
+                    "end": segment['end'],
+                    "timestamp": datetime.now().isoformat(),
+                    "note": "Parsed from audio (speaker from segment timestamps)"
+                })
+        else:
+            # No timestamps - match sentences against the script text
+            script_lines = [log['message'] for log in self.conversation_log if log['speaker'] == 'patient']
+            for speaker, sentence in attribute_sentences(full_text, script_lines):
+                self.conversation_log.append({
+                    "speaker": speaker,
+                    "message": sentence,
+                    "timestamp": datetime.now().isoformat(),
+                    "note": "Parsed from audio (speaker detection is approximate)"
+                })
     
     def _save_transcript(self, call_id, scenario, call_sid):
         """Save call transcript to file"""
@@ -352,13 +560,26 @@ class CallHandler:
             "timestamp": datetime.now().isoformat(),
             "target_number": self.to_number,
             "conversation": self.conversation_log,
+            "metrics": self.call_metrics,
+            "script_schedule": self.script_schedule,
             "note": "Real call to 805-439-8008. Transcription parsed from audio recording."
         }
+        if 'variant' in scenario:
+            # Generated scenario - enough to regenerate it
+            transcript_data["variant"] = scenario['variant']
         
         os.makedirs('transcripts', exist_ok=True)
         
-        with open(filename, 'w') as f:
-            json.dump(transcript_data, f, indent=2)
+        transcript_format = os.getenv('TRANSCRIPT_FORMAT', 'json')
+        with tracer.span('transcript.save', format=transcript_format):
+            if transcript_format == 'archive':
+                # Compact append-only archive instead of one JSON file per call
+                filename = get_archive_writer().append(transcript_data)
+            else:
+                with open(filename, 'w') as f:
+                    json.dump(transcript_data, f, indent=2)
+                TranscriptIndex('transcripts').append(filename, transcript_data)
+        self.transcript_path = filename
         
         print(f"\n💾 Transcript saved: {filename}")
         print(f"📊 Logged items: {len(self.conversation_log)}")
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Embedded receiver for Twilio status callbacks
+Wakes the thread waiting on a call as soon as Twilio posts its status or recording events
+"""
+
+import os
+import time
+import threading
+
+TERMINAL_CALL_STATUSES = ('completed', 'failed', 'busy', 'no-answer', 'canceled')
+
+STATUS_PATH = '/twilio/status'
+RECORDING_PATH = '/twilio/recording'
+TTS_PATH = '/tts'
+
+
+class CallWaiter:
+    """Status and recording events received for one call"""
+
+    def __init__(self):
+        self.status = None
+        self.statuses = []
+        self.status_times = []
+        self.recordings = []
+        self.completed = threading.Event()
+        self.recording_ready = threading.Event()
+
+
+class CallbackServer:
+    def __init__(self, public_url, host='0.0.0.0', port=5000, auth_token=None, tts_dir=None):
+        """
+        public_url: base URL Twilio can reach this server on (e.g. an ngrok tunnel)
+        auth_token: Twilio auth token used to validate request signatures (None disables validation)
+        tts_dir: directory of cached TTS MP3s served for <Play> (None disables the route)
+        """
+        self.public_url = public_url.rstrip('/')
+        self.host = host
+        self.port = port
+        self.auth_token = auth_token
+        self.tts_dir = tts_dir
+        self.waiters = {}
+        self.lock = threading.Lock()
+        # Built by start() - a server that is only fed events in-process (e.g. by the simulator) needs no Flask
+        self.app = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def status_callback_url(self):
+        return f"{self.public_url}{STATUS_PATH}"
+
+    @property
+    def recording_callback_url(self):
+        return f"{self.public_url}{RECORDING_PATH}"
+
+    def tts_url(self, key):
+        return f"{self.public_url}{TTS_PATH}/{key}.mp3"
+
+    def _create_app(self):
+        """Build the Flask app with the two callback routes"""
+        from flask import Flask, request, abort, send_from_directory
+
+        app = Flask(__name__)
+
+        def check_signature():
+            if not self.auth_token:
+                return
+            from twilio.request_validator import RequestValidator
+            validator = RequestValidator(self.auth_token)
+            url = f"{self.public_url}{request.path}"
+            if not validator.validate(url, request.form, request.headers.get('X-Twilio-Signature', '')):
+                abort(403)
+
+        @app.route(STATUS_PATH, methods=['POST'])
+        def call_status():
+            check_signature()
+            self.on_call_status(request.form.get('CallSid'), request.form.get('CallStatus'))
+            return '', 204
+
+        @app.route(RECORDING_PATH, methods=['POST'])
+        def recording_status():
+            check_signature()
+            self.on_recording_status(request.form.get('CallSid'), dict(request.form))
+            return '', 204
+
+        @app.route(f'{TTS_PATH}/<key>.mp3', methods=['GET'])
+        def tts_audio(key):
+            if not self.tts_dir:
+                abort(404)
+            return send_from_directory(os.path.abspath(self.tts_dir), f"{key}.mp3", mimetype='audio/mpeg')
+
+        return app
+
+    def waiter(self, call_sid):
+        """Get (or create) the waiter for a call - callbacks may arrive before the caller registers"""
+        with self.lock:
+            waiter = self.waiters.get(call_sid)
+            if waiter is None:
+                waiter = CallWaiter()
+                self.waiters[call_sid] = waiter
+            return waiter
+
+    def forget(self, call_sid):
+        """Drop state for a finished call"""
+        with self.lock:
+            self.waiters.pop(call_sid, None)
+
+    def on_call_status(self, call_sid, status):
+        if not call_sid or not status:
+            return
+        waiter = self.waiter(call_sid)
+        waiter.status = status
+        waiter.statuses.append(status)
+        waiter.status_times.append((status, time.time()))
+        print(f"   [{call_sid[-6:]}] Status: {status}")
+        if status in TERMINAL_CALL_STATUSES:
+            waiter.completed.set()
+
+    def on_recording_status(self, call_sid, event):
+        if not call_sid:
+            return
+        waiter = self.waiter(call_sid)
+        if event.get('RecordingStatus', 'completed') == 'completed':
+            waiter.recordings.append(event)
+            waiter.recording_ready.set()
+
+    def wait_for_completion(self, call_sid, timeout):
+        """Block until the call reaches a terminal status; returns it, or None on timeout"""
+        waiter = self.waiter(call_sid)
+        if waiter.completed.wait(timeout):
+            return waiter.status
+        return None
+
+    def start(self):
+        """Serve callbacks on a background thread"""
+        if self._thread:
+            return
+        from werkzeug.serving import make_server
+
+        if self.app is None:
+            self.app = self._create_app()
+        self._server = make_server(self.host, self.port, self.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"📡 Callback server listening on {self.host}:{self.port} ({self.public_url})")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+_callback_server = None
+_callback_server_lock = threading.Lock()
+
+
+def get_callback_server():
+    """
+    Shared callback server, started on first use.
+    Returns None unless PUBLIC_BASE_URL is set (or a server was installed) - callers then fall back to polling.
+    """
+    global _callback_server
+
+    public_url = os.getenv('PUBLIC_BASE_URL')
+
+    with _callback_server_lock:
+        if _callback_server is None:
+            if not public_url:
+                return None
+            _callback_server = CallbackServer(
+                public_url,
+                port=int(os.getenv('CALLBACK_PORT', '5000')),
+                auth_token=os.getenv('TWILIO_AUTH_TOKEN'),
+                tts_dir=os.getenv('TTS_CACHE_DIR', 'transcripts/.cache/tts')
+            )
+            _callback_server.start()
+        return _callback_server
+
+
+def set_callback_server(server):
+    """Install `server` as the shared callback server as-is, without starting it (None to reset)"""
+    global _callback_server
+
+    with _callback_server_lock:
+        _callback_server = server
@@ -0,0 +1,176 @@
+"""
+Campaign runner - places several scenario calls at once
+Replaces the serial call-then-sleep loop with a worker pool and a per-account rate limiter
+"""
+
+import os
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Above this many calls the report prints totals only
+PER_CALL_REPORT_LIMIT = 50
+
+
+class RateLimiter:
+    """Token bucket that spaces out call creation on one Twilio account"""
+
+    def __init__(self, calls_per_minute, burst=1):
+        self.interval = rate_interval(calls_per_minute)
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may be placed"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                delay = (1 - self.tokens) * self.interval
+
+            time.sleep(delay)
+
+    def set_rate(self, calls_per_minute):
+        """Change the rate; tokens already earned are kept"""
+        interval = rate_interval(calls_per_minute)
+        with self.lock:
+            self.interval = interval
+
+
+def rate_interval(calls_per_minute):
+    """Seconds between calls at calls_per_minute; the rate has to be positive"""
+    if not calls_per_minute or calls_per_minute <= 0:
+        raise ValueError(f"calls_per_minute must be positive, got {calls_per_minute}")
+    return 60.0 / calls_per_minute
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(account_sid, calls_per_minute, burst=1):
+    """
+    Return the shared limiter for a Twilio account (one bucket per account).
+    A later call with a different rate changes the account's rate rather than adding a second bucket.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(account_sid)
+        if limiter is None:
+            limiter = RateLimiter(calls_per_minute, burst)
+            _rate_limiters[account_sid] = limiter
+        else:
+            limiter.set_rate(calls_per_minute)
+        return limiter
+
+
+class CampaignRunner:
+    def __init__(self, run_call, concurrency=1, calls_per_minute=4, account_sid=None):
+        """
+        run_call: function(scenario) -> call_sid (or None on failure)
+        concurrency: number of calls in flight at once
+        calls_per_minute: rate limit applied per Twilio account
+        """
+        self.run_call = run_call
+        self.concurrency = max(1, concurrency)
+        account_sid = account_sid or os.getenv('TWILIO_ACCOUNT_SID') or 'default'
+        self.rate_limiter = get_rate_limiter(account_sid, calls_per_minute)
+        self.results = []
+        self.results_lock = threading.Lock()
+
+    def _run_one(self, index, scenario):
+        """Wait for a rate limit slot, then run one call and time it"""
+        self.rate_limiter.acquire()
+
+        start = time.monotonic()
+        try:
+            call_sid = self.run_call(scenario)
+        except Exception as e:
+            print(f"❌ Scenario {scenario['id']} crashed: {e}")
+            call_sid = None
+        elapsed = time.monotonic() - start
+
+        result = {
+            "index": index,
+            "scenario_id": scenario['id'],
+            "scenario_name": scenario['name'],
+            "call_sid": call_sid,
+            "wall_time": elapsed
+        }
+        with self.results_lock:
+            self.results.append(result)
+        return result
+
+    def run(self, scenarios):
+        """
+        Run every scenario with at most `concurrency` calls in flight.
+        Scenarios are pulled from the iterable as slots free up, so it can be a generator.
+        """
+        self.results = []
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = set()
+            for index, scenario in enumerate(scenarios, 1):
+                if len(pending) >= self.concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(self._run_one, index, scenario))
+            wait(pending)
+
+        self.wall_time = time.monotonic() - start
+        return self.summary()
+
+    def summary(self):
+        """Throughput and per-call wall time for the last run"""
+        results = sorted(self.results, key=lambda r: r['index'])
+        times = sorted(r['wall_time'] for r in results)
+        completed = sum(1 for r in results if r['call_sid'])
+
+        return {
+            "calls": len(results),
+            "completed": completed,
+            "failed": len(results) - completed,
+            "concurrency": self.concurrency,
+            "wall_time": self.wall_time,
+            "calls_per_hour": len(results) / self.wall_time * 3600 if self.wall_time else 0.0,
+            "mean_call_time": sum(times) / len(times) if times else 0.0,
+            "p50_call_time": _percentile(times, 50),
+            "max_call_time": times[-1] if times else 0.0,
+            "results": results
+        }
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def print_campaign_report(summary):
+    """Print the end-of-campaign report"""
+    print(f"\n{'='*60}")
+    print("📊 CAMPAIGN REPORT")
+    print(f"{'='*60}")
+    print(f"Calls: {summary['calls']} ({summary['completed']} completed, {summary['failed']} failed)")
+    print(f"Concurrency: {summary['concurrency']}")
+    print(f"Wall time: {summary['wall_time']:.1f}s")
+    print(f"Throughput: {summary['calls_per_hour']:.1f} calls/hour")
+    print(f"Per-call wall time: mean {summary['mean_call_time']:.1f}s, "
+          f"p50 {summary['p50_call_time']:.1f}s, max {summary['max_call_time']:.1f}s")
+    if len(summary['results']) > PER_CALL_REPORT_LIMIT:
+        print(f"\n(per-call lines omitted for {len(summary['results'])} calls)")
+        return
+    print("\nPer call:")
+    for r in summary['results']:
+        status = "✅" if r['call_sid'] else "❌"
+        print(f"   {status} #{r['scenario_id']} {r['scenario_name']}: {r['wall_time']:.1f}s")
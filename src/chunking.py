@@ -0,0 +1,124 @@
+"""
+Silence-aware chunked transcription
+Cuts long dead air out of a recording, splits it on pauses and transcribes the chunks in parallel
+Segment timestamps are mapped back onto the original recording's timeline
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from src.asr import TranscriptionBackend
+
+# Groq bills every request as at least 10 seconds of audio
+MIN_BILLED_SECONDS = 10
+
+
+def plan_chunks(audio, min_silence_ms=1000, silence_offset_db=16, keep_silence_ms=300,
+                target_chunk_ms=30000):
+    """
+    Return chunks as lists of (start_ms, end_ms) speech ranges on the original timeline.
+    Silences longer than min_silence_ms are cut down to keep_silence_ms on each side,
+    and chunks only end on a pause, once they hold at least target_chunk_ms of audio.
+    """
+    from pydub.silence import detect_nonsilent
+
+    silence_thresh = audio.dBFS - silence_offset_db
+    speech = detect_nonsilent(audio, min_silence_len=min_silence_ms, silence_thresh=silence_thresh)
+
+    # Pad each speech range and merge ranges whose padding overlaps
+    ranges = []
+    for start, end in speech:
+        start = max(0, start - keep_silence_ms)
+        end = min(len(audio), end + keep_silence_ms)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+
+    chunks = []
+    current = []
+    current_ms = 0
+    for start, end in ranges:
+        current.append((start, end))
+        current_ms += end - start
+        if current_ms >= target_chunk_ms:
+            chunks.append(current)
+            current = []
+            current_ms = 0
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def to_original_time(ranges, local_seconds):
+    """Map a time inside a chunk (seconds from its start) back onto the original recording"""
+    local_ms = local_seconds * 1000
+    offset = 0
+    for start, end in ranges:
+        length = end - start
+        if local_ms <= offset + length:
+            return round((start + local_ms - offset) / 1000, 2)
+        offset += length
+    return round(ranges[-1][1] / 1000, 2)
+
+
+class ChunkedBackend(TranscriptionBackend):
+    """Wraps another backend; transcribes silence-trimmed chunks of the audio in parallel"""
+    name = "chunked"
+
+    def __init__(self, backend, workers=4, **chunk_options):
+        self.backend = backend
+        self.model = f"{backend.model}+chunked"
+        self.response_format = backend.response_format
+        self.workers = workers
+        self.chunk_options = chunk_options
+
+    def transcribe(self, audio_path):
+        from pydub import AudioSegment
+
+        audio = AudioSegment.from_file(audio_path)
+        chunks = plan_chunks(audio, **self.chunk_options)
+        if not chunks:
+            return {
+                "text": "",
+                "duration": round(len(audio) / 1000, 2),
+                "segments": [],
+                "chunking": {"chunks": 0, "speech_seconds": 0, "billed_seconds": 0}
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i, ranges in enumerate(chunks):
+                piece = sum((audio[start:end] for start, end in ranges[1:]), audio[ranges[0][0]:ranges[0][1]])
+                path = os.path.join(tmp_dir, f"chunk_{i:03d}.mp3")
+                piece.export(path, format='mp3')
+                paths.append(path)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self.backend.transcribe, paths))
+
+        # Stitch segments back together on the original timeline
+        segments = []
+        for ranges, result in zip(chunks, results):
+            for segment in result.get('segments') or []:
+                segments.append({
+                    "id": len(segments),
+                    "start": to_original_time(ranges, segment['start']),
+                    "end": to_original_time(ranges, segment['end']),
+                    "text": segment['text']
+                })
+
+        chunk_seconds = [sum(end - start for start, end in ranges) / 1000 for ranges in chunks]
+
+        return {
+            "text": ' '.join(result.get('text', '').strip() for result in results).strip(),
+            "duration": round(len(audio) / 1000, 2),
+            "segments": segments,
+            "chunking": {
+                "chunks": len(chunks),
+                "speech_seconds": round(sum(chunk_seconds), 2),
+                "billed_seconds": round(sum(max(MIN_BILLED_SECONDS, s) for s in chunk_seconds), 2)
+            }
+        }
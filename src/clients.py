@@ -0,0 +1,112 @@
+"""
+Shared API clients - built once per process and reused by every call in a campaign
+Each client keeps a connection pool, so calls reuse TLS connections instead of opening new ones.
+SDKs and .env are only loaded when the first client is built, so importing this module is cheap.
+"""
+
+import os
+import threading
+
+_clients = {}
+_clients_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ once (called before the first client is built, and by main)"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def pool_size():
+    """Max connections kept per host (HTTP_POOL_SIZE, default 10)"""
+    return int(os.getenv('HTTP_POOL_SIZE', '10'))
+
+
+def _get_or_create(name, factory):
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            load_env()
+            client = factory()
+            _clients[name] = client
+        return client
+
+
+def _pooled_adapter():
+    from requests.adapters import HTTPAdapter
+    return HTTPAdapter(pool_connections=4, pool_maxsize=pool_size())
+
+
+def _httpx_client():
+    import httpx
+    size = pool_size()
+    return httpx.Client(limits=httpx.Limits(max_connections=size, max_keepalive_connections=size))
+
+
+def get_http_session():
+    """requests.Session for plain downloads (recording MP3s)"""
+    def create():
+        import requests
+        session = requests.Session()
+        session.mount('https://', _pooled_adapter())
+        session.mount('http://', _pooled_adapter())
+        return session
+    return _get_or_create('http', create)
+
+
+def get_twilio_client():
+    def create():
+        from twilio.rest import Client
+        from twilio.http.http_client import TwilioHttpClient
+
+        http_client = TwilioHttpClient(pool_connections=True)
+        http_client.session.mount('https://', _pooled_adapter())
+        return Client(
+            os.getenv('TWILIO_ACCOUNT_SID'),
+            os.getenv('TWILIO_AUTH_TOKEN'),
+            http_client=http_client
+        )
+    return _get_or_create('twilio', create)
+
+
+def get_openai_client():
+    def create():
+        from openai import OpenAI
+        return OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=_httpx_client())
+    return _get_or_create('openai', create)
+
+
+def get_anthropic_client():
+    def create():
+        from anthropic import Anthropic
+        return Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), http_client=_httpx_client())
+    return _get_or_create('anthropic', create)
+
+
+def get_groq_client():
+    def create():
+        from groq import Groq
+        return Groq(api_key=os.getenv('GROQ_API_KEY'), http_client=_httpx_client())
+    return _get_or_create('groq', create)
+
+
+def set_client(name, client):
+    """Replace a shared client, e.g. with a simulator fake ('twilio', 'openai', 'anthropic', 'groq', 'http')"""
+    with _clients_lock:
+        _clients[name] = client
+
+
+def reset_clients():
+    """Close and forget every shared client (next use builds fresh ones)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+
+    for client in clients:
+        close = getattr(client, 'close', None)
+        if close:
+            close()
@@ -0,0 +1,117 @@
+"""
+Streaming recording downloads
+Audio is streamed in chunks to a .part file, hashed on the way, and atomically renamed into place
+"""
+
+import os
+import time
+import hashlib
+
+from src.clients import get_http_session
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+def sidecar_path(audio_path):
+    """Checksum file written next to every verified download"""
+    return f"{audio_path}.sha256"
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def verified_digest(audio_path, recording_sid):
+    """Return the file's sha256 if it is a complete, verified download of this recording, else None"""
+    try:
+        with open(sidecar_path(audio_path), 'r') as f:
+            digest, sid = f.read().split()
+    except (OSError, ValueError):
+        return None
+
+    if sid != recording_sid or not os.path.exists(audio_path):
+        return None
+    if file_sha256(audio_path) != digest:
+        return None
+    return digest
+
+
+def download_recording(url, audio_path, recording_sid, auth=None, max_retries=3):
+    """
+    Stream a recording to audio_path and return its sha256.
+    Skips the download when a verified copy of this recording SID is already on disk,
+    and resumes with an HTTP Range request if the connection breaks part way.
+    """
+    digest = verified_digest(audio_path, recording_sid)
+    if digest:
+        print(f"   ✅ Already downloaded: {audio_path}")
+        return digest
+
+    import requests
+
+    session = get_http_session()
+    part_path = f"{audio_path}.part"
+    os.makedirs(os.path.dirname(audio_path) or '.', exist_ok=True)
+
+    # A .part left by an earlier run is resumed rather than thrown away
+    hasher = hashlib.sha256()
+    received = 0
+    if os.path.exists(part_path):
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                received += len(chunk)
+
+    attempt = 0
+    expected = None
+    while True:
+        headers = {'Range': f'bytes={received}-'} if received else {}
+        try:
+            with session.get(url, auth=auth, headers=headers, stream=True, timeout=(10, 60)) as response:
+                if response.status_code == 416 and received:
+                    # Nothing left to send - the .part is already complete
+                    break
+
+                if response.status_code == 200 and received:
+                    # Server ignored the Range header, start over
+                    hasher = hashlib.sha256()
+                    received = 0
+                elif response.status_code not in (200, 206):
+                    raise DownloadError(f"HTTP {response.status_code}")
+
+                length = response.headers.get('Content-Length')
+                if length is not None:
+                    expected = received + int(length)
+
+                with open(part_path, 'ab' if received else 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        received += len(chunk)
+
+            if expected is not None and received < expected:
+                raise requests.ConnectionError(f"connection closed at {received}/{expected} bytes")
+            break
+
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise DownloadError(f"gave up after {max_retries} retries: {e}")
+            print(f"   ⚠️  Download interrupted at {received} bytes, resuming ({attempt}/{max_retries})")
+            time.sleep(min(2 ** attempt, 10))
+
+    digest = hasher.hexdigest()
+    os.replace(part_path, audio_path)
+    with open(sidecar_path(audio_path), 'w') as f:
+        f.write(f"{digest} {recording_sid}\n")
+
+    return digest
@@ -0,0 +1,95 @@
+"""
+Persisted per-transcript bug findings for incremental analysis
+SQLite table keyed by transcript file, with the file's mtime, size, hash and the rule-set version
+it was analyzed under
+"""
+
+import os
+import json
+import sqlite3
+
+from src.downloads import file_sha256
+
+RESULTS_DB = '.analysis.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    rules_version TEXT NOT NULL,
+    findings TEXT NOT NULL
+)
+"""
+
+
+class FindingsStore:
+    def __init__(self, db_path, rules_version):
+        """rules_version: findings stored under any other version are treated as stale"""
+        self.db_path = db_path
+        self.rules_version = rules_version
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def stale(self, paths):
+        """
+        Paths whose stored findings can't be reused.
+        A file whose stat changed but whose hash didn't (e.g. touched or copied) is kept,
+        with its new stat recorded.
+        """
+        rows = {
+            file: (mtime_ns, size, sha256)
+            for file, mtime_ns, size, sha256 in self.conn.execute(
+                "SELECT file, mtime_ns, size, sha256 FROM results WHERE rules_version = ?",
+                (self.rules_version,))
+        }
+
+        stale = []
+        touched = []
+        for path in paths:
+            stat = os.stat(path)
+            row = rows.get(os.path.basename(path))
+            if row is None:
+                stale.append(path)
+            elif row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+                continue
+            elif file_sha256(path) == row[2]:
+                touched.append((stat.st_mtime_ns, stat.st_size, os.path.basename(path)))
+            else:
+                stale.append(path)
+
+        if touched:
+            with self.conn:
+                self.conn.executemany("UPDATE results SET mtime_ns = ?, size = ? WHERE file = ?", touched)
+        return stale
+
+    def save_all(self, results):
+        """Store (path, findings) pairs in one transaction"""
+        rows = []
+        for path, findings in results:
+            stat = os.stat(path)
+            rows.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size, file_sha256(path),
+                         self.rules_version, json.dumps(findings)))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def findings(self, paths):
+        """Stored findings for paths, concatenated in path order"""
+        stored = dict(self.conn.execute(
+            "SELECT file, findings FROM results WHERE rules_version = ?", (self.rules_version,)))
+        bugs = []
+        for path in paths:
+            findings = stored.get(os.path.basename(path))
+            if findings:
+                bugs.extend(json.loads(findings))
+        return bugs
@@ -0,0 +1,185 @@
+"""
+Combinatorial scenario generator for load sweeps
+Builds scenario variants from persona, intent, date-of-birth and medication pools plus perturbation
+rules. Variants are produced lazily and each one depends only on (seed, index), so a sweep is reproducible.
+"""
+
+import random
+import hashlib
+from itertools import count as _count
+
+# Generated ids start here so they never collide with the hand-written scenarios
+GENERATED_ID_BASE = 100000
+
+FIRST_NAMES = ["Sarah", "John", "Emily", "Michael", "Lisa", "David", "Jennifer", "Robert", "Amanda", "Chris",
+               "Maria", "James", "Priya", "Ahmed", "Grace", "Tom", "Olivia", "Wei", "Fatima", "Daniel"]
+LAST_NAMES = ["Chen", "Martinez", "Thompson", "Rodriguez", "Wang", "Kim", "Lee", "Brown", "Foster", "Anderson",
+              "Garcia", "Patel", "Nguyen", "Johnson", "Okafor", "Schmidt", "Rossi", "Cohen", "Silva", "Murphy"]
+PERSONA_TRAITS = ["new patient", "existing patient", "elderly", "in a hurry", "soft-spoken", "non-native speaker"]
+
+MEDICATIONS = ["lisinopril", "metformin", "atorvastatin", "levothyroxine", "amlodipine", "omeprazole",
+               "albuterol", "sertraline", "losartan", "gabapentin"]
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+# Script lines may use {name}, {dob}, {medication} and {medication_title}
+INTENTS = {
+    "schedule": {
+        "name": "Appointment Scheduling",
+        "goal": "Schedule an appointment",
+        "initial_message": "Hi, I'd like to schedule an appointment.",
+        "context": "Provide name and date of birth when asked, flexible on times",
+        "script": ["Hi, I'm {name}. I'd like to schedule an appointment.", "{dob}", "Yes, that's correct.",
+                   "A general checkup.", "The earliest available time works for me.", "Thank you!"]
+    },
+    "refill": {
+        "name": "Medication Refill",
+        "goal": "Request prescription refill",
+        "initial_message": "Hello, I need to refill my medication.",
+        "context": "Mention the medication when asked",
+        "script": ["Hi, I'm {name}. I need a medication refill.", "{dob}", "Correct.",
+                   "{medication_title}.", "Yes, please process that.", "Thank you!"]
+    },
+    "reschedule": {
+        "name": "Appointment Rescheduling",
+        "goal": "Reschedule existing appointment",
+        "initial_message": "Hi, I need to reschedule my appointment.",
+        "context": "Flexible with new times",
+        "script": ["Hi, I'm {name}. I need to reschedule.", "{dob}", "Yes.",
+                   "My appointment next week, to a later day.", "Yes, that works.", "Thank you!"]
+    },
+    "cancel": {
+        "name": "Cancellation",
+        "goal": "Cancel an upcoming appointment",
+        "initial_message": "Hi, I need to cancel my appointment.",
+        "context": "Straightforward cancellation",
+        "script": ["Hi, I'm {name}. I need to cancel.", "{dob}", "My appointment next week.",
+                   "Yes, cancel it. Thank you!"]
+    },
+    "hours": {
+        "name": "Office Hours Inquiry",
+        "goal": "Ask about office hours and location",
+        "initial_message": "Hi, what are your office hours?",
+        "context": "Just gathering information, not booking yet",
+        "script": ["What are your weekend hours?", "And the downtown location address?", "Thank you!"]
+    },
+    "insurance": {
+        "name": "Insurance Question",
+        "goal": "Verify insurance coverage",
+        "initial_message": "Hello, do you accept my insurance?",
+        "context": "Needs confirmation before booking",
+        "script": ["Do you accept Blue Cross Blue Shield?", "Yes, PPO.", "Thank you!"]
+    },
+    "urgent": {
+        "name": "Urgent Appointment",
+        "goal": "Get same-day or next-day appointment",
+        "initial_message": "Hi, I'm not feeling well and need to see a doctor soon.",
+        "context": "Urgent but not emergency",
+        "script": ["I'm not feeling well. Do you have anything today?", "Any urgent options?", "Okay, thank you."]
+    },
+    "billing": {
+        "name": "Billing Question",
+        "goal": "Ask about a bill from previous visit",
+        "initial_message": "Hi, I have a question about my bill.",
+        "context": "Wants explanation of billing",
+        "script": ["I have a billing question.", "My visit last month. The amount seems high.", "Thank you!"]
+    },
+}
+
+
+def _confusion(script, rng, facts):
+    """Hesitate on one line and ask the agent to repeat itself"""
+    i = rng.randrange(len(script))
+    script[i] = f"Um, sorry... {script[i][0].lower()}{script[i][1:]}"
+    script.insert(rng.randrange(1, len(script) + 1), "Sorry, what was the question?")
+    return script
+
+
+def _interruption(script, rng, facts):
+    """Change topic in the middle of the call"""
+    script.insert(rng.randrange(1, len(script) + 1),
+                  rng.choice(["Wait, before that - what's your address?",
+                              "Sorry, can I ask something first? Do you take walk-ins?",
+                              "Hold on, is the doctor in on Fridays?"]))
+    return script
+
+
+def _wrong_fact(script, rng, facts):
+    """Give a wrong date of birth, then correct it"""
+    if facts['dob'] not in script:
+        return script
+    i = script.index(facts['dob'])
+    script[i] = _date_of_birth(rng)
+    script.insert(i + 1, f"Sorry, I meant {facts['dob']}")
+    return script
+
+
+PERTURBATIONS = {
+    "confusion": _confusion,
+    "interruption": _interruption,
+    "wrong_fact": _wrong_fact,
+}
+
+
+def _date_of_birth(rng):
+    return f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {rng.randint(1940, 2005)}."
+
+
+def variant_id(seed, index):
+    """
+    Scenario id of variant `index` of sweep `seed`. It depends on both, so variants from different seeds
+    never share an id (and with it learned timings, bug-rule plans or transcripts).
+    """
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return GENERATED_ID_BASE + int.from_bytes(digest[:6], 'big')
+
+
+def generate_scenario(seed, index, intents=None, perturbation_rate=0.3):
+    """
+    Variant number `index` of sweep `seed`.
+    Each perturbation rule applies independently with probability perturbation_rate.
+    """
+    rng = random.Random(f"{seed}:{index}")
+    intent_name = rng.choice(sorted(intents or INTENTS))
+    intent = INTENTS[intent_name]
+
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    medication = rng.choice(MEDICATIONS)
+    facts = {
+        "name": name,
+        "dob": _date_of_birth(rng),
+        "medication": medication,
+        "medication_title": medication.capitalize()
+    }
+
+    script = [line.format(**facts) for line in intent['script']]
+    applied = []
+    for rule, perturb in PERTURBATIONS.items():
+        if rng.random() < perturbation_rate:
+            script = perturb(script, rng, facts)
+            applied.append(rule)
+
+    context = intent['context']
+    if intent_name == 'refill':
+        context += f"; the medication is {medication}"
+    if applied:
+        context += f"; behaviour: {', '.join(applied)}"
+
+    return {
+        "id": variant_id(seed, index),
+        "name": f"{intent['name']} (variant {index})",
+        "persona": f"{name}, {rng.choice(PERSONA_TRAITS)}",
+        "goal": intent['goal'],
+        "initial_message": intent['initial_message'],
+        "context": context,
+        "script": script,
+        "variant": {"seed": seed, "index": index, "intent": intent_name, "perturbations": applied}
+    }
+
+
+def iter_scenarios(seed=0, count=None, start=0, **kwargs):
+    """Lazily yield variants start, start+1, ... (forever when count is None)"""
+    indexes = _count(start) if count is None else range(start, start + count)
+    for index in indexes:
+        yield generate_scenario(seed, index, **kwargs)
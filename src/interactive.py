@@ -0,0 +1,421 @@
+"""
+Real-time interactive calls over Twilio Media Streams
+The agent's audio streams in over a WebSocket; transcription starts as soon as the agent pauses,
+and at end of turn we stream a reply from VoiceBot and start speaking as soon as the first sentence is ready
+"""
+
+import io
+import os
+import json
+import time
+import wave
+import array
+import queue
+import base64
+import asyncio
+import collections
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+
+# --- mu-law codec (G.711) ---
+
+def _ulaw_to_linear(u):
+    u = ~u & 0xFF
+    sign = u & 0x80
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    sample = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return -sample if sign else sample
+
+
+def _linear_to_ulaw(sample):
+    sign = 0x80 if sample < 0 else 0
+    if sign:
+        sample = -sample
+    sample = min(sample, 32635) + 0x84
+    exponent = max(0, (sample >> 7).bit_length() - 1)
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+_ULAW_TO_PCM = array.array('h', [_ulaw_to_linear(u) for u in range(256)])
+_PCM_TO_ULAW = None
+
+
+def ulaw_to_pcm16(data):
+    """mu-law bytes -> 16-bit little-endian PCM bytes"""
+    return array.array('h', [_ULAW_TO_PCM[b] for b in data]).tobytes()
+
+
+def pcm16_to_ulaw(data):
+    """16-bit little-endian PCM bytes -> mu-law bytes"""
+    global _PCM_TO_ULAW
+    if _PCM_TO_ULAW is None:
+        _PCM_TO_ULAW = bytes(_linear_to_ulaw(s if s < 32768 else s - 65536) for s in range(65536))
+    samples = array.array('h')
+    samples.frombytes(data)
+    return bytes(_PCM_TO_ULAW[s & 0xFFFF] for s in samples)
+
+
+def mp3_to_ulaw(mp3_bytes):
+    """Decode TTS output to 8 kHz mono mu-law for the media stream"""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(mp3_bytes), format='mp3')
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    return pcm16_to_ulaw(audio.raw_data)
+
+
+class TurnDetector:
+    """Energy-based end-of-turn detection on 20 ms PCM frames"""
+
+    def __init__(self, threshold=500, end_silence_ms=700, min_speech_ms=200, pause_ms=200):
+        self.threshold = threshold
+        self.end_silence_frames = end_silence_ms // 20
+        self.min_speech_frames = min_speech_ms // 20
+        self.pause_frames = pause_ms // 20
+        self.reset()
+
+    def reset(self):
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.in_speech = False
+
+    def feed(self, pcm_frame):
+        """
+        Returns 'speech_start', 'pause' (short silence mid-turn), 'resume' (speech again after a pause),
+        'end_of_turn' or None
+        """
+        samples = array.array('h')
+        samples.frombytes(pcm_frame)
+        if not samples:
+            return None
+        rms = (sum(s * s for s in samples) / len(samples)) ** 0.5
+
+        if rms >= self.threshold:
+            resumed = self.in_speech and self.silence_frames >= self.pause_frames
+            self.speech_frames += 1
+            self.silence_frames = 0
+            if not self.in_speech and self.speech_frames >= self.min_speech_frames:
+                self.in_speech = True
+                return 'speech_start'
+            if resumed:
+                return 'resume'
+        else:
+            self.silence_frames += 1
+            if not self.in_speech:
+                self.speech_frames = 0
+            elif self.silence_frames >= self.end_silence_frames:
+                self.reset()
+                return 'end_of_turn'
+            elif self.silence_frames == self.pause_frames:
+                return 'pause'
+        return None
+
+
+class InteractiveSession:
+    """One interactive call: buffers agent audio, detects turns, speaks the bot's replies"""
+
+    def __init__(self, call_id, bot, asr_backend, tts_backend):
+        self.call_id = call_id
+        self.bot = bot
+        self.asr_backend = asr_backend
+        self.tts_backend = tts_backend
+        self.detector = TurnDetector()
+
+        self.stream_sid = None
+        self.call_sid = None
+        self.send = None
+        self.close = None
+
+        self.audio = bytearray()
+        self.preroll = collections.deque(maxlen=TurnDetector().min_speech_frames + 5)
+        self.pending = b''
+        self.marks_outstanding = 0
+        self.turns = queue.Queue()
+        self.worker = None
+        # Transcription of the turn so far, started when the agent paused
+        self.asr_pool = ThreadPoolExecutor(max_workers=1)
+        self.early_transcript = None
+
+        self.conversation_log = []
+        self.turn_metrics = []
+        self.finished = threading.Event()
+
+    def attach(self, send, close):
+        """Bind the session to a live WebSocket (send(dict), close())"""
+        self.send = send
+        self.close = close
+
+    def handle_event(self, message):
+        event = message.get('event')
+        if event == 'start':
+            start = message['start']
+            self.stream_sid = start.get('streamSid') or message.get('streamSid')
+            self.call_sid = start.get('callSid')
+            self.worker = threading.Thread(target=self._turn_worker, daemon=True)
+            self.worker.start()
+        elif event == 'media':
+            self._on_media(base64.b64decode(message['media']['payload']))
+        elif event == 'mark':
+            # Twilio echoes a mark once the audio before it has played
+            self.marks_outstanding = max(0, self.marks_outstanding - 1)
+            if message.get('mark', {}).get('name') == 'hangup' and self.close:
+                self.close()
+        elif event == 'stop':
+            self.finish()
+
+    def finish(self):
+        self.turns.put(None)
+        self.finished.set()
+        self.asr_pool.shutdown(wait=False)
+
+    def _on_media(self, ulaw):
+        self.pending += ulaw
+        while len(self.pending) >= FRAME_BYTES:
+            frame, self.pending = self.pending[:FRAME_BYTES], self.pending[FRAME_BYTES:]
+            pcm = ulaw_to_pcm16(frame)
+            state = self.detector.feed(pcm)
+
+            if state == 'speech_start':
+                if self.marks_outstanding:
+                    # Agent talked over us - drop whatever audio is still queued at Twilio
+                    self.send({"event": "clear", "streamSid": self.stream_sid})
+                # Keep the frames that triggered detection
+                self.audio = bytearray(b''.join(self.preroll))
+
+            if self.detector.in_speech or state == 'end_of_turn':
+                self.audio += pcm
+            else:
+                self.preroll.append(pcm)
+
+            if state == 'pause':
+                # The agent may be done - transcribe now, so end of turn doesn't wait for the upload
+                self.early_transcript = self.asr_pool.submit(self._transcribe, bytes(self.audio))
+            elif state in ('speech_start', 'resume'):
+                # Still talking - a transcript started at the pause would miss the rest
+                self.early_transcript = None
+
+            if state == 'end_of_turn':
+                self.turns.put((bytes(self.audio), time.perf_counter(), self.early_transcript))
+                self.audio = bytearray()
+                self.early_transcript = None
+
+    def _turn_worker(self):
+        while True:
+            turn = self.turns.get()
+            if turn is None or self.finished.is_set():
+                return
+            try:
+                self._respond(*turn)
+            except Exception as e:
+                print(f"   ❌ Error in interactive turn: {e}")
+
+    def _transcribe(self, pcm):
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
+            path = tmp.name
+        try:
+            with wave.open(path, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(pcm)
+            return self.asr_backend.transcribe(path)['text'].strip()
+        finally:
+            os.remove(path)
+
+    def _respond(self, pcm, turn_end, early_transcript=None):
+        metrics = {"turn": len(self.turn_metrics) + 1, "early_asr": early_transcript is not None}
+
+        # Only silence followed the pause, so the early transcript covers the whole turn
+        agent_text = early_transcript.result() if early_transcript else self._transcribe(pcm)
+        metrics['asr_seconds'] = round(time.perf_counter() - turn_end, 3)
+        if not agent_text:
+            return
+        self._log("agent", agent_text)
+
+        if not any(entry['speaker'] == 'patient' for entry in self.conversation_log):
+            # First turn is the agent's greeting - open with the scenario's first line
+            opening = self.bot.get_initial_message()
+            self.bot.record_opening(agent_text, opening)
+            sentences = [opening]
+            ending = False
+        else:
+            sentences = self.bot.stream_sentences(agent_text)
+            ending = None
+
+        spoken = []
+        for sentence in sentences:
+            self._speak(sentence, turn_end, metrics)
+            spoken.append(sentence)
+
+        reply = ' '.join(spoken)
+        self._log("patient", reply)
+        metrics['total_seconds'] = round(time.perf_counter() - turn_end, 3)
+        self.turn_metrics.append(metrics)
+        print(f"   🗣️  Turn {metrics['turn']}: first audio after {metrics.get('time_to_first_audio', 0):.2f}s")
+
+        if ending is None:
+            ending = self.bot.ended
+        if ending:
+            # Close once the goodbye has played - the TwiML then continues to <Hangup/>
+            self._mark("hangup")
+
+    def _speak(self, sentence, turn_end, metrics):
+        ulaw = mp3_to_ulaw(self.tts_backend.synthesize(sentence))
+        for i in range(0, len(ulaw), FRAME_BYTES):
+            self.send({
+                "event": "media",
+                "streamSid": self.stream_sid,
+                "media": {"payload": base64.b64encode(ulaw[i:i + FRAME_BYTES]).decode()}
+            })
+            if 'time_to_first_audio' not in metrics:
+                metrics['time_to_first_audio'] = round(time.perf_counter() - turn_end, 3)
+        self._mark(f"turn{metrics['turn']}")
+
+    def _mark(self, name):
+        self.marks_outstanding += 1
+        self.send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+
+    def _log(self, speaker, message):
+        self.conversation_log.append({
+            "speaker": speaker,
+            "message": message,
+            "timestamp": datetime.now().isoformat(),
+            "note": "Interactive call (live turn)"
+        })
+
+
+class MediaStreamServer:
+    """WebSocket endpoint Twilio <Connect><Stream> connects to"""
+
+    def __init__(self, public_url, host='0.0.0.0', port=5001, asr_backend=None, tts_backend=None):
+        self.public_url = public_url.rstrip('/')
+        self.host = host
+        self.port = port
+        self.asr_backend = asr_backend
+        self.tts_backend = tts_backend
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.loop = None
+        self._thread = None
+
+    @property
+    def stream_url(self):
+        base = self.public_url.replace('https://', 'wss://').replace('http://', 'ws://')
+        return f"{base}/media"
+
+    def register(self, call_id, bot):
+        """Create the session a call will attach to once Twilio connects the stream"""
+        if self.asr_backend is None:
+            from src.asr import get_backend
+            self.asr_backend = get_backend()
+        if self.tts_backend is None:
+            from src.tts import get_tts_backend
+            self.tts_backend = get_tts_backend()
+
+        session = InteractiveSession(call_id, bot, self.asr_backend, self.tts_backend)
+        with self.lock:
+            self.sessions[call_id] = session
+        return session
+
+    def forget(self, call_id):
+        with self.lock:
+            self.sessions.pop(call_id, None)
+
+    def twiml(self, call_id):
+        """TwiML that connects the call to this server and hangs up when the stream closes"""
+        return '\n'.join([
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<Response>',
+            '<Connect>',
+            f'<Stream url="{self.stream_url}">',
+            f'<Parameter name="call_id" value="{call_id}"/>',
+            '</Stream>',
+            '</Connect>',
+            '<Hangup/>',
+            '</Response>'
+        ])
+
+    async def _handle(self, websocket, path=None):
+        loop = asyncio.get_running_loop()
+        session = None
+
+        def send(message):
+            asyncio.run_coroutine_threadsafe(websocket.send(json.dumps(message)), loop)
+
+        def close():
+            asyncio.run_coroutine_threadsafe(websocket.close(), loop)
+
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get('event') == 'start':
+                    call_id = message['start'].get('customParameters', {}).get('call_id')
+                    with self.lock:
+                        session = self.sessions.get(call_id)
+                    if session is None:
+                        print(f"   ⚠️  Media stream for unknown call {call_id}")
+                        await websocket.close()
+                        return
+                    session.attach(send, close)
+                if session:
+                    session.handle_event(message)
+        finally:
+            if session:
+                session.finish()
+
+    def start(self):
+        """Run the WebSocket server on a background event loop"""
+        if self._thread:
+            return
+        import websockets
+
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            server = self.loop.run_until_complete(websockets.serve(self._handle, self.host, self.port))
+            # Port 0 picks a free port - report the real one
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        print(f"📡 Media stream server listening on {self.host}:{self.port} ({self.stream_url})")
+
+    def stop(self):
+        if self._thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+_media_server = None
+_media_server_lock = threading.Lock()
+
+
+def get_media_stream_server():
+    """Shared media stream server (needs MEDIA_STREAM_URL or PUBLIC_BASE_URL), started on first use"""
+    global _media_server
+
+    public_url = os.getenv('MEDIA_STREAM_URL') or os.getenv('PUBLIC_BASE_URL')
+    if not public_url:
+        raise RuntimeError("Interactive mode needs MEDIA_STREAM_URL or PUBLIC_BASE_URL")
+
+    with _media_server_lock:
+        if _media_server is None:
+            _media_server = MediaStreamServer(public_url, port=int(os.getenv('MEDIA_STREAM_PORT', '5001')))
+            _media_server.start()
+        return _media_server
@@ -0,0 +1,281 @@
+"""
+Shared job queue for distributed campaigns
+A SQLite file on storage every host can reach. The coordinator enqueues one job per scenario; workers
+claim jobs under a lease, keep it alive with heartbeats while the call runs, and mark it done or failed.
+A lease that stops being renewed (the worker died mid-call) expires and the job is queued again.
+The queue also hands out dial slots, so the per-account call rate holds across every worker and host.
+
+Every operation opens its own short-lived connection and claims run in BEGIN IMMEDIATE transactions,
+so any number of threads, processes and hosts can share the file. Leases use wall-clock time, so hosts
+need roughly synchronised clocks (NTP) - keep the lease far longer than any clock skew.
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from contextlib import closing
+
+from src.campaign import rate_interval
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    call_sid TEXT,
+    transcript TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS dial_slots (
+    account TEXT PRIMARY KEY,
+    last_dial REAL NOT NULL
+);
+"""
+
+# queued -> leased -> done, or back to queued (failed / lease expired) until MAX_ATTEMPTS, then failed
+STATUSES = ('queued', 'leased', 'done', 'failed')
+
+
+class JobQueue:
+    def __init__(self, db_path, max_attempts=MAX_ATTEMPTS):
+        """
+        db_path: the shared SQLite file (created on first use)
+        max_attempts: claims a job gets before a failure or expired lease marks it failed for good
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Autocommit - transactions are opened explicitly where they matter
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def enqueue(self, scenarios, campaign=None):
+        """Add one job per scenario (any iterable, consumed lazily); returns (campaign, count)"""
+        campaign = campaign or time.strftime('%Y%m%d_%H%M%S')
+        now = time.time()
+        count = 0
+
+        def rows():
+            nonlocal count
+            for scenario in scenarios:
+                count += 1
+                yield campaign, json.dumps(scenario), now
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO jobs (campaign, scenario, updated) VALUES (?, ?, ?)", rows())
+            conn.execute("COMMIT")
+        return campaign, count
+
+    def _reclaim(self, conn, now):
+        """Requeue (or fail, when out of attempts) jobs whose lease ran out; returns how many"""
+        expired = conn.execute("SELECT id, attempts, worker FROM jobs WHERE status = 'leased' AND lease_expires < ?",
+                               (now,)).fetchall()
+        for job_id, attempts, worker in expired:
+            status = 'failed' if attempts >= self.max_attempts else 'queued'
+            conn.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ? "
+                         "WHERE id = ?", (status, f"lease expired (worker {worker})", now, job_id))
+        return len(expired)
+
+    def reclaim_expired(self):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            reclaimed = self._reclaim(conn, now)
+            conn.execute("COMMIT")
+        return reclaimed
+
+    def claim(self, worker, lease_seconds=LEASE_SECONDS):
+        """
+        Lease the oldest queued job to `worker`; returns {id, campaign, scenario, attempt} or None.
+        Expired leases are reclaimed first, so a dead worker's job is picked up by the next claim.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn, now)
+            row = conn.execute("SELECT id, campaign, scenario, attempts FROM jobs WHERE status = 'queued' "
+                               "ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job_id, campaign, scenario, attempts = row
+            conn.execute("UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = ?, "
+                         "updated = ? WHERE id = ?", (worker, now + lease_seconds, attempts + 1, now, job_id))
+            conn.execute("COMMIT")
+        return {"id": job_id, "campaign": campaign, "scenario": json.loads(scenario), "attempt": attempts + 1}
+
+    def heartbeat(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        """Extend the lease; False if the worker no longer holds it (it expired and was reclaimed)"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute("UPDATE jobs SET lease_expires = ?, updated = ? "
+                                  "WHERE id = ? AND worker = ? AND status = 'leased'",
+                                  (now + lease_seconds, now, job_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, call_sid, transcript=None):
+        """Mark a leased job done; False if the lease was lost in the meantime"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute("UPDATE jobs SET status = 'done', call_sid = ?, transcript = ?, error = NULL, "
+                                  "lease_expires = NULL, updated = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                                  (call_sid, transcript, time.time(), job_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Give up on this attempt - the job is queued again until it runs out of attempts"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                               (job_id, worker)).fetchone()
+            if row is not None:
+                status = 'failed' if row[0] >= self.max_attempts else 'queued'
+                conn.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, error = ?, "
+                             "updated = ? WHERE id = ?", (status, error, time.time(), job_id))
+            conn.execute("COMMIT")
+
+    def reserve_dial(self, account, interval):
+        """
+        Book the next dial slot for a Twilio account, `interval` seconds after the last one booked by anyone
+        sharing the queue; returns how long to wait (0 if the account is idle) before placing the call
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT last_dial FROM dial_slots WHERE account = ?", (account,)).fetchone()
+            slot = now if row is None else max(now, row[0] + interval)
+            conn.execute("INSERT INTO dial_slots (account, last_dial) VALUES (?, ?) "
+                         "ON CONFLICT (account) DO UPDATE SET last_dial = excluded.last_dial", (account, slot))
+            conn.execute("COMMIT")
+        return slot - now
+
+    def counts(self, campaign=None):
+        """{status: jobs} for one campaign, or the whole queue"""
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = ()
+        if campaign:
+            query += " WHERE campaign = ?"
+            params = (campaign,)
+        with closing(self._connect()) as conn:
+            found = dict(conn.execute(query + " GROUP BY status", params).fetchall())
+        return {status: found.get(status, 0) for status in STATUSES}
+
+    def unfinished(self, campaign=None):
+        counts = self.counts(campaign)
+        return counts['queued'] + counts['leased']
+
+    def worker_summary(self, campaign):
+        """{worker: completed jobs} - the worker column is kept on done jobs"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT worker, COUNT(*) FROM jobs WHERE campaign = ? AND status = 'done' "
+                                     "GROUP BY worker", (campaign,)).fetchall())
+
+    def failures(self, campaign):
+        """[(job id, scenario name, attempts, error)] for jobs that failed for good"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, scenario, attempts, error FROM jobs WHERE campaign = ? "
+                                "AND status = 'failed' ORDER BY id", (campaign,)).fetchall()
+        return [(job_id, json.loads(scenario).get('name'), attempts, error)
+                for job_id, scenario, attempts, error in rows]
+
+
+class QueueRateLimiter:
+    """
+    RateLimiter for distributed workers: slots are booked in the shared queue rather than in this process,
+    so N workers together still place at most calls_per_minute calls on the account
+    """
+
+    def __init__(self, queue, account_sid, calls_per_minute):
+        self.queue = queue
+        self.account_sid = account_sid
+        self.interval = rate_interval(calls_per_minute)
+
+    def acquire(self):
+        """Block until this worker's booked slot comes up"""
+        delay = self.queue.reserve_dial(self.account_sid, self.interval)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Lease:
+    """Heartbeats a claimed job from a background thread while the call runs"""
+
+    def __init__(self, queue, job, worker, lease_seconds=LEASE_SECONDS):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                held = self.queue.heartbeat(self.job['id'], self.worker, self.lease_seconds)
+            except sqlite3.Error as e:
+                # Shared storage hiccup - try again on the next beat; the lease has slack for two misses
+                print(f"   ⚠️  Heartbeat for job {self.job['id']} failed: {e}")
+                continue
+            if not held and not self.lost:
+                self.lost = True
+                print(f"   ⚠️  Lost the lease on job {self.job['id']} - it may be re-run by another worker")
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def upload_transcript(transcript_path, call_id, store_dir, recordings_dir):
+    """
+    Copy a finished call to the shared store as call_<id>.json plus its recording from recordings_dir
+    (CallHandler.recordings_dir - an archived transcript's segment says nothing about where that is).
+    Archived calls are exported from the local archive, so the store always holds plain per-call JSON.
+    The JSON is written last and atomically: once it is visible, the recording is there too.
+    Returns the stored transcript path.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    for suffix in ('_recording.mp3', '_recording.mp3.sha256'):
+        source = os.path.join(recordings_dir, f"{call_id}{suffix}")
+        if os.path.exists(source):
+            _copy_atomic(source, os.path.join(store_dir, f"{call_id}{suffix}"))
+
+    target = os.path.join(store_dir, f"{call_id}.json")
+    if transcript_path.endswith('.json'):
+        _copy_atomic(transcript_path, target)
+    else:
+        from src.archive import ArchiveReader
+        with ArchiveReader(os.path.dirname(transcript_path)) as reader:
+            transcript_data = reader.get(call_id)
+        tmp_path = f"{target}.part"
+        with open(tmp_path, 'w') as f:
+            json.dump(transcript_data, f, indent=2)
+        os.replace(tmp_path, target)
+    return target
+
+
+def _copy_atomic(source, target):
+    tmp_path = f"{target}.part"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
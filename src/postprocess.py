@@ -0,0 +1,132 @@
+"""
+Post-call processing stage - download, transcription and saving run on their own workers
+Dialing continues while earlier recordings are processed in the background
+"""
+
+import os
+import json
+import queue
+import threading
+
+_STOP = object()
+
+# Failed tries a journaled job gets (across restarts) before it is moved to queue_dir/failed/
+MAX_ATTEMPTS = 3
+
+
+class PostProcessError(Exception):
+    """A call's recordings couldn't be downloaded or transcribed - its job should be retried"""
+
+
+class PostProcessor:
+    def __init__(self, handler_factory, workers=2, max_queue=8, queue_dir='transcripts/.queue',
+                 max_attempts=MAX_ATTEMPTS):
+        """
+        handler_factory: function() -> CallHandler, one handler per worker thread
+        max_queue: jobs waiting before submit() blocks (backpressure on dialing)
+        queue_dir: on-disk journal - a job stays there until it has been processed
+        max_attempts: failed tries before a job is moved to queue_dir/failed/ instead of retried on next start
+        """
+        self.handler_factory = handler_factory
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, max_queue))
+        self.queue_dir = queue_dir
+        self.failed_dir = os.path.join(queue_dir, 'failed')
+        self.max_attempts = max(1, max_attempts)
+        self.threads = []
+        self.processed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the workers, then re-queue anything left in the journal by a previous run"""
+        os.makedirs(self.queue_dir, exist_ok=True)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"postprocess-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        pending = sorted(f for f in os.listdir(self.queue_dir) if f.endswith('.json'))
+        if pending:
+            print(f"♻️  Resuming {len(pending)} unfinished post-processing job(s)")
+        for filename in pending:
+            with open(os.path.join(self.queue_dir, filename), 'r') as f:
+                self.queue.put(json.load(f))
+
+        return self
+
+    def submit(self, job):
+        """Journal a job to disk and queue it; blocks while the queue is full"""
+        self._write_job(job, self._job_path(job))
+        self.queue.put(job)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers after the queue drains.
+        With wait=False, queued jobs are left in the journal for the next run.
+        """
+        if not wait:
+            self._discard_queued()
+
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _discard_queued(self):
+        """Empty the in-memory queue; the jobs are still journaled on disk"""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _job_path(self, job):
+        return os.path.join(self.queue_dir, f"{job['call_id']}.json")
+
+    def _write_job(self, job, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _record_failure(self, job, error):
+        """Count a failed try in the journal; past max_attempts the job moves to failed/ for good"""
+        job = dict(job, attempts=job.get('attempts', 0) + 1, error=str(error))
+        if job['attempts'] < self.max_attempts:
+            # Kept in the journal so the job is retried on the next start (nothing was saved)
+            self._write_job(job, self._job_path(job))
+            return
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self._write_job(job, os.path.join(self.failed_dir, f"{job['call_id']}.json"))
+        try:
+            os.remove(self._job_path(job))
+        except FileNotFoundError:
+            pass
+        print(f"   🗄️  Gave up on {job['call_id']} after {job['attempts']} attempt(s) - moved to {self.failed_dir}")
+
+    def _worker(self):
+        handler = self.handler_factory()
+
+        while True:
+            job = self.queue.get()
+            if job is _STOP:
+                return
+
+            try:
+                handler.process_job(job)
+            except Exception as e:
+                print(f"❌ Post-processing failed for {job['call_id']}: {e}")
+                with self.lock:
+                    self.failed += 1
+                self._record_failure(job, e)
+                continue
+
+            try:
+                os.remove(self._job_path(job))
+            except FileNotFoundError:
+                pass
+            with self.lock:
+                self.processed += 1
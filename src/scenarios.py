@@ -1,97 +1,171 @@
 """
 Patient scenarios for testing the medical office AI
+Loaded from the JSON/YAML files in scenario_data/, validated, and compiled once into TwiML templates
 """
 
-SCENARIOS = [
-    {
-        "id": 1,
-        "name": "Simple Appointment Scheduling",
-        "persona": "Sarah Chen, new patient",
-        "goal": "Schedule a first-time appointment",
-        "initial_message": "Hi, I'd like to schedule an appointment. This is my first time visiting.",
-        "context": "Be polite, provide name when asked, prefer morning appointments"
-    },
-    {
-        "id": 2,
-        "name": "Medication Refill",
-        "persona": "John Martinez, existing patient",
-        "goal": "Request prescription refill",
-        "initial_message": "Hello, I need to refill my blood pressure medication.",
-        "context": "Patient ID if asked, mention the medication is lisinopril"
-    },
-    {
-        "id": 3,
-        "name": "Appointment Rescheduling",
-        "persona": "Emily Thompson",
-        "goal": "Reschedule existing appointment",
-        "initial_message": "Hi, I need to reschedule my appointment for next Tuesday. Something came up.",
-        "context": "Be apologetic, flexible with new times"
-    },
-    {
-        "id": 4,
-        "name": "Office Hours Inquiry",
-        "persona": "Michael Rodriguez",
-        "goal": "Ask about office hours and location",
-        "initial_message": "Hi, what are your office hours? And do you have a location near downtown?",
-        "context": "Just gathering information, not booking yet"
-    },
-    {
-        "id": 5,
-        "name": "Insurance Question",
-        "persona": "Lisa Wang",
-        "goal": "Verify insurance coverage",
-        "initial_message": "Hello, I wanted to check if you accept Blue Cross Blue Shield insurance?",
-        "context": "Needs confirmation before booking"
-    },
-    {
-        "id": 6,
-        "name": "Urgent Appointment",
-        "persona": "David Kim",
-        "goal": "Get same-day or next-day appointment",
-        "initial_message": "Hi, I'm not feeling well and need to see a doctor as soon as possible. Do you have anything available today?",
-        "context": "Urgent but not emergency, willing to come in anytime"
-    },
-    {
-        "id": 7,
-        "name": "Cancellation",
-        "persona": "Jennifer Lee",
-        "goal": "Cancel an upcoming appointment",
-        "initial_message": "Hi, I need to cancel my appointment next week. I'm feeling better now.",
-        "context": "Straightforward cancellation"
-    },
-    {
-        "id": 8,
-        "name": "Confused Patient - Multiple Questions",
-        "persona": "Robert Brown (elderly, confused)",
-        "goal": "Ask multiple questions in confusing order",
-        "initial_message": "Yes hello, my doctor said I should call but I'm not sure... do I need to schedule something? Or was it a refill? Also what's your address?",
-        "context": "Test how AI handles confused/unclear requests"
-    },
-    {
-        "id": 9,
-        "name": "Billing Question",
-        "persona": "Amanda Foster",
-        "goal": "Ask about a bill from previous visit",
-        "initial_message": "Hi, I received a bill for my last visit and I have some questions about the charges.",
-        "context": "Wants explanation of billing"
-    },
-    {
-        "id": 10,
-        "name": "Wrong Number Test",
-        "persona": "Chris Anderson",
-        "goal": "Test how AI handles wrong requests",
-        "initial_message": "Hi, I'm looking for the veterinary clinic. Is this the animal hospital?",
-        "context": "Test error handling - clearly wrong type of office"
-    }
-]
+import os
+import json
+
+SCENARIO_DIR = os.path.join(os.path.dirname(__file__), 'scenario_data')
+
+# Speak slightly slower for clarity
+VOICE = "Polly.Joanna"
+SPEECH_RATE = 90
+
+REQUIRED_FIELDS = {
+    "id": int,
+    "name": str,
+    "persona": str,
+    "goal": str,
+    "initial_message": str,
+    "context": str,
+    "script": list
+}
+
+# Pauses around the closing "Goodbye." - not learned, always the same
+CLOSING_PAUSES = (4, 3)
+
+
+class ScenarioError(ValueError):
+    """A scenario file is malformed"""
+
+
+def xml_escape(text):
+    """Same as xml.sax.saxutils.escape, which would pull urllib and http.client into every startup"""
+    return text.replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;')
+
+
+def default_pauses(line_count):
+    """
+    Conservative timing - longer pauses to let agent finish speaking.
+    One pause before each script line plus one after the last: line_count + 1 values.
+    """
+    pauses = [18]  # Long initial wait for full greeting
+    for i in range(line_count):
+        if i == 0:
+            pauses.append(10)  # After intro, wait for DOB question
+        elif i in (1, 2):
+            pauses.append(12)  # After DOB / confirmation, wait for next question
+        elif i < line_count - 1:
+            pauses.append(14)  # General pauses - give agent time to speak
+        else:
+            pauses.append(18)  # Last message - long wait for final response
+    return tuple(pauses)
+
+
+class ScriptTemplate:
+    """
+    A scenario's script compiled to TwiML once.
+    The <Say> elements are pre-rendered; a call only joins them with its pause lengths.
+    """
+
+    __slots__ = ('lines', 'default_pauses', '_says', '_closing', 'twiml')
+
+    def __init__(self, lines, voice=VOICE, rate=SPEECH_RATE):
+        self.lines = tuple(lines)
+        self.default_pauses = default_pauses(len(self.lines))
+        self._says = tuple(f'<Say voice="{voice}" rate="{rate}%">{xml_escape(line)}</Say>' for line in self.lines)
+        self._closing = '\n'.join([
+            f'<Pause length="{CLOSING_PAUSES[0]}"/>',
+            f'<Say voice="{voice}" rate="{rate}%">Goodbye.</Say>',
+            f'<Pause length="{CLOSING_PAUSES[1]}"/>',
+            '<Hangup/>',
+            '</Response>'
+        ])
+        self.twiml = self._render(self.default_pauses)
+
+    def actions(self, pauses=None):
+        """The call as a list of ('pause', seconds) / ('say', text) actions"""
+        pauses = pauses or self.default_pauses
+        actions = [('pause', pauses[0])]
+        for line, pause in zip(self.lines, pauses[1:]):
+            actions.append(('say', line))
+            actions.append(('pause', pause))
+        actions.extend([('pause', CLOSING_PAUSES[0]), ('say', 'Goodbye.'), ('pause', CLOSING_PAUSES[1])])
+        return actions
+
+    def render(self, pauses=None):
+        """TwiML for one call; the precompiled string when the default pauses are used"""
+        if pauses is None or tuple(pauses) == self.default_pauses:
+            return self.twiml
+        return self._render(pauses)
+
+    def _render(self, pauses):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<Response>', f'<Pause length="{pauses[0]}"/>']
+        for say, pause in zip(self._says, pauses[1:]):
+            parts.append(say)
+            parts.append(f'<Pause length="{pause}"/>')
+        parts.append(self._closing)
+        return '\n'.join(parts)
+
+
+def validate_scenario(scenario, source='<scenario>'):
+    """Raise ScenarioError unless the scenario has every field with the right type"""
+    if not isinstance(scenario, dict):
+        raise ScenarioError(f"{source}: scenario must be an object, got {type(scenario).__name__}")
+    for field, kind in REQUIRED_FIELDS.items():
+        if field not in scenario:
+            raise ScenarioError(f"{source}: scenario {scenario.get('id', '?')} is missing '{field}'")
+        if not isinstance(scenario[field], kind) or (kind is int and isinstance(scenario[field], bool)):
+            raise ScenarioError(f"{source}: scenario {scenario.get('id', '?')} field '{field}' "
+                                f"must be {kind.__name__}")
+    script = scenario['script']
+    if not script or not all(isinstance(line, str) and line.strip() for line in script):
+        raise ScenarioError(f"{source}: scenario {scenario['id']} needs a non-empty list of script lines")
+
+
+def _read_scenario_file(path):
+    """One file holds a single scenario object or a list of them"""
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ScenarioError(f"{path}: install pyyaml to load YAML scenarios")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def load_scenarios(scenario_dir=SCENARIO_DIR):
+    """Load and validate every scenario file in scenario_dir, in filename order"""
+    scenarios = []
+    seen = {}
+    for filename in sorted(os.listdir(scenario_dir)):
+        if not filename.endswith(('.json', '.yaml', '.yml')):
+            continue
+        path = os.path.join(scenario_dir, filename)
+        for scenario in _read_scenario_file(path):
+            validate_scenario(scenario, filename)
+            if scenario['id'] in seen:
+                raise ScenarioError(f"{filename}: duplicate scenario id {scenario['id']} "
+                                    f"(also in {seen[scenario['id']]})")
+            seen[scenario['id']] = filename
+            scenarios.append(scenario)
+    if not scenarios:
+        raise ScenarioError(f"No scenarios found in {scenario_dir}")
+    return scenarios
+
+
+SCENARIOS = load_scenarios()
+_BY_ID = {scenario['id']: scenario for scenario in SCENARIOS}
+_TEMPLATES = {scenario['id']: ScriptTemplate(scenario['script']) for scenario in SCENARIOS}
+
 
 def get_scenario(scenario_id):
     """Get a specific scenario by ID"""
-    for scenario in SCENARIOS:
-        if scenario['id'] == scenario_id:
-            return scenario
-    return SCENARIOS[0]  # Default to first scenario
+    return _BY_ID.get(scenario_id, SCENARIOS[0])  # Default to first scenario
+
+
+def get_script_template(scenario):
+    """Compiled TwiML template for a scenario (compiled on first use if it wasn't loaded from disk)"""
+    template = _TEMPLATES.get(scenario['id'])
+    if template is None or template.lines != tuple(scenario['script']):
+        template = ScriptTemplate(scenario['script'])
+    return template
+
 
 def get_all_scenarios():
     """Return all available scenarios"""
-    return SCENARIOS
\ No newline at end of file
+    return SCENARIOS
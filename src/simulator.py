@@ -0,0 +1,428 @@
+"""
+Local simulator for the services a call touches - Twilio, the recording download, Groq Whisper and Claude
+Fakes replace the shared clients in src.clients, with configurable latency and failure rates, so
+CallHandler and VoiceBot run end to end offline. Recordings already in transcripts/ are served as fixtures.
+"""
+
+import os
+import re
+import math
+import time
+import uuid
+import random
+import threading
+from types import SimpleNamespace
+
+SIMULATOR_URL = 'http://simulator.invalid'
+ACCOUNT_SID = 'ACsimulator'
+
+# Per stage: lognormal latency (median seconds, sigma) and the chance the stage fails.
+# API round trips are real seconds; the phone-call timeline ('dial', 'answer', the call itself,
+# 'recording_ready') is in simulated seconds and scaled by Simulator.time_scale.
+DEFAULT_PROFILE = {
+    "calls.create": {"median": 0.3, "sigma": 0.3, "failure_rate": 0.0},
+    "calls.fetch": {"median": 0.1, "sigma": 0.3, "failure_rate": 0.0},
+    "recordings.list": {"median": 0.15, "sigma": 0.3, "failure_rate": 0.0},
+    "download": {"median": 0.2, "sigma": 0.5, "failure_rate": 0.02},       # failure: connection drops mid-stream
+    "transcription": {"median": 1.5, "sigma": 0.4, "failure_rate": 0.01},
+    "llm": {"median": 0.8, "sigma": 0.4, "failure_rate": 0.01},
+    "dial": {"median": 1.0, "sigma": 0.3, "failure_rate": 0.0},
+    "answer": {"median": 5.0, "sigma": 0.4, "failure_rate": 0.02},         # failure: no-answer
+    "recording_ready": {"median": 4.0, "sigma": 0.5, "failure_rate": 0.0},
+}
+
+# What the simulated agent says while the script pauses - a few trip the bug rules
+AGENT_LINES = [
+    "Thank you for calling, how can I help you today?",
+    "Can I get your full name and date of birth please?",
+    "Let me check our availability for you.",
+    "I have an opening at 2 PM on Tuesday or 2 PM on Thursday.",
+    "I didn't quite catch that, could you repeat it?",
+    "Our office hours are Monday through Sunday, 8 to 5.",
+    "The next available appointment is in two weeks.",
+    "Is there anything else I can help you with?",
+]
+
+PATIENT_REPLIES = [
+    "Yes, that works for me.",
+    "My date of birth is March 15, 1990.",
+    "Could you repeat that please?",
+    "I'd prefer something earlier in the week.",
+    "Thank you so much, goodbye.",
+]
+
+WORDS_PER_SECOND = 2.5
+_TAG_SIZE = 128
+
+_TWIML_ACTION = re.compile(r'<Pause length="(\d+)"/>|<Say[^>]*>(.*?)</Say>|<Play>(.*?)</Play>', re.S)
+
+
+class SimulatedError(Exception):
+    """A failure injected by the simulator's failure rates"""
+
+
+class SimulatedCall:
+    """One call's timeline, in real (already scaled) monotonic seconds"""
+
+    def __init__(self, sid, twiml, created, dial, answer, no_answer, recording_ready, time_scale):
+        self.sid = sid
+        self.recording_sid = 'RE' + uuid.uuid4().hex
+        self.actions = _twiml_actions(twiml)
+        self.duration = sum(_action_seconds(kind, value) for kind, value in self.actions) or 60.0
+        self.ringing_at = created + dial * time_scale
+        self.answered_at = None if no_answer else self.ringing_at + answer * time_scale
+        self.ended_at = self.ringing_at + answer * time_scale + (0 if no_answer else self.duration * time_scale)
+        self.final_status = 'no-answer' if no_answer else 'completed'
+        self.recording_at = None if no_answer else self.ended_at + recording_ready * time_scale
+
+    def status(self, now):
+        if now < self.ringing_at:
+            return 'queued'
+        if self.answered_at is None:
+            return 'ringing' if now < self.ended_at else self.final_status
+        if now < self.answered_at:
+            return 'ringing'
+        return 'in-progress' if now < self.ended_at else self.final_status
+
+    def events(self):
+        """(monotonic time, status) for each status callback Twilio would send"""
+        events = [(self.ringing_at, 'ringing')]
+        if self.answered_at is not None:
+            events.append((self.answered_at, 'in-progress'))
+        events.append((self.ended_at, self.final_status))
+        return events
+
+    def transcript(self, rng):
+        """Whisper verbose_json for the recording: agent lines fill the pauses, script lines are the patient"""
+        segments = []
+        clock = 0.0
+        for kind, value in self.actions:
+            seconds = _action_seconds(kind, value)
+            if kind == 'pause':
+                text = rng.choice(AGENT_LINES)
+                start, end = clock + 0.5, clock + min(seconds - 0.5, len(text.split()) / WORDS_PER_SECOND + 0.5)
+            else:
+                text = value if kind == 'say' else "Sorry, could you say that again?"
+                start, end = clock, clock + seconds
+            if end > start:
+                segments.append({"id": len(segments), "start": round(start, 2), "end": round(end, 2),
+                                 "text": f" {text}"})
+            clock += seconds
+        return {
+            "text": ''.join(s['text'] for s in segments).strip(),
+            "language": "english",
+            "duration": round(clock, 2),
+            "segments": segments
+        }
+
+
+def _twiml_actions(twiml):
+    actions = []
+    for pause, say, play in _TWIML_ACTION.findall(twiml or ''):
+        if pause:
+            actions.append(('pause', int(pause)))
+        elif say:
+            actions.append(('say', say.strip()))
+        else:
+            actions.append(('play', play.strip()))
+    return actions
+
+
+def _action_seconds(kind, value):
+    if kind == 'pause':
+        return float(value)
+    if kind == 'say':
+        return max(1.0, len(value.split()) / WORDS_PER_SECOND)
+    return 3.0
+
+
+class Simulator:
+    def __init__(self, profile=None, time_scale=0.05, fixture_dir='transcripts', seed=0):
+        """
+        profile: {stage: {median, sigma, failure_rate}} overrides merged into DEFAULT_PROFILE
+        time_scale: real seconds per simulated second of phone time (0.05 turns a 90 s call into 4.5 s)
+        fixture_dir: MP3s served as recordings, round-robin
+        """
+        self.profile = {stage: dict(settings) for stage, settings in DEFAULT_PROFILE.items()}
+        for stage, settings in (profile or {}).items():
+            self.profile.setdefault(stage, {"median": 0.0, "sigma": 0.0, "failure_rate": 0.0}).update(settings)
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.recordings = {}
+        self.fixtures = _load_fixtures(fixture_dir)
+        self.callback_server = None
+        # Claude's reply to the n-th agent turn (the last one repeats)
+        self.patient_replies = list(PATIENT_REPLIES)
+
+    def latency(self, stage):
+        settings = self.profile[stage]
+        with self.lock:
+            noise = self.rng.gauss(0, 1)
+        return settings['median'] * math.exp(settings['sigma'] * noise)
+
+    def fails(self, stage):
+        with self.lock:
+            return self.rng.random() < self.profile[stage]['failure_rate']
+
+    def wait(self, stage):
+        """Sleep for one round trip of `stage`, then raise if this one is set to fail"""
+        time.sleep(self.latency(stage))
+        if self.fails(stage):
+            raise SimulatedError(f"simulated {stage} failure")
+
+    def install(self, callbacks=True):
+        """
+        Swap the fakes in for the shared clients.
+        With callbacks, status and recording events are pushed to an in-process CallbackServer
+        (no Flask, no tunnel) so calls don't wait on polling backoff.
+        """
+        from src.clients import set_client
+
+        set_client('twilio', FakeTwilioClient(self))
+        set_client('http', FakeHttpSession(self))
+        set_client('groq', FakeGroqClient(self))
+        set_client('anthropic', FakeAnthropicClient(self))
+        set_client('openai', SimpleNamespace())
+        if callbacks:
+            from src.callbacks import CallbackServer, set_callback_server
+            self.callback_server = CallbackServer(SIMULATOR_URL)
+            set_callback_server(self.callback_server)
+        return self
+
+    def uninstall(self):
+        from src.clients import reset_clients
+        from src.callbacks import set_callback_server
+
+        reset_clients()
+        if self.callback_server:
+            set_callback_server(None)
+            self.callback_server = None
+
+    def create_call(self, twiml):
+        self.wait('calls.create')
+        sid = 'CA' + uuid.uuid4().hex
+        no_answer = self.fails('answer')
+        call = SimulatedCall(sid, twiml, time.monotonic(), self.latency('dial'), self.latency('answer'),
+                             no_answer, self.latency('recording_ready'), self.time_scale)
+        with self.lock:
+            self.calls[sid] = call
+            self.recordings[call.recording_sid] = call
+        if self.callback_server:
+            self._schedule_callbacks(call)
+        return call
+
+    def _schedule_callbacks(self, call):
+        server = self.callback_server
+        server.on_call_status(call.sid, 'initiated')
+        for at, status in call.events():
+            self._at(at, server.on_call_status, call.sid, status)
+        if call.recording_at is not None:
+            self._at(call.recording_at, server.on_recording_status, call.sid,
+                     {"RecordingSid": call.recording_sid, "RecordingStatus": "completed"})
+
+    @staticmethod
+    def _at(when, fn, *args):
+        timer = threading.Timer(max(0.0, when - time.monotonic()), fn, args)
+        timer.daemon = True
+        timer.start()
+
+    def call(self, sid):
+        with self.lock:
+            return self.calls[sid]
+
+    def recording_audio(self, recording_sid):
+        """Fixture MP3 with an ID3v1 tag naming the recording, so every recording hashes differently"""
+        fixture = self.fixtures[int(recording_sid[2:], 16) % len(self.fixtures)]
+        return fixture + b'TAG' + recording_sid.encode().ljust(_TAG_SIZE - 3, b'\0')
+
+    def transcribe(self, audio):
+        """Transcript for audio served by recording_audio()"""
+        recording_sid = audio[-_TAG_SIZE + 3:].rstrip(b'\0').decode()
+        with self.lock:
+            call = self.recordings[recording_sid]
+        return call.transcript(random.Random(recording_sid))
+
+
+def _load_fixtures(fixture_dir):
+    fixtures = []
+    if os.path.isdir(fixture_dir):
+        for name in sorted(os.listdir(fixture_dir)):
+            if name.endswith('.mp3'):
+                with open(os.path.join(fixture_dir, name), 'rb') as f:
+                    fixtures.append(f.read())
+    # No recordings yet - silence-sized filler; only the fake transcriber ever reads it
+    return fixtures or [bytes(64 * 1024)]
+
+
+class FakeTwilioClient:
+    """The parts of twilio.rest.Client that CallHandler uses"""
+
+    def __init__(self, simulator):
+        self.calls = _FakeCalls(simulator)
+        self.recordings = _FakeRecordings(simulator)
+
+
+class _FakeCalls:
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def create(self, twiml=None, **params):
+        call = self.simulator.create_call(twiml)
+        return SimpleNamespace(sid=call.sid, status='queued')
+
+    def __call__(self, sid):
+        return _FakeCallContext(self.simulator, sid)
+
+
+class _FakeCallContext:
+    def __init__(self, simulator, sid):
+        self.simulator = simulator
+        self.sid = sid
+
+    def fetch(self):
+        self.simulator.wait('calls.fetch')
+        call = self.simulator.call(self.sid)
+        return SimpleNamespace(sid=self.sid, status=call.status(time.monotonic()))
+
+
+class _FakeRecordings:
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def list(self, call_sid=None, **params):
+        self.simulator.wait('recordings.list')
+        call = self.simulator.call(call_sid)
+        if call.recording_at is None or time.monotonic() < call.recording_at:
+            return []
+        return [SimpleNamespace(
+            sid=call.recording_sid,
+            uri=f"/2010-04-01/Accounts/{ACCOUNT_SID}/Recordings/{call.recording_sid}.json",
+            duration=str(int(call.duration)),
+            status='completed'
+        )]
+
+
+class FakeHttpSession:
+    """requests.Session stand-in serving recording MP3s, with Range support and mid-stream drops"""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def get(self, url, headers=None, stream=False, **kwargs):
+        time.sleep(self.simulator.latency('download'))
+        recording_sid = url.rsplit('/', 1)[-1].split('.')[0]
+        audio = self.simulator.recording_audio(recording_sid)
+
+        start = 0
+        range_header = (headers or {}).get('Range')
+        if range_header:
+            start = int(range_header.split('=')[1].split('-')[0])
+            if start >= len(audio):
+                return _FakeResponse(416, b'', None)
+        drop_at = None
+        if self.simulator.fails('download'):
+            drop_at = (len(audio) - start) // 2
+        return _FakeResponse(206 if start else 200, audio[start:], drop_at)
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body, drop_at):
+        self.status_code = status_code
+        self.headers = {'Content-Length': str(len(body))}
+        self.body = body
+        self.drop_at = drop_at
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        end = len(self.body) if self.drop_at is None else self.drop_at
+        for offset in range(0, end, chunk_size):
+            yield self.body[offset:min(offset + chunk_size, end)]
+        if self.drop_at is not None:
+            import requests
+            raise requests.ConnectionError("simulated connection drop")
+
+
+class FakeGroqClient:
+    """groq.Groq stand-in: audio.transcriptions.create returns verbose_json built from the call's TwiML"""
+
+    def __init__(self, simulator):
+        self.audio = SimpleNamespace(transcriptions=_FakeTranscriptions(simulator))
+
+
+class _FakeTranscriptions:
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def create(self, model=None, file=None, response_format=None, **params):
+        audio = file.read()
+        self.simulator.wait('transcription')
+        return self.simulator.transcribe(audio)
+
+
+class FakeAnthropicClient:
+    """anthropic.Anthropic stand-in: messages.create and messages.stream with canned patient replies"""
+
+    def __init__(self, simulator):
+        self.messages = _FakeMessages(simulator)
+
+
+class _FakeMessages:
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def _reply(self, messages):
+        replies = self.simulator.patient_replies
+        turn = sum(1 for m in messages if m['role'] == 'user')
+        return replies[max(0, min(turn, len(replies)) - 1)]
+
+    @staticmethod
+    def _message(text, messages):
+        usage = SimpleNamespace(input_tokens=200 + 40 * len(messages), output_tokens=len(text.split()) + 2,
+                                cache_creation_input_tokens=0, cache_read_input_tokens=150)
+        return SimpleNamespace(content=[SimpleNamespace(type='text', text=text)], usage=usage)
+
+    def create(self, messages=None, **params):
+        self.simulator.wait('llm')
+        text = self._reply(messages)
+        return self._message(text, messages)
+
+    def stream(self, messages=None, **params):
+        return _FakeStream(self, messages)
+
+
+class _FakeStream:
+    """Context manager with text_stream / get_final_message, like MessageStream"""
+
+    def __init__(self, fake_messages, messages):
+        self.fake_messages = fake_messages
+        self.messages = messages
+        self.text = fake_messages._reply(messages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        simulator = self.fake_messages.simulator
+        total = simulator.latency('llm')
+        words = self.text.split(' ')
+        # Most of the latency is time to first token; the rest is spread over the words
+        time.sleep(total * 0.6)
+        if simulator.fails('llm'):
+            raise SimulatedError("simulated llm failure")
+        for i, word in enumerate(words):
+            yield word if i == 0 else ' ' + word
+            time.sleep(total * 0.4 / len(words))
+
+    def get_final_message(self):
+        return self.fake_messages._message(self.text, self.messages)
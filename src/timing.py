@@ -0,0 +1,135 @@
+"""
+Adaptive turn timing for scripted calls
+Learns how long the agent talks in each gap of each scenario from past transcripts,
+and picks the shortest pause that covers a configurable percentile of those durations
+"""
+
+import os
+import json
+import math
+import threading
+from src.archive import ArchiveReader
+
+
+def _percentile(values, pct):
+    """Linear-interpolated percentile"""
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * pct / 100
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def agent_durations(transcript):
+    """
+    How long the agent needed in each gap of one call: {gap_index: seconds}.
+    Gap 0 is before the first patient line, gap i follows patient line i - the last one is the
+    agent's reply to the final line, which runs until the call ends.
+    Needs the transcript's script_schedule and timestamped agent segments.
+    """
+    schedule = transcript.get('script_schedule') or []
+    segments = [
+        entry for entry in transcript.get('conversation', [])
+        if entry.get('speaker') == 'agent' and 'start' in entry
+    ]
+    if not schedule or not segments:
+        return {}
+
+    # Gap boundaries: [previous line end, next line start)
+    gaps = []
+    previous_end = 0.0
+    for window in schedule:
+        gaps.append((previous_end, window['start']))
+        previous_end = window['end']
+    gaps.append((previous_end, math.inf))
+
+    durations = {}
+    for gap_index, (gap_start, gap_end) in enumerate(gaps):
+        ends = [s['end'] for s in segments if gap_start <= s['start'] < gap_end]
+        durations[gap_index] = max(ends) - gap_start if ends else 0.0
+    return durations
+
+
+class TimingModel:
+    def __init__(self, percentile=90, margin=1.5, min_pause=3, max_pause=30, min_samples=3):
+        """
+        percentile: share of past agent turns the pause must cover
+        margin: seconds added on top, so the agent has finished before we speak
+        min_samples: below this many past calls for a (scenario, gap) we keep the default pause
+        """
+        self.percentile = percentile
+        self.margin = margin
+        self.min_pause = min_pause
+        self.max_pause = max_pause
+        self.min_samples = min_samples
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.default_seconds = 0
+        self.chosen_seconds = 0
+
+    def learn(self, transcript):
+        for gap_index, seconds in agent_durations(transcript).items():
+            self.samples.setdefault((transcript['scenario_id'], gap_index), []).append(seconds)
+
+    @classmethod
+    def from_transcripts(cls, transcript_dir='transcripts', **kwargs):
+        """Build a model from every saved transcript JSON in transcript_dir, plus its archive if there is one"""
+        model = cls(**kwargs)
+        if not os.path.isdir(transcript_dir):
+            return model
+
+        seen = set()
+        for filename in os.listdir(transcript_dir):
+            if not (filename.startswith('call_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(transcript_dir, filename), 'r') as f:
+                    transcript = json.load(f)
+                model.learn(transcript)
+                seen.add(transcript.get('call_id'))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        # Archived calls, skipping any that were also exported back to JSON
+        with ArchiveReader(os.path.join(transcript_dir, 'archive')) as reader:
+            for transcript in reader:
+                if transcript.get('call_id') not in seen:
+                    model.learn(transcript)
+        return model
+
+    def pause(self, scenario_id, gap_index, default):
+        """Pause (whole seconds) to leave in a gap; falls back to `default` without enough history"""
+        samples = self.samples.get((scenario_id, gap_index))
+        if not samples or len(samples) < self.min_samples:
+            chosen = default
+        else:
+            needed = _percentile(samples, self.percentile) + self.margin
+            chosen = int(min(self.max_pause, max(self.min_pause, math.ceil(needed))))
+
+        with self.lock:
+            self.default_seconds += default
+            self.chosen_seconds += chosen
+        return chosen
+
+    def call_planned(self):
+        with self.lock:
+            self.calls += 1
+
+    def report(self):
+        """Billed pause seconds saved so far (negative if the model lengthened pauses)"""
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "default_pause_seconds": self.default_seconds,
+                "adaptive_pause_seconds": self.chosen_seconds,
+                "seconds_saved": self.default_seconds - self.chosen_seconds
+            }
+
+
+def print_timing_report(report):
+    print(f"\n⏱️  Adaptive timing: {report['adaptive_pause_seconds']}s of pauses instead of "
+          f"{report['default_pause_seconds']}s over {report['calls']} call(s) - "
+          f"{report['seconds_saved']}s of call time saved")
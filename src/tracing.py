@@ -0,0 +1,277 @@
+"""
+Per-stage latency tracing for the call pipeline
+Spans around each stage of a call are appended to a JSONL trace file and aggregated into
+Prometheus-style histograms. Tracing is off by default; span() then returns one shared no-op
+object, so instrumented code costs a method call and an attribute check.
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import threading
+
+TRACE_FILE = 'transcripts/.traces.jsonl'
+
+# Histogram bucket bounds in seconds - stages range from milliseconds (TwiML) to minutes (the call)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Pipeline order for reports; stages not listed here are printed after these
+STAGES = (
+    'call', 'twiml.build', 'twilio.calls_create', 'call.ringing', 'call.in_progress',
+    'call.wait_completion', 'recording.wait', 'postprocess', 'recording.download',
+    'asr.transcribe', 'transcript.parse', 'transcript.save', 'bot.turn'
+)
+
+
+class _NoopSpan:
+    """What span() returns while tracing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage; use as a context manager. Nested spans share the outer span's trace id."""
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start', '_started')
+
+    def __init__(self, tracer, name, trace_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = None
+        self.attributes = attributes
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.parent_id = stack[-1].span_id
+            if self.trace_id is None:
+                self.trace_id = stack[-1].trace_id
+        if self.trace_id is None:
+            self.trace_id = self.span_id
+        stack.append(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._started
+        self.tracer._stack().pop()
+        self.tracer._emit(self.name, self.trace_id, self.span_id, self.parent_id, self.start, duration,
+                          'error' if exc_type else 'ok', self.attributes)
+        return False
+
+
+def default_trace_file():
+    """TRACE_FILE from the environment, read when it's needed so a .env loaded after import still counts"""
+    return os.getenv('TRACE_FILE', TRACE_FILE)
+
+
+class Tracer:
+    def __init__(self, trace_file=None, enabled=False):
+        self._trace_file = trace_file
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self._local = threading.local()
+        self._file = None
+
+    @property
+    def trace_file(self):
+        """The file given to the tracer, else TRACE_FILE as the environment has it now"""
+        return self._trace_file or default_trace_file()
+
+    def enable(self, trace_file=None):
+        if trace_file:
+            self._trace_file = trace_file
+        self.enabled = True
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, trace_id=None, **attributes):
+        """Context manager timing one stage (a no-op while disabled)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, trace_id, attributes)
+
+    def record(self, name, start, end, trace_id=None, status='ok', **attributes):
+        """
+        Span for a stage timed elsewhere - start / end are epoch seconds.
+        Used for call phases seen through status changes and for streamed bot turns.
+        """
+        if not self.enabled or start is None or end is None:
+            return
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        if trace_id is None and parent is not None:
+            trace_id = parent.trace_id
+        span_id = uuid.uuid4().hex[:16]
+        self._emit(name, trace_id or span_id, span_id, parent.span_id if parent else None,
+                   start, max(0.0, end - start), status, attributes)
+
+    def _emit(self, name, trace_id, span_id, parent_id, start, duration, status, attributes):
+        line = json.dumps({
+            "name": name,
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "start": round(start, 6),
+            "duration": round(duration, 6),
+            "status": status,
+            "attributes": attributes
+        }, default=str) + '\n'
+
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0,
+                                                     "errors": 0}
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["count"] += 1
+            histogram["sum"] += duration
+            if status != 'ok':
+                histogram["errors"] += 1
+
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.trace_file) or '.', exist_ok=True)
+                self._file = open(self.trace_file, 'a', buffering=1)
+            self._file.write(line)
+
+    def prometheus(self):
+        """Stage histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP voicebot_stage_seconds Wall time of each call pipeline stage",
+            "# TYPE voicebot_stage_seconds histogram"
+        ]
+        errors = []
+        with self.lock:
+            for name in _ordered(self.histograms):
+                histogram = self.histograms[name]
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'voicebot_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'voicebot_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'voicebot_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'voicebot_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+                errors.append(f'voicebot_stage_errors_total{{stage="{name}"}} {histogram["errors"]}')
+        lines += ["# HELP voicebot_stage_errors_total Stages that ended with an exception",
+                  "# TYPE voicebot_stage_errors_total counter"] + errors
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        with self.lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def _ordered(names):
+    known = [name for name in STAGES if name in names]
+    return known + sorted(name for name in names if name not in STAGES)
+
+
+def start_metrics_server(tracer, port, host='0.0.0.0'):
+    """Serve tracer.prometheus() at /metrics on a background thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = tracer.prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def stage_stats(trace_file=None):
+    """{stage: {count, errors, mean, p50, p95, p99}} from a trace file (default: TRACE_FILE)"""
+    trace_file = trace_file or default_trace_file()
+    durations = {}
+    errors = {}
+    if not os.path.exists(trace_file):
+        return {}
+    with open(trace_file, 'r') as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            durations.setdefault(span['name'], []).append(span['duration'])
+            if span.get('status') != 'ok':
+                errors[span['name']] = errors.get(span['name'], 0) + 1
+
+    stats = {}
+    for name in _ordered(durations):
+        values = sorted(durations[name])
+        stats[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "mean": sum(values) / len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99)
+        }
+    return stats
+
+
+def print_stage_stats(stats):
+    """Print the per-stage latency table"""
+    print(f"\n{'='*60}")
+    print("⏱️  STAGE LATENCY")
+    print(f"{'='*60}")
+    if not stats:
+        print("No spans recorded yet - run calls with --trace")
+        return
+    print(f"{'stage':24s} {'count':>6s} {'err':>4s} {'p50 s':>8s} {'p95 s':>8s} {'p99 s':>8s}")
+    for name, s in stats.items():
+        print(f"{name:24s} {s['count']:6d} {s['errors']:4d} {s['p50']:8.3f} {s['p95']:8.3f} {s['p99']:8.3f}")
+
+
+_tracer = Tracer(enabled=os.getenv('TRACING', '0') == '1')
+
+
+def get_tracer():
+    """Shared tracer - enabled by TRACING=1 or main.py --trace"""
+    return _tracer
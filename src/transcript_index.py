@@ -0,0 +1,113 @@
+"""
+Sidecar index of saved transcripts
+One small JSONL line per call (scenario, timestamp, file stat) so analysis can filter
+and order transcripts without opening every file
+"""
+
+import os
+import json
+import threading
+
+INDEX_FILENAME = '.index.jsonl'
+
+_append_lock = threading.Lock()
+
+
+def index_entry(path, transcript):
+    """Index line for a transcript that has just been written to path"""
+    stat = os.stat(path)
+    return {
+        "file": os.path.basename(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "scenario_id": transcript.get('scenario_id'),
+        "timestamp": transcript.get('timestamp', '')
+    }
+
+
+def is_transcript_file(filename):
+    return filename.startswith('call_') and filename.endswith('.json')
+
+
+class TranscriptIndex:
+    def __init__(self, transcript_dir='transcripts'):
+        self.transcript_dir = transcript_dir
+        self.path = os.path.join(transcript_dir, INDEX_FILENAME)
+
+    def append(self, path, transcript):
+        """Record a newly saved transcript (called by CallHandler after each save)"""
+        line = json.dumps(index_entry(path, transcript)) + '\n'
+        with _append_lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def _read(self):
+        """{file: entry}; later lines win, so appends for rewritten files replace older ones"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted append
+                entries[entry['file']] = entry
+        return entries
+
+    def refresh(self):
+        """
+        Bring the index in line with the directory and return {file: entry}.
+        Only files that are new or changed since they were indexed get parsed.
+        """
+        entries = self._read()
+        current = {}
+        changed = False
+
+        with os.scandir(self.transcript_dir) as it:
+            for item in it:
+                if not is_transcript_file(item.name):
+                    continue
+                stat = item.stat()
+                entry = entries.get(item.name)
+                if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    current[item.name] = entry
+                    continue
+                try:
+                    with open(item.path, 'r') as f:
+                        current[item.name] = index_entry(item.path, json.load(f))
+                except (OSError, ValueError):
+                    continue
+                changed = True
+
+        if changed or len(current) != len(entries):
+            self._rewrite(current)
+        return current
+
+    def _rewrite(self, entries):
+        """Compact the index to one line per file"""
+        tmp_path = f"{self.path}.tmp"
+        with _append_lock:
+            with open(tmp_path, 'w') as f:
+                for entry in entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.path)
+
+    def select(self, since=None, until=None, scenarios=None):
+        """
+        Paths of transcripts matching the filters, ordered by scenario id.
+        since / until are ISO date strings compared against the call timestamp (until is inclusive).
+        """
+        selected = []
+        for entry in self.refresh().values():
+            timestamp = entry.get('timestamp') or ''
+            if since and timestamp[:len(since)] < since:
+                continue
+            if until and timestamp[:len(until)] > until:
+                continue
+            if scenarios and entry.get('scenario_id') not in scenarios:
+                continue
+            selected.append(entry)
+
+        selected.sort(key=lambda e: (e.get('scenario_id') is None, e.get('scenario_id') or 0, e['file']))
+        return [os.path.join(self.transcript_dir, entry['file']) for entry in selected]
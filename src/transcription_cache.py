@@ -0,0 +1,132 @@
+"""
+Persistent transcription cache keyed on audio content
+The same audio + model + response format is only ever sent to Whisper once
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+
+def transcript_to_dict(transcript):
+    """Turn an SDK transcription object (or a dict) into plain JSON-able data"""
+    if isinstance(transcript, dict):
+        return transcript
+    if hasattr(transcript, 'model_dump'):
+        return transcript.model_dump()
+    if hasattr(transcript, 'to_dict'):
+        return transcript.to_dict()
+    return {"text": transcript.text}
+
+
+class TranscriptionCache:
+    def __init__(self, cache_dir='transcripts/.cache/transcriptions', max_bytes=200 * 1024 * 1024):
+        """
+        cache_dir: one JSON file per cached transcription
+        max_bytes: least recently used entries are evicted above this size
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(audio_sha256, model, response_format):
+        return hashlib.sha256(f"{audio_sha256}|{model}|{response_format}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, audio_sha256, model, response_format):
+        """Cached transcription dict, or None"""
+        path = self._path(self.key(audio_sha256, model, response_format))
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        # Touch on read - eviction drops the least recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return entry['result']
+
+    def put(self, audio_sha256, model, response_format, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(self.key(audio_sha256, model, response_format))
+        entry = {
+            "audio_sha256": audio_sha256,
+            "model": model,
+            "response_format": response_format,
+            "result": transcript_to_dict(result)
+        }
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self._disk_usage()
+            else:
+                self.total_bytes += size - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove least recently used entries until under max_bytes (caller holds the lock)"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.total_bytes = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache():
+    """Process-wide cache (TRANSCRIPTION_CACHE_DIR / TRANSCRIPTION_CACHE_MAX_MB)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptionCache(
+                cache_dir=os.getenv('TRANSCRIPTION_CACHE_DIR', 'transcripts/.cache/transcriptions'),
+                max_bytes=int(float(os.getenv('TRANSCRIPTION_CACHE_MAX_MB', '200')) * 1024 * 1024)
+            )
+        return _cache
@@ -0,0 +1,153 @@
+"""
+Pluggable text-to-speech backends
+Backends return MP3 bytes; interactive calls convert them to 8 kHz mu-law for Twilio Media Streams
+"""
+
+import os
+import hashlib
+import threading
+
+
+class TTSBackend:
+    """Base class - subclasses set name (and voice, their default) and implement synthesize()"""
+    name = None
+    voice = None
+
+    def synthesize(self, text, voice=None, rate=None):
+        """Return MP3 audio bytes for text"""
+        raise NotImplementedError
+
+    def voice_label(self, voice=None):
+        """Backend and voice, e.g. 'elevenlabs:Rachel' - recorded with each call so runs can be compared"""
+        return f"{self.name}:{voice or self.voice}"
+
+
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+
+    def __init__(self, voice=None, model=None):
+        self.voice = voice or os.getenv('ELEVENLABS_VOICE', 'Rachel')
+        self.model = model or os.getenv('ELEVENLABS_MODEL', 'eleven_monolingual_v1')
+
+    def synthesize(self, text, voice=None, rate=None):
+        # ElevenLabs has no speaking-rate setting; rate is ignored
+        from elevenlabs import generate, set_api_key
+
+        set_api_key(os.getenv('ELEVENLABS_API_KEY'))
+        audio = generate(text=text, voice=voice or self.voice, model=self.model)
+        if not isinstance(audio, bytes):
+            audio = b''.join(audio)
+        return audio
+
+
+TTS_BACKENDS = {
+    ElevenLabsBackend.name: ElevenLabsBackend
+}
+
+
+def get_tts_backend(name=None, **kwargs):
+    """Build a TTS backend by name (TTS_BACKEND env var, default elevenlabs)"""
+    name = name or os.getenv('TTS_BACKEND', ElevenLabsBackend.name)
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{name}' (choose from: {', '.join(TTS_BACKENDS)})")
+    return TTS_BACKENDS[name](**kwargs)
+
+
+class TTSCache:
+    """
+    Synthesizes each unique (text, voice, rate) once and keeps the MP3 on disk under its content hash.
+    Scripted calls play the cached files with <Play> instead of re-synthesizing <Say> every call.
+    """
+
+    def __init__(self, backend, cache_dir='transcripts/.cache/tts'):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def voice(self):
+        """The voice cached lines are spoken in (not the <Say> voice of uncached calls)"""
+        return self.backend.voice_label()
+
+    def key(self, text, voice, rate):
+        # The resolved voice, so changing the backend's default voice doesn't replay the old audio
+        return hashlib.sha256(f"{self.backend.voice_label(voice)}|{rate}|{text}".encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def ensure(self, text, voice=None, rate=1.0):
+        """Return the cache key for this line, synthesizing it first if it isn't cached yet"""
+        key = self.key(text, voice, rate)
+        path = self.path(key)
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        # Per-key lock: concurrent calls wait for one synthesis instead of each doing their own
+        with key_lock:
+            if os.path.exists(path):
+                with self.lock:
+                    self.hits += 1
+                return key
+
+            audio = self.backend.synthesize(text, voice=voice, rate=rate)
+            if rate != 1.0:
+                audio = _change_tempo(audio, rate)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+
+            with self.lock:
+                self.misses += 1
+            return key
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def _change_tempo(mp3_bytes, rate):
+    """Slow down / speed up speech without changing pitch (ffmpeg atempo)"""
+    import io
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(mp3_bytes), format='mp3')
+    out = io.BytesIO()
+    audio.export(out, format='mp3', parameters=['-filter:a', f'atempo={rate}'])
+    return out.getvalue()
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Shared TTS asset cache (TTS_CACHE_DIR, backend from TTS_BACKEND)"""
+    global _tts_cache
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            _tts_cache = TTSCache(get_tts_backend(),
+                                  cache_dir=os.getenv('TTS_CACHE_DIR', 'transcripts/.cache/tts'))
+        return _tts_cache
+
+
+def print_tts_cache_report(stats):
+    print(f"\n🔊 TTS cache: {stats['hits']} hits, {stats['misses']} synthesized "
+          f"({stats['hit_rate']:.0%} hit rate)")
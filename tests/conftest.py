@@ -0,0 +1,35 @@
+"""
+Shared fixtures - tests run offline in a temporary working directory with fake clients
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clients import reset_clients
+from src.callbacks import set_callback_server
+from src.simulator import Simulator, DEFAULT_PROFILE
+
+# Every stage near-instant and reliable - tests raise failure rates where they need them
+FAST_PROFILE = {stage: {"median": 0.001, "sigma": 0.0, "failure_rate": 0.0} for stage in DEFAULT_PROFILE}
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Each test gets its own transcripts/ and fresh shared clients"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('transcripts')
+    yield tmp_path
+    reset_clients()
+    set_callback_server(None)
+
+
+@pytest.fixture
+def simulator(isolated):
+    """Fast, failure-free simulator installed in place of the shared clients"""
+    simulator = Simulator(profile=FAST_PROFILE, time_scale=0.001).install()
+    yield simulator
+    simulator.uninstall()
@@ -0,0 +1,87 @@
+"""
+Segment creation when writers race, and readers skipping segments with nothing in them
+"""
+
+import os
+
+import pytest
+
+from src import archive
+from src.archive import ArchiveWriter, ArchiveReader, MAGIC
+
+
+def transcript(call_id):
+    return {"call_id": call_id, "scenario_id": 1,
+            "conversation": [{"speaker": "agent", "message": "Hello", "timestamp": "2026-01-01T10:00:00"}]}
+
+
+def test_magic_is_on_disk_as_soon_as_a_segment_is_opened(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    writer._open()
+    assert os.path.getsize(writer.path) == len(MAGIC)
+    writer.close()
+
+
+def test_losing_the_create_race_moves_to_the_next_segment(tmp_path, monkeypatch):
+    # Another writer created segment 1 but hasn't written MAGIC yet
+    (tmp_path / "segment-000001.pgta").touch()
+    real_paths = archive._segment_paths
+
+    def listed_before_it_existed(archive_dir):
+        monkeypatch.setattr(archive, "_segment_paths", real_paths)
+        return []
+
+    monkeypatch.setattr(archive, "_segment_paths", listed_before_it_existed)
+
+    writer = ArchiveWriter(str(tmp_path))
+    path = writer.append(transcript("call_a"))
+    writer.close()
+    assert os.path.basename(path) == "segment-000002.pgta"
+
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert reader.call_ids() == ["call_a"]
+        assert reader.get("call_a") == transcript("call_a")
+
+
+def test_concurrent_writers_use_separate_segments(tmp_path):
+    first, second = ArchiveWriter(str(tmp_path)), ArchiveWriter(str(tmp_path))
+    paths = {first.append(transcript("call_a")), second.append(transcript("call_b"))}
+    first.close()
+    second.close()
+    assert len(paths) == 2
+
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert sorted(reader.call_ids()) == ["call_a", "call_b"]
+
+
+def test_empty_and_short_segments_are_skipped(tmp_path):
+    (tmp_path / "segment-000001.pgta").touch()
+    (tmp_path / "segment-000002.pgta").write_bytes(MAGIC[:3])
+
+    writer = ArchiveWriter(str(tmp_path))
+    assert os.path.basename(writer.append(transcript("call_a"))) == "segment-000003.pgta"
+    writer.close()
+
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert reader.call_ids() == ["call_a"]
+
+
+def test_failed_encode_leaves_no_half_interned_strings(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    # 'speaker' is interned before the unserializable extra makes encoding fail
+    broken = {"call_id": "call_bad", "conversation": [{"speaker": "agent", "message": "Hi", "extra": object()}]}
+    with pytest.raises(TypeError):
+        writer.append(broken)
+    writer.append(transcript("call_a"))
+    writer.close()
+
+    # Unsealed: the reader rebuilds strings from the 'S' records alone
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert reader.call_ids() == ["call_a"]
+        assert reader.get("call_a") == transcript("call_a")
+
+    writer = ArchiveWriter(str(tmp_path))
+    writer.append(transcript("call_b"))
+    writer.close(seal=True)
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert [reader.get(call_id) for call_id in ("call_a", "call_b")] == [transcript("call_a"), transcript("call_b")]
@@ -0,0 +1,31 @@
+"""
+Which files batch transcription picks up, and the local backend's missing-dependency error
+"""
+
+import importlib.util
+
+import pytest
+
+from batch_transcribe import find_recordings
+from src.asr import get_backend
+
+
+def test_hidden_directories_are_skipped(tmp_path):
+    (tmp_path / 'call_1_recording.mp3').write_bytes(b'')
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'call_2_recording.wav').write_bytes(b'')
+    tts = tmp_path / '.cache' / 'tts'
+    tts.mkdir(parents=True)
+    (tts / 'abc123.mp3').write_bytes(b'')
+    (tmp_path / 'call_1.json').write_text('{}')
+
+    assert find_recordings(str(tmp_path)) == [str(tmp_path / 'call_1_recording.mp3'),
+                                              str(tmp_path / 'nested' / 'call_2_recording.wav')]
+
+
+def test_local_backend_names_missing_dependencies(monkeypatch):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name == 'faster_whisper' else real_find_spec(name, *args))
+    with pytest.raises(RuntimeError, match="faster_whisper.*requirements-local.txt"):
+        get_backend('local')
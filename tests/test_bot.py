@@ -0,0 +1,68 @@
+"""
+Streamed VoiceBot replies against the simulator's fake Claude
+"""
+
+from src.bot import VoiceBot, split_sentences
+from src.clients import get_anthropic_client
+from src.scenarios import get_scenario
+
+
+def make_bot():
+    return VoiceBot(get_scenario(1), client=get_anthropic_client())
+
+
+def test_sentences_are_split_across_chunk_boundaries(simulator):
+    reply = "Yes, that works for me. My date of birth is March 15, 1990. Is that okay? Thanks!"
+    simulator.patient_replies = [reply]
+    bot = make_bot()
+
+    # The fake streams word by word - every sentence end arrives in one chunk, its space in the next
+    chunks = list(bot.stream_response("Can I get your date of birth?"))
+    assert len(chunks) > 4 and ''.join(chunks) == reply
+
+    sentences = list(bot.stream_sentences("And what time suits you?"))
+    assert sentences == ["Yes, that works for me.", "My date of birth is March 15, 1990.", "Is that okay?",
+                         "Thanks!"]
+    assert bot.conversation_history[-1] == {"role": "assistant", "content": reply}
+    assert not bot.ended
+    assert 'time_to_first_sentence' in bot.turn_metrics[-1]
+    assert bot.turn_metrics[-1]['time_to_first_token'] <= bot.turn_metrics[-1]['latency']
+
+
+def test_split_sentences_keeps_the_unfinished_tail():
+    assert split_sentences("Hello there. How are") == (["Hello there."], "How are")
+    assert split_sentences("Hello there.") == ([], "Hello there.")
+
+
+def test_streamed_goodbye_ends_the_conversation(simulator):
+    simulator.patient_replies = ["Okay, see you Tuesday.", "Thank you, that's all I needed. Goodbye!"]
+    bot = make_bot()
+
+    assert list(bot.stream_sentences("You're booked for Tuesday.")) == ["Okay, see you Tuesday."]
+    assert not bot.ended
+    assert list(bot.stream_sentences("Anything else?")) == ["Thank you, that's all I needed.", "Goodbye!"]
+    assert bot.ended
+
+
+def test_max_turns_ends_without_calling_claude(simulator):
+    bot = make_bot()
+    bot.max_turns = 2
+
+    assert list(bot.stream_sentences("Hello, how can I help?"))
+    assert not bot.ended
+    history = list(bot.conversation_history)
+
+    sentences = list(bot.stream_sentences("Are you still there?"))
+    assert sentences == ["Thank you so much for your help.", "Have a great day!", "Goodbye."]
+    assert bot.ended
+    assert bot.conversation_history == history
+    assert len(bot.turn_metrics) == 1
+
+
+def test_failed_stream_drops_the_turn(simulator):
+    simulator.profile['llm']['failure_rate'] = 1.0
+    bot = make_bot()
+
+    assert list(bot.stream_sentences("Hello?")) == ["I'm sorry, could you repeat that?"]
+    assert bot.conversation_history == []
+    assert not bot.ended
@@ -0,0 +1,114 @@
+"""
+RuleEngine findings for the built-in rules, and the two phrase matchers agreeing with each other
+"""
+
+import random
+
+from src import bug_rules
+from src.bug_rules import RuleEngine, BUG_RULES, SubstringMatcher, PhraseMatcher, SEPARATOR
+
+
+def transcript(scenario_id, *turns):
+    return {"scenario_id": scenario_id, "scenario_name": f"Scenario {scenario_id}",
+            "conversation": [{"speaker": speaker, "message": message} for speaker, message in turns]}
+
+
+def padding_rules(count):
+    """Rules no transcript here trips, to push the engine past the substring fast path"""
+    return [{"name": f"padding_{i}", "speaker": "agent", "all": [f"padding phrase {i}"], "scope": "message",
+             "type": "Synthetic", "severity": "Low", "description": "", "evidence": "", "impact": ""}
+            for i in range(count)]
+
+
+ENGINES = [RuleEngine(), RuleEngine(BUG_RULES + padding_rules(30))]
+
+
+def findings(scenario_id, *turns):
+    results = [engine.analyze(transcript(scenario_id, *turns)) for engine in ENGINES]
+    assert results[0] == results[1]
+    return [(finding['type'], finding['evidence']) for finding in results[0]]
+
+
+def test_both_matchers_are_exercised():
+    assert isinstance(ENGINES[0]._plan(1)[2], SubstringMatcher)
+    assert isinstance(ENGINES[1]._plan(1)[2], PhraseMatcher)
+
+
+def test_message_rules():
+    assert findings(
+        1,
+        ("patient", "I need a refill of Lisinopril."),
+        ("agent", "I've sent the Metformin refill."),
+        ("agent", "Our office hours are Monday through Sunday."),
+        ("agent", "We have 2 pm or 2 PM."),
+        ("patient", "Is 2 PM or 2 PM open?"),
+    ) == [
+        ("Logic Error", "We have 2 pm or 2 PM."),
+        ("Hallucination", "Patient: I need a refill of Lisinopril.\nAgent: I've sent the Metformin refill."),
+        ("Information Accuracy", "Our office hours are Monday through Sunday."),
+    ]
+
+
+def test_conditions_beyond_the_trigger():
+    assert findings(
+        1,
+        ("patient", "I need a refill of atorvastatin."),
+        ("agent", "I've sent the metformin refill."),
+        ("agent", "Our office hours are Monday to Friday."),
+        ("agent", "We have 2 PM on Tuesday."),
+    ) == []
+
+
+def test_scenario_specific_rules():
+    turns = [("agent", "The next opening is in two weeks."),
+             ("agent", "I'm not seeing any upcoming visits, what's your date of birth?")]
+    assert findings(1, *turns) == []
+    assert findings(6, *turns) == [("Inappropriate Response", "The next opening is in two weeks.")]
+    assert findings(3, *turns) == [("Data Retrieval Failure", turns[1][1])]
+
+
+def test_call_rules():
+    assert findings(10, ("patient", "Is this the veterinary clinic?"), ("agent", "How can I help?")) == [
+        ("Context Understanding Failure", "Agent proceeded with appointment scheduling despite clear mismatch")]
+    assert findings(10, ("agent", "Sorry, you have the wrong number.")) == []
+
+    repeats = [("agent", "I didn't quite catch that.")] * 3
+    assert findings(1, *repeats[:2]) == []
+    assert findings(1, *repeats) == [("Poor Conversation Flow", "3 instances of \"I didn't quite catch that\"")]
+
+
+def phrases_by_message(matcher, text):
+    found = {}
+    for offset, phrase in matcher.find_all(text):
+        found.setdefault(text.count(SEPARATOR, 0, offset), set()).add(phrase)
+    return found
+
+
+def test_matchers_find_the_same_phrases():
+    # Prefixes, contained phrases and phrases that overlap in the text ('office hours' / 'hours open')
+    phrases = ["2 pm", "office hours", "hours open", "wrong", "wrong number", "date of birth", "birth",
+               "didn't quite catch", "metformin", "two weeks", "week"]
+    words = "2 pm office hours open wrong number date of birth didn't quite catch metformin two weeks ok".split()
+    rng = random.Random(0)
+    substring, regex = SubstringMatcher(phrases), PhraseMatcher(phrases)
+    for _ in range(500):
+        messages = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 12))) for _ in range(rng.randint(1, 8))]
+        text = SEPARATOR.join(messages)
+        assert phrases_by_message(substring, text) == phrases_by_message(regex, text)
+
+
+def test_engine_findings_match_across_matchers(monkeypatch):
+    lines = ["I have 2 PM or 2 pm.", "Our office hours are Monday to Sunday.", "I didn't quite catch that.",
+             "I've sent the metformin refill.", "Next opening is in two weeks.", "Is this the veterinary clinic?",
+             "I'm not seeing any upcoming visits, what's your date of birth?", "Thank you!", "Refill of lisinopril."]
+    rng = random.Random(1)
+    corpus = [transcript(rng.randint(1, 10), *[(rng.choice(["agent", "patient"]), rng.choice(lines))
+                                               for _ in range(rng.randint(1, 20))])
+              for _ in range(300)]
+    fast = RuleEngine()
+    expected = [fast.analyze(t) for t in corpus]
+    monkeypatch.setattr(bug_rules, 'FAST_PATH_MAX_PHRASES', 0)
+    regex = RuleEngine()
+    assert [regex.analyze(t) for t in corpus] == expected
+    assert isinstance(fast._plan(1)[2], SubstringMatcher) and isinstance(regex._plan(1)[2], PhraseMatcher)
+    assert sum(map(len, expected)) > 100
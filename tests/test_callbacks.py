@@ -0,0 +1,84 @@
+"""
+Status and recording callbacks posted to a started CallbackServer wake the waiting call
+"""
+
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+
+from twilio.request_validator import RequestValidator
+
+from src.callbacks import CallbackServer, STATUS_PATH, RECORDING_PATH
+from src.call_handler import CallHandler
+from src.clients import set_client
+
+PUBLIC_URL = 'https://callbacks.example.test'
+AUTH_TOKEN = 'test-auth-token'
+CALL_SID = 'CA' + '0' * 32
+
+
+class NoPollingTwilio:
+    """Fails the test if the handler falls back to fetching the call"""
+
+    def __init__(self):
+        self.recordings = SimpleNamespace(list=lambda call_sid=None: [
+            SimpleNamespace(sid='RE1', uri='/Recordings/RE1.json', duration='30')
+        ])
+
+    def calls(self, sid):
+        raise AssertionError("call status was polled instead of waiting on the callback")
+
+
+@pytest.fixture
+def server():
+    server = CallbackServer(PUBLIC_URL, host='127.0.0.1', port=0, auth_token=AUTH_TOKEN)
+    server.start()
+    yield server
+    server.stop()
+
+
+def post(client, path, form):
+    signature = RequestValidator(AUTH_TOKEN).compute_signature(f"{PUBLIC_URL}{path}", form)
+    return client.post(path, data=form, headers={'X-Twilio-Signature': signature})
+
+
+def test_unsigned_callback_is_rejected(server):
+    client = server.app.test_client()
+    response = client.post(STATUS_PATH, data={'CallSid': CALL_SID, 'CallStatus': 'completed'})
+    assert response.status_code == 403
+    assert not server.waiter(CALL_SID).completed.is_set()
+
+
+def test_callbacks_wake_call_completion_without_polling(server):
+    set_client('twilio', NoPollingTwilio())
+    set_client('openai', SimpleNamespace())
+    handler = CallHandler(callback_server=server, asr_backend=SimpleNamespace())
+    client = server.app.test_client()
+
+    result = {}
+
+    def wait():
+        start = time.monotonic()
+        result['status'] = handler._wait_for_call_completion(CALL_SID, timeout=10)
+        result['elapsed'] = time.monotonic() - start
+
+    waiting = threading.Thread(target=wait)
+    waiting.start()
+    for status in ('ringing', 'in-progress', 'completed'):
+        time.sleep(0.05)
+        assert post(client, STATUS_PATH, {'CallSid': CALL_SID, 'CallStatus': status}).status_code == 204
+    waiting.join(5)
+
+    assert result['status'] == 'completed'
+    assert result['elapsed'] < 2
+    assert [status for status, _ in handler.status_times] == ['ringing', 'in-progress', 'completed']
+
+    form = {'CallSid': CALL_SID, 'RecordingSid': 'RE1', 'RecordingStatus': 'completed'}
+    assert post(client, RECORDING_PATH, form).status_code == 204
+    recordings = handler._wait_for_recordings(CALL_SID, timeout=1)
+    assert [r.sid for r in recordings] == ['RE1']
+    assert server.waiter(CALL_SID).recordings[0]['RecordingSid'] == 'RE1'
@@ -0,0 +1,39 @@
+"""
+One rate limiter per Twilio account, whatever rate later callers ask for, and only positive rates
+"""
+
+import argparse
+
+import pytest
+
+import main
+from src import campaign
+from src.campaign import get_rate_limiter, RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(campaign, '_rate_limiters', {})
+
+
+def test_later_rate_updates_the_accounts_limiter():
+    limiter = get_rate_limiter('AC1', 4)
+    assert limiter.interval == 15.0
+    assert get_rate_limiter('AC1', 12) is limiter
+    assert limiter.interval == 5.0
+    assert get_rate_limiter('AC2', 4).interval == 15.0
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_rate_must_be_positive(rate):
+    with pytest.raises(ValueError):
+        RateLimiter(rate)
+    with pytest.raises(ValueError):
+        get_rate_limiter('AC1', 4).set_rate(rate)
+
+
+@pytest.mark.parametrize("value", ["0", "-2", "abc"])
+def test_rate_flag_rejects_non_positive(value):
+    with pytest.raises((argparse.ArgumentTypeError, ValueError)):
+        main.positive_float(value)
+    assert main.positive_float("0.5") == 0.5
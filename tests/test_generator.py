@@ -0,0 +1,26 @@
+"""
+Generated scenario ids are stable per (seed, index) and never shared across seeds
+"""
+
+from src.generator import generate_scenario, iter_scenarios, GENERATED_ID_BASE
+from src.scenarios import get_all_scenarios
+from src.timing import TimingModel
+
+
+def test_ids_depend_on_seed_and_index():
+    ids = {(seed, s['variant']['index']): s['id'] for seed in range(5) for s in iter_scenarios(seed, 200)}
+    assert len(set(ids.values())) == len(ids)
+    assert all(scenario_id > GENERATED_ID_BASE for scenario_id in ids.values())
+    assert generate_scenario(3, 17)['id'] == ids[(3, 17)]
+    assert not set(ids.values()) & {s['id'] for s in get_all_scenarios()}
+
+
+def test_timing_samples_stay_with_their_variant():
+    model = TimingModel(min_samples=1, margin=0)
+    one, other = generate_scenario(1, 0), generate_scenario(2, 0)
+    schedule = [{"start": 10.0, "end": 12.0}]
+    model.learn({"scenario_id": one['id'], "script_schedule": schedule,
+                 "conversation": [{"speaker": "agent", "start": 1.0, "end": 6.0}]})
+
+    assert model.pause(one['id'], 0, default=10) == 6
+    assert model.pause(other['id'], 0, default=10) == 10
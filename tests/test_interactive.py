@@ -0,0 +1,137 @@
+"""
+Interactive calls against a fake Twilio Media Streams client over a real WebSocket
+"""
+
+import json
+import array
+import base64
+import asyncio
+
+import pytest
+
+websockets = pytest.importorskip('websockets')
+
+from src import interactive
+from src.bot import VoiceBot
+from src.clients import get_anthropic_client
+from src.interactive import MediaStreamServer, TurnDetector, pcm16_to_ulaw, FRAME_BYTES
+from src.scenarios import get_scenario
+from src.simulator import PATIENT_REPLIES
+
+CALL_ID = 'call_interactive_test'
+AGENT_LINES = ["Thank you for calling, how can I help you today?", "Can I get your date of birth please?"]
+
+SPEECH = pcm16_to_ulaw(array.array('h', [4000, -4000] * 4000).tobytes())   # 1 s loud square wave
+SILENCE = b'\xff' * 8000                                                    # 1 s of mu-law silence
+
+
+class FakeASR:
+    model = 'fake-asr'
+    response_format = 'verbose_json'
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.calls = 0
+
+    def transcribe(self, audio_path):
+        self.calls += 1
+        return {"text": self.lines.pop(0), "segments": []}
+
+
+class FakeTTS:
+    def synthesize(self, text, voice=None, rate=None):
+        return text.encode()
+
+
+@pytest.fixture
+def media_server(simulator, monkeypatch):
+    # TTS output is already "audio" here - skip the MP3 decode (it needs ffmpeg)
+    monkeypatch.setattr(interactive, 'mp3_to_ulaw', lambda audio: SPEECH[:len(audio) * FRAME_BYTES])
+    server = MediaStreamServer('http://127.0.0.1', host='127.0.0.1', port=0,
+                               asr_backend=FakeASR(AGENT_LINES), tts_backend=FakeTTS())
+    server.start()
+    yield server
+    server.stop()
+
+
+async def send_audio(ws, audio):
+    for offset in range(0, len(audio), FRAME_BYTES):
+        await ws.send(json.dumps({"event": "media", "streamSid": "MZtest",
+                                  "media": {"payload": base64.b64encode(audio[offset:offset + FRAME_BYTES]).decode()}}))
+
+
+async def fake_twilio(url, turns):
+    """Speak each agent turn, then collect the bot's audio until its mark and echo the mark back"""
+    heard = []
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"event": "connected"}))
+        await ws.send(json.dumps({"event": "start", "streamSid": "MZtest", "start": {
+            "streamSid": "MZtest", "callSid": "CAtest", "customParameters": {"call_id": CALL_ID}}}))
+        for turn in range(turns):
+            await send_audio(ws, SPEECH[:4000] + SILENCE)
+            frames = 0
+            while True:
+                message = json.loads(await asyncio.wait_for(ws.recv(), 10))
+                if message['event'] == 'media':
+                    frames += 1
+                elif message['event'] == 'mark':
+                    heard.append((message['mark']['name'], frames))
+                    await ws.send(json.dumps({"event": "mark", "streamSid": "MZtest", "mark": message['mark']}))
+                    break
+        await ws.send(json.dumps({"event": "stop", "streamSid": "MZtest"}))
+    return heard
+
+
+def test_turns_alternate_and_first_audio_is_timed(media_server, simulator):
+    # 50 ms per reply, 30 ms of it before the first token
+    simulator.profile['llm']['median'] = 0.05
+    bot = VoiceBot(get_scenario(1), client=get_anthropic_client())
+    session = media_server.register(CALL_ID, bot)
+
+    heard = asyncio.run(fake_twilio(f"ws://127.0.0.1:{media_server.port}/media", turns=2))
+    assert session.finished.wait(5)
+
+    assert [name for name, _ in heard] == ['turn1', 'turn2']
+    assert all(frames > 0 for _, frames in heard)
+
+    log = session.conversation_log
+    assert [entry['speaker'] for entry in log] == ['agent', 'patient', 'agent', 'patient']
+    assert [log[0]['message'], log[2]['message']] == AGENT_LINES
+    assert log[1]['message'] == bot.get_initial_message()
+    # The greeting and opening line are in the history, so the fake answers the second user turn
+    assert log[3]['message'] == PATIENT_REPLIES[1]
+    assert [m['role'] for m in bot.conversation_history] == ['user', 'assistant', 'user', 'assistant']
+    assert bot.conversation_history[1]['content'] == bot.get_initial_message()
+
+    opening, reply = session.turn_metrics
+    for metrics in (opening, reply):
+        assert 0 <= metrics['time_to_first_audio'] <= metrics['total_seconds']
+        assert metrics['early_asr']
+    # The opening line is scripted; the reply waits for Claude's first sentence
+    assert reply['time_to_first_audio'] >= 0.03 > opening['time_to_first_audio']
+    # Each turn was transcribed once, starting at the pause
+    assert media_server.asr_backend.calls == 2
+
+
+def test_unknown_call_is_closed(media_server):
+    async def connect():
+        async with websockets.connect(f"ws://127.0.0.1:{media_server.port}/media") as ws:
+            await ws.send(json.dumps({"event": "start", "start": {"customParameters": {"call_id": "nope"}}}))
+            with pytest.raises(websockets.ConnectionClosed):
+                await asyncio.wait_for(ws.recv(), 5)
+
+    asyncio.run(connect())
+
+
+def test_turn_detector_pause_and_resume():
+    detector = TurnDetector()
+    loud = array.array('h', [4000, -4000] * 80).tobytes()
+    quiet = bytes(320)
+
+    states = [detector.feed(loud) for _ in range(15)]
+    assert states.count('speech_start') == 1
+    states = [detector.feed(quiet) for _ in range(detector.pause_frames)]
+    assert states[-1] == 'pause'
+    assert detector.feed(loud) == 'resume'
+    states = [detector.feed(quiet) for _ in range(detector.end_silence_frames)]
+    assert states.count('pause') == 1 and states[-1] == 'end_of_turn'
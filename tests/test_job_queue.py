@@ -0,0 +1,186 @@
+"""
+Leases on the shared queue: expiry, reclaim, heartbeats and the attempt cap.
+Dial slots booked through the queue hold the account's rate across workers.
+"""
+
+import json
+import time
+
+import pytest
+
+from src.job_queue import JobQueue, Lease, QueueRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def queue_with_job(tmp_path, **kwargs):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'), **kwargs)
+    queue.enqueue([{"id": 1, "name": "Scenario 1"}], campaign='c1')
+    return queue
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path, clock):
+    queue = queue_with_job(tmp_path)
+    stale = queue.claim('worker-a', lease_seconds=0)
+    assert stale['attempt'] == 1
+    clock[0] += 1
+
+    job = queue.claim('worker-b')
+    assert (job['id'], job['attempt']) == (stale['id'], 2)
+    assert not queue.heartbeat(job['id'], 'worker-a')
+    assert not queue.complete(job['id'], 'worker-a', 'CA_stale')
+    assert queue.complete(job['id'], 'worker-b', 'CA1')
+    assert queue.counts('c1')['done'] == 1
+    assert queue.worker_summary('c1') == {'worker-b': 1}
+
+
+def test_heartbeat_keeps_the_lease(tmp_path, clock):
+    queue = queue_with_job(tmp_path)
+    job = queue.claim('worker-a', lease_seconds=10)
+    clock[0] += 8
+    assert queue.heartbeat(job['id'], 'worker-a', lease_seconds=10)
+    clock[0] += 8
+    assert queue.claim('worker-b') is None
+    assert queue.counts('c1')['leased'] == 1
+
+
+def test_job_fails_for_good_after_the_attempt_cap(tmp_path, clock):
+    queue = queue_with_job(tmp_path, max_attempts=3)
+    for attempt in (1, 2):
+        job = queue.claim(f'worker-{attempt}', lease_seconds=0)
+        assert job['attempt'] == attempt
+        clock[0] += 1
+    job = queue.claim('worker-3')
+    assert job['attempt'] == 3
+    queue.fail(job['id'], 'worker-3', "call failed")
+
+    assert queue.claim('worker-4') is None
+    assert queue.counts('c1') == {'queued': 0, 'leased': 0, 'done': 0, 'failed': 1}
+    assert queue.failures('c1') == [(job['id'], "Scenario 1", 3, "call failed")]
+
+
+def test_expired_lease_past_the_cap_is_failed_on_reclaim(tmp_path, clock):
+    queue = queue_with_job(tmp_path, max_attempts=1)
+    job = queue.claim('worker-a', lease_seconds=0)
+    clock[0] += 1
+    assert queue.reclaim_expired() == 1
+    assert queue.failures('c1') == [(job['id'], "Scenario 1", 1, "lease expired (worker worker-a)")]
+
+
+def test_lease_notices_when_it_was_reclaimed(tmp_path):
+    queue = queue_with_job(tmp_path)
+    job = queue.claim('worker-a', lease_seconds=0.06)
+    with Lease(queue, job, 'worker-a', lease_seconds=0.06) as lease:
+        time.sleep(0.05)
+        assert not lease.lost
+        # The heartbeat thread extends the lease, then another worker takes it over
+        queue.fail(job['id'], 'worker-a', "simulated reclaim")
+        queue.claim('worker-b', lease_seconds=60)
+        time.sleep(0.08)
+    assert lease.lost
+
+
+def test_workers_on_separate_hosts_share_one_rate(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.sqlite')
+    monkeypatch.setattr(time, 'time', lambda: 1000.0)
+    # Separate JobQueue objects, as two hosts would have
+    host_a, host_b = JobQueue(path), JobQueue(path)
+
+    delays = [queue.reserve_dial('AC1', 10.0) for queue in (host_a, host_b, host_a, host_b)]
+    assert delays == [0.0, 10.0, 20.0, 30.0]
+    assert host_b.reserve_dial('AC2', 10.0) == 0.0
+
+
+def test_idle_account_dials_at_once(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite'))
+    assert queue.reserve_dial('AC1', 10.0) == 0.0
+    clock[0] += 25.0
+    assert queue.reserve_dial('AC1', 10.0) == 0.0
+    assert queue.reserve_dial('AC1', 10.0) == 10.0
+
+
+def test_limiters_on_one_queue_space_out_calls(tmp_path, monkeypatch):
+    path = str(tmp_path / 'jobs.sqlite')
+    now = [1000.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', sleep)
+    workers = [QueueRateLimiter(JobQueue(path), 'AC1', calls_per_minute=6) for _ in range(3)]
+
+    dialed = []
+    for limiter in workers:
+        limiter.acquire()
+        dialed.append(now[0])
+    assert dialed == [1000.0, 1010.0, 1020.0]
+
+
+class FlakyCallHandler:
+    """Raises on the first call it's asked to place, then succeeds"""
+    calls = 0
+
+    def __init__(self, **kwargs):
+        self.transcript_path = None
+        self.call_id = None
+
+    def make_call(self, bot, scenario):
+        FlakyCallHandler.calls += 1
+        if FlakyCallHandler.calls == 1:
+            raise RuntimeError("dial failed")
+        return f"CA{scenario['id']}"
+
+
+def test_worker_survives_queue_and_call_errors(tmp_path, monkeypatch):
+    import sqlite3
+    import main
+
+    path = str(tmp_path / 'jobs.sqlite')
+    queue = JobQueue(path, max_attempts=2)
+    queue.enqueue([{"id": 1, "name": "Scenario 1"}, {"id": 2, "name": "Scenario 2"}], campaign='c1')
+
+    real_claim = JobQueue.claim
+    locked = []
+
+    def claim(self, *args, **kwargs):
+        if not locked:
+            locked.append(True)
+            raise sqlite3.OperationalError("database is locked")
+        return real_claim(self, *args, **kwargs)
+
+    monkeypatch.setattr(JobQueue, 'claim', claim)
+    monkeypatch.setattr(main, 'CallHandler', FlakyCallHandler)
+    monkeypatch.setattr(main, 'VoiceBot', lambda scenario: None)
+    monkeypatch.setattr(main, 'get_callback_server', lambda: None)
+
+    completed = main.run_worker(path, calls_per_minute=60000, poll_interval=0.01)
+
+    assert len(completed) == 2
+    assert queue.counts('c1')['done'] == 2
+
+
+def test_upload_takes_the_recording_from_the_recordings_dir(tmp_path):
+    from src.archive import ArchiveWriter
+    from src.job_queue import upload_transcript
+
+    # Archive somewhere other than under the recordings dir
+    writer = ArchiveWriter(str(tmp_path / 'elsewhere' / 'archive'))
+    segment = writer.append({"call_id": "call_1", "conversation": []})
+    writer.close()
+    recordings = tmp_path / 'recordings'
+    recordings.mkdir()
+    (recordings / 'call_1_recording.mp3').write_bytes(b'audio')
+
+    store = tmp_path / 'store'
+    stored = upload_transcript(segment, 'call_1', str(store), str(recordings))
+
+    assert (store / 'call_1_recording.mp3').read_bytes() == b'audio'
+    assert json.loads(open(stored).read()) == {"call_id": "call_1", "conversation": []}
@@ -0,0 +1,77 @@
+"""
+A call whose recording fails to transcribe stays journaled and is retried on the next start,
+until it runs out of attempts and is moved to the journal's failed/ directory
+"""
+
+import os
+import json
+
+from src.call_handler import CallHandler
+from src.postprocess import PostProcessor
+from src.scenarios import get_scenario
+
+QUEUE_DIR = 'transcripts/.queue'
+
+
+def saved_transcripts():
+    return sorted(f for f in os.listdir('transcripts') if f.startswith('call_') and f.endswith('.json'))
+
+
+def test_failed_transcription_keeps_the_job_for_retry(simulator):
+    simulator.profile['transcription']['failure_rate'] = 1.0
+    postprocessor = PostProcessor(lambda: CallHandler(), workers=1, queue_dir=QUEUE_DIR).start()
+    handler = CallHandler(callback_server=simulator.callback_server, postprocessor=postprocessor)
+    assert handler.make_call(None, get_scenario(1))
+    postprocessor.shutdown()
+
+    assert (postprocessor.processed, postprocessor.failed) == (0, 1)
+    assert os.listdir(QUEUE_DIR) == [f"{handler.call_id}.json"]
+    assert saved_transcripts() == []
+
+    # Next start resumes the journaled job, and this time it goes through
+    simulator.profile['transcription']['failure_rate'] = 0.0
+    postprocessor = PostProcessor(lambda: CallHandler(), workers=1, queue_dir=QUEUE_DIR).start()
+    postprocessor.shutdown()
+
+    assert (postprocessor.processed, postprocessor.failed) == (1, 0)
+    assert os.listdir(QUEUE_DIR) == []
+    assert saved_transcripts() == [f"{handler.call_id}.json"]
+    with open(os.path.join('transcripts', f"{handler.call_id}.json")) as f:
+        speakers = {turn['speaker'] for turn in json.load(f)['conversation']}
+    assert 'agent' in speakers
+
+
+def test_job_moves_to_failed_after_max_attempts(simulator):
+    simulator.profile['transcription']['failure_rate'] = 1.0
+    postprocessor = PostProcessor(lambda: CallHandler(), workers=1, queue_dir=QUEUE_DIR, max_attempts=2).start()
+    handler = CallHandler(callback_server=simulator.callback_server, postprocessor=postprocessor)
+    assert handler.make_call(None, get_scenario(1))
+    postprocessor.shutdown()
+
+    journal = os.path.join(QUEUE_DIR, f"{handler.call_id}.json")
+    with open(journal) as f:
+        assert json.load(f)['attempts'] == 1
+
+    # Second failure uses up the attempts
+    postprocessor = PostProcessor(lambda: CallHandler(), workers=1, queue_dir=QUEUE_DIR, max_attempts=2).start()
+    postprocessor.shutdown()
+    assert not os.path.exists(journal)
+    with open(os.path.join(QUEUE_DIR, 'failed', f"{handler.call_id}.json")) as f:
+        failed = json.load(f)
+    assert failed['attempts'] == 2 and 'could not be transcribed' in failed['error']
+
+    # ...and later starts leave it alone
+    postprocessor = PostProcessor(lambda: CallHandler(), workers=1, queue_dir=QUEUE_DIR, max_attempts=2).start()
+    postprocessor.shutdown()
+    assert (postprocessor.processed, postprocessor.failed) == (0, 0)
+    assert saved_transcripts() == []
+
+
+def test_inline_failure_still_saves_the_scripted_lines(simulator):
+    simulator.profile['transcription']['failure_rate'] = 1.0
+    handler = CallHandler(callback_server=simulator.callback_server)
+    assert handler.make_call(None, get_scenario(1))
+
+    with open(handler.transcript_path) as f:
+        speakers = {turn['speaker'] for turn in json.load(f)['conversation']}
+    assert speakers == {'patient'}
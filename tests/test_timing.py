@@ -0,0 +1,55 @@
+"""
+Agent turn durations per gap, and the pause TimingModel picks from them
+"""
+
+import json
+
+from src.timing import TimingModel, agent_durations
+
+SCHEDULE = [{"start": 10.0, "end": 12.0}, {"start": 20.0, "end": 23.0}]
+
+
+def call(scenario_id, *agent_segments, call_id='call_1'):
+    return {"call_id": call_id, "scenario_id": scenario_id, "script_schedule": SCHEDULE,
+            "conversation": [{"speaker": "agent", "start": start, "end": end} for start, end in agent_segments]
+                            + [{"speaker": "patient", "start": 10.0, "end": 12.0}]}
+
+
+def test_every_gap_including_the_reply_to_the_last_line():
+    durations = agent_durations(call(1, (1.0, 4.0), (5.0, 8.0), (13.0, 17.5), (24.0, 29.0)))
+    assert durations == {0: 8.0, 1: 5.5, 2: 6.0}
+
+
+def test_gaps_without_agent_speech_count_as_zero():
+    assert agent_durations(call(1, (1.0, 4.0))) == {0: 4.0, 1: 0.0, 2: 0.0}
+    assert agent_durations({"script_schedule": SCHEDULE, "conversation": []}) == {}
+
+
+def test_pause_covers_the_percentile_plus_margin():
+    model = TimingModel(percentile=50, margin=1, min_pause=3, max_pause=30, min_samples=3)
+    for seconds in (4, 5, 6, 7, 20):
+        model.samples.setdefault((1, 2), []).append(seconds)
+    assert model.pause(1, 2, default=15) == 7          # median 6 + 1
+
+    model.percentile = 90
+    assert model.pause(1, 2, default=15) == 16         # 7 + (20 - 7) * 0.6 = 14.8, + 1, rounded up
+
+    model.samples[(1, 3)] = [0.5, 0.5, 0.5]
+    assert model.pause(1, 3, default=15) == 3          # min_pause
+    model.samples[(1, 4)] = [60, 60, 60]
+    assert model.pause(1, 4, default=15) == 30         # max_pause
+    model.samples[(1, 5)] = [4, 4]
+    assert model.pause(1, 5, default=15) == 15         # too few samples
+
+
+def test_from_transcripts_learns_the_closing_gap():
+    for i, reply in enumerate((4.0, 5.0, 6.0)):
+        with open(f"transcripts/call_{i}.json", 'w') as f:
+            json.dump(call(7, (1.0, 3.0), (24.0, 24.0 + reply), call_id=f"call_{i}"), f)
+
+    model = TimingModel.from_transcripts(percentile=100, margin=1)
+    # Measured from the end of the last patient line (23.0)
+    assert sorted(model.samples[(7, 2)]) == [5.0, 6.0, 7.0]
+    assert model.pause(7, 2, default=20) == 8
+    assert model.pause(7, 0, default=20) == 4
+    assert model.report()['seconds_saved'] == 28
@@ -0,0 +1,32 @@
+"""
+The trace file is resolved when it's used, so TRACE_FILE from .env counts
+"""
+
+import json
+import sys
+
+import main
+from src.tracing import Tracer, get_tracer, TRACE_FILE
+
+
+def test_trace_file_follows_the_environment(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.delenv('TRACE_FILE', raising=False)
+    assert tracer.trace_file == TRACE_FILE
+    monkeypatch.setenv('TRACE_FILE', 'elsewhere.jsonl')
+    assert tracer.trace_file == 'elsewhere.jsonl'
+    assert Tracer('given.jsonl').trace_file == 'given.jsonl'
+
+
+def test_stats_reads_trace_file_from_env_file(monkeypatch, capsys, tmp_path):
+    trace_file = tmp_path / 'from_env.jsonl'
+    trace_file.write_text(json.dumps({"name": "claude_turn", "duration": 0.5, "status": "ok"}) + "\n")
+    monkeypatch.delenv('TRACE_FILE', raising=False)
+    # Stands in for load_dotenv picking TRACE_FILE up from .env
+    monkeypatch.setattr(main, 'load_env', lambda: monkeypatch.setenv('TRACE_FILE', str(trace_file)))
+    monkeypatch.setattr(sys, 'argv', ['main.py', 'stats'])
+
+    main.main()
+
+    assert get_tracer().trace_file == str(trace_file)
+    assert 'claude_turn' in capsys.readouterr().out
@@ -0,0 +1,74 @@
+"""
+--reprocess rebuilds a transcript from the transcription cache alone - no Groq client, no network
+"""
+
+import json
+import socket
+
+import pytest
+
+from src import transcription_cache
+from src.call_handler import CallHandler
+from src.clients import set_client
+from src.scenarios import get_scenario
+from src.transcription_cache import TranscriptionCache
+
+
+class Unavailable:
+    """Stands in for every shared client once the call is made"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"reprocessing used a network client ({name})")
+
+    def close(self):
+        pass
+
+
+def offline(*args, **kwargs):
+    raise AssertionError("reprocessing opened a network connection")
+
+
+def parsed_turns(path):
+    with open(path) as f:
+        conversation = json.load(f)['conversation']
+    return [(turn['speaker'], turn['message'], turn.get('start'), turn.get('end')) for turn in conversation]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TranscriptionCache()
+    monkeypatch.setattr(transcription_cache, '_cache', cache)
+    return cache
+
+
+def test_reprocess_runs_from_the_cache(simulator, cache, monkeypatch):
+    handler = CallHandler(callback_server=simulator.callback_server)
+    assert handler.make_call(None, get_scenario(1))
+    transcript_path = handler.transcript_path
+    assert cache.misses == 1 and cache.hits == 0
+    original = parsed_turns(transcript_path)
+
+    simulator.uninstall()
+    for name in ('twilio', 'http', 'groq', 'openai', 'anthropic'):
+        set_client(name, Unavailable())
+    monkeypatch.setattr(socket, 'create_connection', offline)
+    monkeypatch.setattr(socket.socket, 'connect', offline)
+
+    assert CallHandler().reprocess_transcript(transcript_path)
+    assert cache.hits == 1
+    assert parsed_turns(transcript_path) == original
+    assert any(speaker == 'agent' for speaker, *_ in original)
+
+
+def test_reprocess_skips_calls_without_a_cached_transcription(simulator, cache):
+    handler = CallHandler(callback_server=simulator.callback_server)
+    assert handler.make_call(None, get_scenario(2))
+    with open(handler.transcript_path) as f:
+        before = f.read()
+
+    cache.max_bytes = 0
+    cache._evict()
+
+    assert not CallHandler().reprocess_transcript(handler.transcript_path)
+    with open(handler.transcript_path) as f:
+        assert f.read() == before
@@ -0,0 +1,65 @@
+"""
+TTSCache keys, per-key locking under concurrent ensure() and hit accounting, with a fake backend
+"""
+
+import os
+import threading
+import time
+
+from src.tts import TTSCache, TTSBackend
+
+
+class FakeBackend(TTSBackend):
+    name = "fake"
+
+    def __init__(self, voice="Alice", delay=0.0):
+        self.voice = voice
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def synthesize(self, text, voice=None, rate=None):
+        with self.lock:
+            self.calls.append(text)
+        time.sleep(self.delay)
+        return f"mp3:{voice or self.voice}:{text}".encode()
+
+
+def test_key_depends_on_text_voice_rate_and_backend_voice():
+    cache = TTSCache(FakeBackend())
+    key = cache.key("Hello", None, 1.0)
+    assert key == cache.key("Hello", "Alice", 1.0)  # None means the backend's voice
+    assert len({key, cache.key("Hello!", None, 1.0), cache.key("Hello", "Bob", 1.0), cache.key("Hello", None, 0.9)}) == 4
+    # A new default voice gets new audio rather than the old voice's cached file
+    assert TTSCache(FakeBackend(voice="Bob")).key("Hello", None, 1.0) == cache.key("Hello", "Bob", 1.0)
+    assert cache.voice == "fake:Alice"
+
+
+def test_concurrent_ensure_synthesizes_each_line_once(tmp_path):
+    backend = FakeBackend(delay=0.05)
+    cache = TTSCache(backend, cache_dir=str(tmp_path))
+    keys = []
+    threads = [threading.Thread(target=lambda text=text: keys.append(cache.ensure(text)))
+               for text in ["Hi", "Bye"] * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(backend.calls) == ["Bye", "Hi"]
+    assert set(keys) == {cache.key("Hi", None, 1.0), cache.key("Bye", None, 1.0)}
+    assert cache.stats() == {"hits": 6, "misses": 2, "hit_rate": 0.75}
+    with open(cache.path(cache.key("Hi", None, 1.0)), 'rb') as f:
+        assert f.read() == b"mp3:Alice:Hi"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_cache_survives_a_new_instance_and_reset_stats(tmp_path):
+    TTSCache(FakeBackend(), cache_dir=str(tmp_path)).ensure("Hi")
+    backend = FakeBackend()
+    cache = TTSCache(backend, cache_dir=str(tmp_path))
+    cache.ensure("Hi")
+    assert backend.calls == []
+    assert cache.stats()["hits"] == 1
+    cache.reset_stats()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}